@@ -0,0 +1,41 @@
+"""add composite indexes for hot queries
+
+Revision ID: 2590f0db1154
+Revises: 1bc0f729df39
+Create Date: 2026-10-18 11:40:05.527114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2590f0db1154'
+down_revision: Union[str, Sequence[str], None] = '1bc0f729df39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # category filters: item_category lookups by category_id
+    op.create_index('ix_item_category_category_id_item_id', 'item_category', ['category_id', 'item_id'], unique=False)
+    # outfit -> items loads: item_outfit lookups by outfit_id
+    op.create_index('ix_item_outfit_outfit_id_item_id', 'item_outfit', ['outfit_id', 'item_id'], unique=False)
+    # closet display: a user's likes ordered newest first
+    op.create_index('ix_user_like_items_user_id_like_timestamp', 'user_like_items', ['user_id', sa.text('like_timestamp DESC')], unique=False)
+    # recommender seed sampling: a user's preferences with timestamps
+    op.create_index('ix_user_preference_items_user_id_set_timestamp', 'user_preference_items', ['user_id', 'set_timestamp'], unique=False)
+    # ItemOut.product_images loads
+    op.create_index(op.f('ix_product_images_item_id'), 'product_images', ['item_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_product_images_item_id'), table_name='product_images')
+    op.drop_index('ix_user_preference_items_user_id_set_timestamp', table_name='user_preference_items')
+    op.drop_index('ix_user_like_items_user_id_like_timestamp', table_name='user_like_items')
+    op.drop_index('ix_item_outfit_outfit_id_item_id', table_name='item_outfit')
+    op.drop_index('ix_item_category_category_id_item_id', table_name='item_category')
@@ -0,0 +1,277 @@
+"""
+End-to-end swipe-session load generator.
+Simulates concurrent mobile users doing what the app's swipe and closet tabs do:
+  - fetch the personalized feed, then page through /items/feed when 4 cards are left,
+  - like or dislike each card after a think time (fire-and-forget, like the app),
+  - every few swipes open the closet (/likes/{user_id} and /likes/outfits/{user_id}).
+Runs one stage per concurrency level and reports throughput and p50/p95/p99 latency per route. The exit status is 1
+when any stage breaks the latency budget or error-rate limit, so stepping up --users finds the load at which the
+single-process deployment falls over.
+
+The simulated user ids must exist (e.g. a database built with `python -m scripts.load_catalog synthetic`):
+    python -m benchmarks.load_test --spawn-server --users 10 25 50 100 --duration 60 --p95-budget-ms 500
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+# httpx logs every request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class SessionProfile:
+    """Behaviour of one simulated user."""
+    think_time: float = 1.5         # mean seconds spent looking at a card (exponentially distributed)
+    like_rate: float = 0.3          # probability of a right swipe
+    closet_every: int = 20          # open the closet after this many swipes
+    refill_threshold: int = 4       # fetch more cards when this many are left, as the app does
+    send_etags: bool = False        # revalidate closet responses with If-None-Match
+
+
+class Recorder:
+    """Latency samples and error counts per route template."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.not_modified = 0
+
+    def record(self, route: str, seconds: float, ok: bool):
+        self.latencies.setdefault(route, []).append(seconds * 1000)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict:
+        routes = {}
+        total = 0
+        total_errors = 0
+        for route, samples in sorted(self.latencies.items()):
+            errors = self.errors.get(route, 0)
+            total += len(samples)
+            total_errors += errors
+            routes[route] = {
+                "requests": len(samples),
+                "errors": errors,
+                "rps": len(samples) / elapsed,
+                **_percentiles(samples),
+            }
+        return {
+            "elapsed_seconds": elapsed,
+            "requests": total,
+            "errors": total_errors,
+            "error_rate": total_errors / total if total else 0.0,
+            "rps": total / elapsed,
+            "not_modified": self.not_modified,
+            "routes": routes,
+        }
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50_ms": cuts[49], "p95_ms": cuts[94], "p99_ms": cuts[98]}
+
+
+class SimulatedUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, user_id: int, profile: SessionProfile, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.user_id = user_id
+        self.profile = profile
+        self.rng = rng
+        self.etags: Dict[str, str] = {}
+        self.background: set = set()
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        headers = {}
+        if self.profile.send_etags and method == "GET" and url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.recorder.record(route, time.perf_counter() - start, ok)
+        if not ok:
+            return None
+        if response.status_code == 304:
+            self.recorder.not_modified += 1
+        elif "etag" in response.headers:
+            self.etags[url] = response.headers["etag"]
+        return response
+
+    def fire_and_forget(self, route: str, method: str, url: str, **kwargs):
+        task = asyncio.create_task(self.request(route, method, url, **kwargs))
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+    async def open_closet(self):
+        await self.request("GET /likes/{user_id}", "GET", f"/likes/{self.user_id}")
+        await self.request("GET /likes/outfits/{user_id}", "GET", f"/likes/outfits/{self.user_id}")
+
+    async def run(self, deadline: float):
+        cards: List[str] = []
+        response = await self.request("POST /items/personalized-feed", "POST", "/items/personalized-feed", json={"user_id": self.user_id, "category_ids": []})
+        if response is not None:
+            cards.extend(item["id"] for item in response.json())
+
+        swipes = 0
+        while time.monotonic() < deadline:
+            if len(cards) <= self.profile.refill_threshold:
+                response = await self.request("GET /items/feed", "GET", "/items/feed")
+                if response is not None:
+                    cards.extend(item["id"] for item in response.json())
+            if not cards:
+                await asyncio.sleep(self.profile.think_time)
+                continue
+
+            item_id = cards.pop(0)
+            await asyncio.sleep(self.rng.expovariate(1.0 / self.profile.think_time))
+            if time.monotonic() >= deadline:
+                break
+            payload = {"user_id": self.user_id, "item_id": item_id}
+            if self.rng.random() < self.profile.like_rate:
+                self.fire_and_forget("POST /likes/", "POST", "/likes/", json=payload)
+            else:
+                self.fire_and_forget("POST /dislikes/", "POST", "/dislikes/", json=payload)
+
+            swipes += 1
+            if swipes % self.profile.closet_every == 0:
+                await self.open_closet()
+
+        if self.background:
+            await asyncio.gather(*self.background, return_exceptions=True)
+
+
+async def run_stage(base_url: str, n_users: int, user_ids: List[int], duration: float, ramp_up: float, profile: SessionProfile, seed: int, timeout: float) -> Dict:
+    """Run n_users concurrent sessions for `duration` seconds (after a linear ramp-up) and summarize."""
+    recorder = Recorder()
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=n_users * 2, max_keepalive_connections=n_users * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.monotonic()
+        deadline = start + ramp_up + duration
+
+        async def session(index: int):
+            await asyncio.sleep(ramp_up * index / max(n_users, 1))
+            user = SimulatedUser(client, recorder, rng.choice(user_ids), profile, random.Random(rng.random()))
+            await user.run(deadline)
+
+        await asyncio.gather(*(session(i) for i in range(n_users)))
+        elapsed = time.monotonic() - start
+    return recorder.summary(elapsed)
+
+
+def check_budget(stage: Dict, p95_budget_ms: Optional[float], p99_budget_ms: Optional[float], max_error_rate: float) -> List[str]:
+    """Return the budget violations of a stage summary."""
+    violations = []
+    if stage["error_rate"] > max_error_rate:
+        violations.append(f"error rate {stage['error_rate']:.1%} > {max_error_rate:.1%}")
+    for route, stats in stage["routes"].items():
+        if p95_budget_ms is not None and stats["p95_ms"] > p95_budget_ms:
+            violations.append(f"{route} p95 {stats['p95_ms']:.0f}ms > {p95_budget_ms:.0f}ms")
+        if p99_budget_ms is not None and stats["p99_ms"] > p99_budget_ms:
+            violations.append(f"{route} p99 {stats['p99_ms']:.0f}ms > {p99_budget_ms:.0f}ms")
+    return violations
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """Start `uvicorn main:app` the way the Procfile does (one process) and wait until it answers."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready within 60s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn-server", action="store_true", help="Start a local single-process uvicorn main:app to test against")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --spawn-server")
+    parser.add_argument("--users", type=int, nargs="+", default=[10], help="Concurrent users; one stage per value")
+    parser.add_argument("--user-ids", default="1-1000", help="Range of existing user ids to simulate, e.g. 1-1000")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds per stage after ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=10)
+    parser.add_argument("--think-time", type=float, default=1.5)
+    parser.add_argument("--like-rate", type=float, default=0.3)
+    parser.add_argument("--closet-every", type=int, default=20)
+    parser.add_argument("--etags", action="store_true", help="Revalidate closet responses with If-None-Match")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--p95-budget-ms", type=float)
+    parser.add_argument("--p99-budget-ms", type=float)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load_test_report.json")
+    args = parser.parse_args(argv)
+
+    first, _, last = args.user_ids.partition("-")
+    user_ids = list(range(int(first), int(last or first) + 1))
+    profile = SessionProfile(think_time=args.think_time, like_rate=args.like_rate, closet_every=args.closet_every, send_etags=args.etags)
+
+    server = spawn_server(args.port) if args.spawn_server else None
+    base_url = f"http://127.0.0.1:{args.port}" if server else args.base_url
+    stages = []
+    try:
+        for n_users in args.users:
+            logger.info(f"Stage: {n_users} concurrent users for {args.duration:.0f}s against {base_url}")
+            stage = asyncio.run(run_stage(base_url, n_users, user_ids, args.duration, args.ramp_up, profile, args.seed, args.timeout))
+            stage["users"] = n_users
+            stage["violations"] = check_budget(stage, args.p95_budget_ms, args.p99_budget_ms, args.max_error_rate)
+            stages.append(stage)
+            logger.info(f"  {stage['rps']:.1f} req/s, error rate {stage['error_rate']:.1%}")
+            for route, stats in stage["routes"].items():
+                logger.info(f"  {route}: {stats['requests']} req, p50={stats['p50_ms']:.0f}ms p95={stats['p95_ms']:.0f}ms p99={stats['p99_ms']:.0f}ms")
+            for violation in stage["violations"]:
+                logger.warning(f"  over budget: {violation}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    within_budget = [stage for stage in stages if not stage["violations"]]
+    report = {
+        "base_url": base_url,
+        "profile": vars(profile),
+        "stages": stages,
+        "max_users_within_budget": max((s["users"] for s in within_budget), default=None),
+        "max_rps_within_budget": max((s["rps"] for s in within_budget), default=None),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote load test report to {args.output}")
+    return 1 if len(within_budget) < len(stages) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Micro-benchmark of decoding Shopbop listing pages into ProductInfo.
+Compares the typed path the sync uses (msgspec structs decoded from the response bytes, slotted ProductInfo) with the
+previous one (response.json() dict trees walked by hand into a ProductInfo with a __dict__), on a synthetic page
+shaped like a browse response: every product carries the colors, images and sizes the API returns, most of which the
+sync never reads. Reports parse throughput, and per 1k products the peak memory while decoding, the memory held by
+the decoded response (what a queued page costs in scripts/sync_pipeline.py) and by the resulting ProductInfos.
+
+    python -m benchmarks.payload_decode --products 1000 --repeat 20
+"""
+import argparse
+import gc
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from scripts.sync_items import ProductInfo
+from services.shopbop_api import _BROWSE_DECODER
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_browse_page(products: int, seed: int = 0) -> bytes:
+    """JSON body of a synthetic browse-by-category response with the given number of products."""
+    rng = random.Random(seed)
+    page = {"metadata": {"totalCount": products * 10, "offset": 0, "limit": products}, "products": []}
+    for i in range(products):
+        sin = f"SYN{seed}-{i:07d}"
+        colors = []
+        for c in range(rng.randint(1, 4)):
+            colors.append({
+                "colorSin": f"{sin}-C{c}",
+                "name": rng.choice(["Black", "Ivory", "Navy", "Blush", "Olive", "Camel"]),
+                "swatch": {"src": f"/prod/products/{sin.lower()}/{c}_swatch.jpg", "width": 30, "height": 30},
+                "inStock": rng.random() < 0.8,
+                "images": [
+                    {"src": f"/prod/products/{sin.lower()}/{c}_{n}.jpg", "type": "PRODUCT", "width": 1140, "height": 1520, "index": n}
+                    for n in range(rng.randint(3, 6))
+                ],
+                "sizes": [
+                    {"sizeSin": f"{sin}-C{c}-S{s}", "label": label, "inStock": rng.random() < 0.7, "quantity": rng.randint(0, 20)}
+                    for s, label in enumerate(["XS", "S", "M", "L", "XL"])
+                ],
+            })
+        page["products"].append({
+            "product": {
+                "productSin": sin,
+                "productCode": f"CODE{i}",
+                "shortDescription": f"Synthetic product {i} with a reasonably long marketing description",
+                "longDescription": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4,
+                "productDetailUrl": f"/synthetic-product-{i}/vp/v=1/{sin}.htm",
+                "designerName": f"Designer {rng.randint(1, 500)}",
+                "designerCode": f"DSGN{rng.randint(1, 500)}",
+                "retailPrice": {"price": f"${rng.randint(50, 900)}.00", "priceInCents": rng.randint(5000, 90000), "currencyCode": "USD"},
+                "clearance": False,
+                "inStock": True,
+                "defaultColorSin": colors[0]["colorSin"],
+                "colors": colors,
+                "badges": [{"type": "NEW", "label": "New Arrival"}],
+                "displayStretchAmount": rng.choice([None, "No Stretch", "Slight Stretch", "Very Stretchy"]),
+                "sizeChart": {"id": rng.randint(1, 50), "name": "Womens Apparel"},
+            }
+        })
+    return json.dumps(page).encode("utf-8")
+
+
+"""
+The previous decoding path, kept here as the baseline
+"""
+class DictProductInfo:
+    def __init__(self, product_sin, short_description, image_url_suffix=None, product_detail_url=None, designer_name=None,
+                 price=None, color=None, stretch=None, product_images=[]):
+        self.product_sin = product_sin
+        self.short_description = short_description
+        self.image_url_suffix = image_url_suffix
+        self.product_detail_url = product_detail_url
+        self.designer_name = designer_name
+        self.price = price
+        self.color = color
+        self.stretch = stretch
+        self.product_images = product_images
+
+
+def dict_product_info(product: Dict) -> DictProductInfo:
+    default_color_sin = product.get("defaultColorSin")
+    colors = product.get("colors", [])
+    default_color = None
+    if colors:
+        for color in colors:
+            if color.get("colorSin") == default_color_sin:
+                default_color = color
+                break
+        if not default_color:
+            for color in colors:
+                if color.get("inStock") is True:
+                    default_color = color
+                    break
+        if not default_color and colors[0]["images"]:
+            default_color = colors[0]
+        if not default_color or not default_color.get("images"):
+            default_color = None
+    return DictProductInfo(
+        product_sin=product["productSin"],
+        short_description=product["shortDescription"],
+        image_url_suffix=default_color["images"][0]["src"] if default_color else None,
+        product_detail_url=product["productDetailUrl"],
+        designer_name=product["designerName"],
+        price=product["retailPrice"]["price"],
+        color=default_color["name"] if default_color else None,
+        stretch=product.get("displayStretchAmount", None),
+        product_images=[img["src"] for img in default_color["images"]] if default_color else [],
+    )
+
+
+DECODERS: Dict[str, Callable[[bytes], object]] = {
+    "dict": json.loads,
+    "struct": _BROWSE_DECODER.decode,
+}
+CONVERTERS: Dict[str, Callable[[object], List]] = {
+    "dict": lambda response: [dict_product_info(listing["product"]) for listing in response.get("products", [])],
+    "struct": lambda response: [ProductInfo.from_product(listing.product) for listing in response.products],
+}
+
+
+def _allocated(build: Callable[[], object]):
+    """Peak and retained traced memory (bytes) of building an object, and the object."""
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - start, current - start, result
+
+
+def measure(name: str, body: bytes, products: int, repeat: int) -> Dict:
+    decode, convert = DECODERS[name], CONVERTERS[name]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convert(decode(body))
+        timings.append(time.perf_counter() - start)
+    per_1k = 1000 / products
+
+    peak, _, _ = _allocated(lambda: convert(decode(body)))
+    _, response_bytes, response = _allocated(lambda: decode(body))
+    _, infos_bytes, infos = _allocated(lambda: convert(response))
+    del response
+    assert len(infos) == products
+    return {
+        "path": name,
+        "products_per_second": products / statistics.median(timings),
+        "median_ms_per_1k": statistics.median(timings) * 1000 * per_1k,
+        "peak_kb_per_1k": peak / 1024 * per_1k,
+        "decoded_response_kb_per_1k": response_bytes / 1024 * per_1k,
+        "product_infos_kb_per_1k": infos_bytes / 1024 * per_1k,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1000, help="Products in the synthetic page")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    body = make_browse_page(args.products)
+    logger.info(f"Synthetic page: {args.products} products, {len(body) / 1024:.0f}KB of JSON")
+    results = [measure(name, body, args.products, args.repeat) for name in DECODERS]
+    for result in results:
+        logger.info(
+            f"{result['path']:>6}: {result['products_per_second']:,.0f} products/s ({result['median_ms_per_1k']:.1f}ms per 1k), "
+            f"per 1k products: peak {result['peak_kb_per_1k']:,.0f}KB, decoded response {result['decoded_response_kb_per_1k']:,.0f}KB, "
+            f"ProductInfos {result['product_infos_kb_per_1k']:,.0f}KB"
+        )
+    baseline, typed = results
+    logger.info(
+        f"struct vs dict: {typed['products_per_second'] / baseline['products_per_second']:.1f}x throughput, "
+        f"{baseline['peak_kb_per_1k'] / typed['peak_kb_per_1k']:.1f}x less peak memory"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"products": args.products, "page_kb": len(body) / 1024, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Micro-benchmarks for the crud and recommender hot paths on a synthetic catalog.
+For each scale the database is wiped and re-seeded, then every operation is timed over random users/items and the
+latency percentiles are written to a JSON report. Pass a previous report as --baseline to fail (exit status 1) when
+an operation's p50 regresses by more than --max-regression.
+
+The database is TRUNCATED at every scale, so point --database-url at a local throwaway database:
+    python -m benchmarks.run --database-url postgresql://localhost/bop_bench --scales 10000 100000 1000000
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.synthetic import CatalogSpec, SyntheticCatalog, create_schema, seed_catalog
+from crud import item as crud_item, like_dislike_items as crud_likes
+from recommender import recommender
+from recommender.seed_sampler import recency_seed_sampler, uniform_seed_sampler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCALES = [10000, 100000, 1000000]
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def time_operation(run: Callable[[], object], iterations: int, warmup: int) -> Dict[str, float]:
+    """Run an operation warmup + iterations times and summarize the timed iterations in milliseconds."""
+    for _ in range(warmup):
+        run()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(samples),
+        "min_ms": samples[0],
+        "p50_ms": _percentile(samples, 0.50),
+        "p95_ms": _percentile(samples, 0.95),
+        "p99_ms": _percentile(samples, 0.99),
+        "max_ms": samples[-1],
+    }
+
+
+def operations(session_factory, catalog: SyntheticCatalog, rng: random.Random) -> Dict[str, Callable[[], object]]:
+    """The benchmarked operations. Each call picks a random user/item/category and uses a fresh session."""
+    leaf_category_ids = catalog.category_ids[1:]
+
+    def with_session(fn):
+        def run():
+            db = session_factory()
+            try:
+                return fn(db)
+            finally:
+                db.close()
+        return run
+
+    def personalized_feed(db):
+        return recommender.get_personalized_item_feed_for_user(db, user_id=rng.choice(catalog.user_ids), category_ids=[], limit=10)
+
+    def similar_unseen(db):
+        return crud_item.get_similar_unseen_items_for_user(
+            db, item_id=rng.choice(catalog.item_ids), user_id=rng.choice(catalog.user_ids), top_k=10,
+            category_ids=[rng.choice(leaf_category_ids)],
+        )
+
+    def categories_filter(db):
+        return crud_item.get_items_by_categories_filter(db, [rng.choice(leaf_category_ids)], limit=10)
+
+    def like(db):
+        return crud_likes.like_item(db, user_id=rng.choice(catalog.user_ids), item_id=rng.choice(catalog.item_ids))
+
+    def dislike(db):
+        return crud_likes.dislike_item(db, user_id=rng.choice(catalog.user_ids), item_id=rng.choice(catalog.item_ids))
+
+    return {
+        "get_personalized_item_feed_for_user": with_session(personalized_feed),
+        "get_similar_unseen_items_for_user": with_session(similar_unseen),
+        "get_items_by_categories_filter": with_session(categories_filter),
+        "like_item": with_session(like),
+        "dislike_item": with_session(dislike),
+    }
+
+
+def run_scale(engine, n_items: int, args) -> Dict:
+    spec = CatalogSpec(n_items=n_items, n_users=args.users, seed=args.seed)
+    start = time.perf_counter()
+    catalog = seed_catalog(engine, spec)
+    seed_seconds = time.perf_counter() - start
+    logger.info(f"Seeded {n_items} items in {seed_seconds:.1f}s")
+    # Re-seeding restarts every user's interaction version, so cached seed arrays from the previous scale are stale
+    recency_seed_sampler.clear()
+    uniform_seed_sampler.clear()
+
+    session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    rng = random.Random(args.seed)
+    results = {}
+    for name, run in operations(session_factory, catalog, rng).items():
+        results[name] = time_operation(run, iterations=args.iterations, warmup=args.warmup)
+        logger.info(f"[{n_items}] {name}: p50={results[name]['p50_ms']:.2f}ms p95={results[name]['p95_ms']:.2f}ms")
+    return {"seed_seconds": seed_seconds, "spec": vars(spec), "operations": results}
+
+
+def _environment(engine) -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    with engine.connect() as conn:
+        postgres_version = conn.execute(text("SHOW server_version")).scalar()
+    return {"git_commit": commit, "python": platform.python_version(), "postgres": postgres_version, "machine": platform.machine()}
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Return a description of every operation whose p50 grew by more than max_regression (a fraction)."""
+    regressions = []
+    for scale, result in report["scales"].items():
+        baseline_ops = baseline.get("scales", {}).get(scale, {}).get("operations", {})
+        for name, stats in result["operations"].items():
+            if name not in baseline_ops:
+                continue
+            before, after = baseline_ops[name]["p50_ms"], stats["p50_ms"]
+            if before > 0 and (after - before) / before > max_regression:
+                regressions.append(f"{name} at {scale} items: p50 {before:.2f}ms -> {after:.2f}ms")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCHMARK_DATABASE_URL"), help="Throwaway database to seed (default: $BENCHMARK_DATABASE_URL)")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="Catalog sizes (number of items)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--baseline", help="Previous report to compare p50 latencies against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p50 growth over the baseline, as a fraction")
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("--database-url or BENCHMARK_DATABASE_URL is required")
+
+    engine = create_engine(args.database_url, future=True)
+    create_schema(engine)
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "environment": _environment(engine),
+        "scales": {str(n_items): run_scale(engine, n_items, args) for n_items in args.scales},
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote benchmark report to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report, json.load(f), args.max_regression)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
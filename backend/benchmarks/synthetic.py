@@ -0,0 +1,202 @@
+"""
+Synthetic catalog for benchmarks: items with product images and random 768-d vectors, a category tree under the
+clothing root, outfits, and users with heavy-tailed like/dislike histories.
+Generation is deterministic for a given seed, so two runs at the same scale benchmark the same data.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.facets import item_facets
+from crud.category_facets import refresh_category_facet_counts
+from crud.item import category_ids_refresh
+from db.base import Base
+from db.indexes import deferred_indexes
+import models  # noqa: F401  registers every table on Base
+from models.associations import category_closure, item_category, item_outfit, user_dislike_items, UserLikeItems, UserPreferenceItems
+from models.category import Category
+from models.item import Item
+from models.outfit import Outfit
+from models.user import User
+from scripts.load_catalog import analyze, copy_rows
+
+logger = logging.getLogger(__name__)
+
+# The recommender falls back to this category when the request has no filter, so every item belongs to it
+ROOT_CATEGORY_ID = "13266"
+EMBEDDING_DIM = 768
+
+
+# Words of the synthetic item names, so that search queries match realistic fractions of the catalog
+_NAME_STYLES = ["Relaxed", "Cropped", "Oversized", "Slim", "Wrap", "Pleated", "Ribbed", "Belted", "Tiered", "Draped", "Fitted"]
+_NAME_MATERIALS = ["Linen", "Silk", "Cotton", "Wool", "Cashmere", "Denim", "Leather", "Satin", "Jersey", "Velvet", "Crepe", "Knit", "Tweed"]
+_NAME_GARMENTS = ["Dress", "Midi Dress", "Maxi Skirt", "Blazer", "Cardigan", "Sweater", "Trousers", "Jeans", "Shirt",
+                  "Blouse", "Tank", "Jumpsuit", "Coat", "Jacket", "Shorts", "Mini Skirt", "Bodysuit"]
+
+
+def _item_name(i: int) -> str:
+    return f"{_NAME_STYLES[i % len(_NAME_STYLES)]} {_NAME_MATERIALS[i % len(_NAME_MATERIALS)]} {_NAME_GARMENTS[i % len(_NAME_GARMENTS)]}"
+
+
+@dataclass
+class CatalogSpec:
+    """Shape of a synthetic catalog. Everything except n_items has a sensible default."""
+    n_items: int
+    n_categories: int = 200
+    n_users: int = 1000
+    items_per_outfit: int = 4
+    outfit_ratio: float = 0.1
+    images_per_item: int = 4
+    mean_likes_per_user: int = 50
+    max_likes_per_user: int = 2000
+    dislike_ratio: float = 1.5
+    with_vectors: bool = True
+    seed: int = 42
+
+
+class SyntheticCatalog:
+    """Generates the rows of every table for a CatalogSpec."""
+
+    def __init__(self, spec: CatalogSpec):
+        self.spec = spec
+        self.rng = np.random.default_rng(spec.seed)
+        self.item_ids = [str(1500000000 + i) for i in range(spec.n_items)]
+        self.category_ids = [ROOT_CATEGORY_ID] + [str(20000 + i) for i in range(spec.n_categories)]
+        self.outfit_ids = [f"o{i}" for i in range(max(1, int(spec.n_items * spec.outfit_ratio)))]
+        self.user_ids = list(range(1, spec.n_users + 1))
+        # Category popularity is skewed, like the real catalog
+        popularity = 1.0 / np.arange(1, spec.n_categories + 1)
+        self._category_p = popularity / popularity.sum()
+        self._now = datetime.now(timezone.utc)
+
+    def categories(self) -> Iterator[Dict]:
+        yield {"id": ROOT_CATEGORY_ID, "name": "Clothing", "itemCount": self.spec.n_items}
+        for i, category_id in enumerate(self.category_ids[1:]):
+            yield {"id": category_id, "name": f"Category {i}", "itemCount": 0}
+
+    def items(self) -> Iterator[Dict]:
+        colors = ["Black", "White", "Red", "Blue", "Green", "Beige", "Pink", "Navy", "Brown", "Grey"]
+        for i, item_id in enumerate(self.item_ids):
+            row = {
+                "id": item_id,
+                "name": _item_name(i),
+                "image_url_suffix": f"/prod/products/syn/{item_id}_1.jpg",
+                "product_detail_url": f"/synthetic-item-{i}/vp/v=1/{item_id}.htm",
+                "designer_name": f"Designer {i % 500}",
+                "price": f"${int(self.rng.integers(30, 1500))}.00",
+                "color": colors[i % len(colors)],
+                "stretch": None,
+                "content_version": 0,
+                "product_images": [f"/prod/products/syn/{item_id}_{n + 1}.jpg" for n in range(self.spec.images_per_item)],
+            }
+            row.update(item_facets(row["price"], row["designer_name"], row["color"]))
+            if self.spec.with_vectors:
+                vector = self.rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+                row["detailed_embedding"] = vector / np.linalg.norm(vector)
+            yield row
+
+    def category_closure(self) -> Iterator[Dict]:
+        # Every leaf sits directly under the root
+        for category_id in self.category_ids:
+            yield {"ancestor_id": category_id, "descendant_id": category_id, "depth": 0}
+        for category_id in self.category_ids[1:]:
+            yield {"ancestor_id": ROOT_CATEGORY_ID, "descendant_id": category_id, "depth": 1}
+
+    def item_categories(self) -> Iterator[Dict]:
+        # Leaf links only, like the catalog sync; the root comes from the closure
+        leaf_ids = self.category_ids[1:]
+        picks = self.rng.choice(len(leaf_ids), size=(len(self.item_ids), 2), p=self._category_p)
+        for item_id, item_picks in zip(self.item_ids, picks.tolist()):
+            for index in set(item_picks):
+                yield {"item_id": item_id, "category_id": leaf_ids[index]}
+
+    def outfits(self) -> Iterator[Dict]:
+        for outfit_id in self.outfit_ids:
+            yield {"id": outfit_id, "image_url_suffix": f"/prod/outfits/syn/{outfit_id}.jpg"}
+
+    def item_outfits(self) -> Iterator[Dict]:
+        for outfit_id in self.outfit_ids:
+            for index in set(self.rng.integers(0, len(self.item_ids), size=self.spec.items_per_outfit).tolist()):
+                yield {"item_id": self.item_ids[index], "outfit_id": outfit_id}
+
+    def users(self) -> Iterator[Dict]:
+        for user_id in self.user_ids:
+            yield {"id": user_id, "username": f"bench_user_{user_id}", "hashed_password": "", "is_new_user": False, "interaction_version": 0, "preference_version": 0}
+
+    def _history_size(self) -> int:
+        # Geometric sizes give many light users and a long tail of heavy ones
+        size = int(self.rng.geometric(1.0 / self.spec.mean_likes_per_user))
+        return min(size, self.spec.max_likes_per_user, len(self.item_ids))
+
+    def interactions(self) -> Iterator[Dict]:
+        """Yield like rows (which also become preference rows) and dislike rows, tagged by 'kind'."""
+        for user_id in self.user_ids:
+            n_likes = self._history_size()
+            n_dislikes = min(int(n_likes * self.spec.dislike_ratio), len(self.item_ids) - n_likes)
+            picked = self.rng.choice(len(self.item_ids), size=n_likes + n_dislikes, replace=False)
+            ages = np.sort(self.rng.exponential(30 * 24 * 3600, size=n_likes))
+            for index, age in zip(picked[:n_likes], ages):
+                yield {"kind": "like", "user_id": user_id, "item_id": self.item_ids[index], "timestamp": self._now - timedelta(seconds=float(age))}
+            for index in picked[n_likes:]:
+                yield {"kind": "dislike", "user_id": user_id, "item_id": self.item_ids[index]}
+
+
+def create_schema(engine):
+    """Create the pgvector and pg_trgm extensions and every table/index declared on the models, if missing."""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.create_all(engine)
+
+
+_CATALOG_TABLES = [
+    "user_like_outfits", "user_dislike_items", "user_like_items", "user_preference_items",
+    "item_outfit", "item_category", "outfits", "items", "category_closure", "categories", "users",
+]
+
+
+def clear_catalog(conn):
+    """Empty every table the synthetic catalog writes to."""
+    conn.execute(text(f"TRUNCATE {', '.join(_CATALOG_TABLES)} RESTART IDENTITY CASCADE"))
+
+
+def seed_catalog(engine, spec: CatalogSpec) -> SyntheticCatalog:
+    """Replace the contents of the database with a synthetic catalog (streamed in with binary COPY) and return it."""
+    catalog = SyntheticCatalog(spec)
+    with engine.begin() as conn:
+        clear_catalog(conn)
+
+        def insert(table, rows):
+            count = copy_rows(conn, table, rows)
+            logger.info(f"Inserted {count} rows into {table.name}")
+
+        with deferred_indexes(conn, _CATALOG_TABLES):
+            insert(Category.__table__, catalog.categories())
+            insert(category_closure, catalog.category_closure())
+            insert(Item.__table__, catalog.items())
+            insert(item_category, catalog.item_categories())
+            conn.execute(category_ids_refresh())
+            insert(Outfit.__table__, catalog.outfits())
+            insert(item_outfit, catalog.item_outfits())
+            insert(User.__table__, catalog.users())
+
+            likes, dislikes = [], []
+            for row in catalog.interactions():
+                if row["kind"] == "like":
+                    likes.append({"user_id": row["user_id"], "item_id": row["item_id"], "like_timestamp": row["timestamp"]})
+                else:
+                    dislikes.append({"user_id": row["user_id"], "item_id": row["item_id"]})
+            insert(UserLikeItems.__table__, iter(likes))
+            insert(UserPreferenceItems.__table__, ({"user_id": r["user_id"], "item_id": r["item_id"], "set_timestamp": r["like_timestamp"]} for r in likes))
+            insert(user_dislike_items, iter(dislikes))
+        conn.execute(text("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))"))
+    with Session(engine) as db:
+        refresh_category_facet_counts(db)
+
+    analyze(engine)
+    return catalog
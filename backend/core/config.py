@@ -1,7 +1,16 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    ITEM_CARD_CACHE_SIZE: int = 50000
+    QUERY_EMBEDDING_CACHE_SIZE: int = 10000
+    # Load the query embedding model at startup and serve /items/semantic-search (see core/query_embeddings.py)
+    SEMANTIC_SEARCH_ENABLED: bool = False
+    SERVER_TIMING_HEADERS: bool = False
+    SLOW_QUERY_MS: Optional[float] = None
+    SLOW_QUERY_EXPLAIN_RATE: float = 0.1
+    SLOW_QUERY_LOG_PATH: str = "slow_queries.log"
 
     class Config:
         env_file = ".env"
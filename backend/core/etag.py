@@ -0,0 +1,41 @@
+"""
+Conditional GET support for per-user endpoints (closet, preferences, dislikes).
+Their content only changes on the user's own like/dislike/preference writes, each of which bumps
+users.interaction_version, so the version alone is a valid ETag and checking it costs one primary-key lookup.
+"""
+from typing import Optional
+from fastapi import Request, Response, status
+
+from crud import user as crud_user
+
+
+def user_interaction_etag(user_id: int, version: int) -> str:
+    """Build the weak ETag for a user's interaction version."""
+    return f'W/"u{user_id}-v{version}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header value against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def check_user_etag(db, request: Request, response: Response, user_id: int) -> Optional[Response]:
+    """
+    Tag the response with the user's interaction ETag.
+    Returns a 304 response if the client's If-None-Match already matches it, otherwise None and the endpoint carries on.
+    If the user does not exist nothing is tagged, so the endpoint keeps its own not-found handling.
+    """
+    version = crud_user.get_interaction_version(db, user_id)
+    if version is None:
+        return None
+
+    etag = user_interaction_etag(user_id, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,90 @@
+"""
+Normalized facet values of an item, derived from the free-text listing fields the Shopbop API returns.
+The catalog stores price as a display string ("$1,025.00"), and designer and colour as names ("Free People",
+"Dusty Rose"); the feed filters and facet counts need values that compare and group exactly. Every function is
+deterministic on the stored listing fields, so facets can be recomputed from the items table at any time.
+"""
+import re
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+_PRICE = re.compile(r"(\d[\d,]*)(?:\.(\d{1,2}))?")
+_NOT_SLUG = re.compile(r"[^a-z0-9]+")
+_WORD = re.compile(r"[a-z]+")
+
+# Colour families by keyword. A name is matched word by word from the end ("Light Blue" -> blue, "Navy Stripe" -> multi),
+# and any pattern word makes the whole colour multi
+COLOR_FAMILIES: Dict[str, str] = {
+    **dict.fromkeys(["black", "jet", "onyx", "ebony", "noir"], "black"),
+    **dict.fromkeys(["white", "ivory", "cream", "ecru", "off", "bone", "chalk", "pearl", "snow"], "white"),
+    **dict.fromkeys(["grey", "gray", "charcoal", "slate", "heather", "ash", "smoke", "pewter"], "grey"),
+    **dict.fromkeys(["beige", "nude", "sand", "khaki", "oatmeal", "natural", "stone", "taupe", "champagne", "neutral"], "beige"),
+    **dict.fromkeys(["brown", "camel", "tan", "chocolate", "cognac", "mocha", "espresso", "caramel", "coffee", "toffee", "rust", "chestnut", "cinnamon"], "brown"),
+    **dict.fromkeys(["red", "burgundy", "wine", "cherry", "scarlet", "crimson", "maroon", "oxblood", "merlot", "brick"], "red"),
+    **dict.fromkeys(["pink", "blush", "rose", "fuchsia", "magenta", "coral", "salmon", "peach", "mauve"], "pink"),
+    **dict.fromkeys(["orange", "tangerine", "apricot", "terracotta", "amber"], "orange"),
+    **dict.fromkeys(["yellow", "lemon", "mustard", "butter", "canary", "marigold"], "yellow"),
+    **dict.fromkeys(["green", "olive", "sage", "emerald", "mint", "forest", "lime", "jade", "moss", "army", "hunter", "pistachio"], "green"),
+    **dict.fromkeys(["blue", "navy", "denim", "indigo", "cobalt", "teal", "turquoise", "aqua", "sky", "azure", "royal", "chambray", "cerulean", "wash"], "blue"),
+    **dict.fromkeys(["purple", "lilac", "lavender", "violet", "plum", "orchid", "grape", "eggplant", "aubergine"], "purple"),
+    **dict.fromkeys(["gold", "silver", "metallic", "bronze", "copper", "gunmetal"], "metallic"),
+}
+_MULTI_WORDS = {"multi", "multicolor", "print", "floral", "stripe", "striped", "plaid", "check", "leopard", "animal",
+                "paisley", "tie", "dye", "camo", "polka", "dot", "geo", "abstract", "combo", "snake", "zebra"}
+COLOR_FAMILY_NAMES = sorted(set(COLOR_FAMILIES.values()) | {"multi", "other"})
+
+
+def price_to_cents(price: Optional[str]) -> Optional[int]:
+    """Cents of a display price ("$1,025.50" -> 102550). The first amount of a range counts; None when there is no amount."""
+    if not price:
+        return None
+    match = _PRICE.search(price)
+    if not match:
+        return None
+    whole, fraction = match.groups()
+    return int(whole.replace(",", "")) * 100 + int((fraction or "0").ljust(2, "0"))
+
+
+def designer_id(designer_name: Optional[str]) -> Optional[str]:
+    """Stable id of a designer: its name ASCII-folded and slugified ("Chloé" -> "chloe", "Free People" -> "free-people")."""
+    if not designer_name:
+        return None
+    folded = unicodedata.normalize("NFKD", designer_name).encode("ascii", "ignore").decode("ascii")
+    slug = _NOT_SLUG.sub("-", folded.lower()).strip("-")
+    return slug or None
+
+
+def color_family(color: Optional[str]) -> Optional[str]:
+    """Colour family of a colour name, "other" when no word is known; None without a colour."""
+    if not color:
+        return None
+    words = _WORD.findall(color.lower())
+    if not words:
+        return None
+    if any(word in _MULTI_WORDS for word in words):
+        return "multi"
+    for word in reversed(words):
+        if word in COLOR_FAMILIES:
+            return COLOR_FAMILIES[word]
+    return "other"
+
+
+def item_facets(price: Optional[str], designer_name: Optional[str], color: Optional[str]) -> Dict[str, Optional[object]]:
+    """The facet columns of an item with these listing fields, as keyword arguments for Item."""
+    return {
+        "price_cents": price_to_cents(price),
+        "designer_id": designer_id(designer_name),
+        "color_family": color_family(color),
+    }
+
+
+# Lower bounds (in cents) of the price buckets counted per category; the last bucket has no upper bound
+PRICE_BUCKET_BOUNDS = [0, 10000, 25000, 50000, 100000, 200000]
+
+
+def price_bucket_range(lower_cents: int) -> Tuple[int, Optional[int]]:
+    """(min, max) price in cents of the bucket starting at lower_cents, both inclusive like the feed's price filter."""
+    index = PRICE_BUCKET_BOUNDS.index(lower_cents)
+    if index + 1 == len(PRICE_BUCKET_BOUNDS):
+        return lower_cents, None
+    return lower_cents, PRICE_BUCKET_BOUNDS[index + 1] - 1
@@ -0,0 +1,61 @@
+"""
+Cache of pre-serialized item cards for the feed endpoints.
+Validating Item rows through ItemOut and JSON-encoding them is the bulk of the CPU spent on a feed response, and
+popular items are rendered over and over. Each card is serialized once per
+(item id, content_version) and feed responses are assembled by joining the cached JSON fragments.
+"""
+import threading
+from collections import OrderedDict
+from typing import Iterable, Tuple
+
+from fastapi import Response
+
+from core.config import settings
+from models.item import Item
+from schemas.item import ItemOut
+
+
+class ItemCardCache:
+    """Thread-safe LRU of ItemOut JSON bytes keyed by (item id, content_version)."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._cards: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_card(self, item: Item) -> bytes:
+        """Return the JSON card for an item, serializing it on a miss."""
+        key = (item.id, item.content_version or 0)
+        with self._lock:
+            card = self._cards.get(key)
+            if card is not None:
+                self._cards.move_to_end(key)
+                self.hits += 1
+                return card
+            self.misses += 1
+
+        card = ItemOut.model_validate(item).model_dump_json().encode("utf-8")
+        with self._lock:
+            self._cards[key] = card
+            # Cards of older content versions are never requested again and simply age out
+            while len(self._cards) > self.max_size:
+                self._cards.popitem(last=False)
+        return card
+
+    def render(self, items: Iterable[Item]) -> bytes:
+        """Render a JSON array of item cards."""
+        return b"[" + b",".join(self.get_card(item) for item in items) + b"]"
+
+    def clear(self):
+        with self._lock:
+            self._cards.clear()
+
+
+item_card_cache = ItemCardCache(max_size=settings.ITEM_CARD_CACHE_SIZE)
+
+
+def item_cards_response(items: Iterable[Item]) -> Response:
+    """Build a JSON response equivalent to returning List[ItemOut], from cached cards."""
+    return Response(content=item_card_cache.render(items), media_type="application/json")
@@ -0,0 +1,94 @@
+"""
+Cache of search query embeddings for the semantic search endpoint.
+Item vectors (detailed_embedding) come from all-mpnet-base-v2, so a free-text query embedded with the same model
+can be searched against them directly. Model inference is by far the slowest step of a semantic search, and most
+queries repeat, so each normalized query string is embedded once and kept in an LRU.
+Loading the model imports torch and takes far longer and far more memory than the rest of the API, so it is never
+loaded on the request path: instances that serve semantic search set SEMANTIC_SEARCH_ENABLED and load it at startup
+(main.py), outside the cold-start budget of benchmarks/startup.py.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from core.config import settings
+
+# Must be the model scripts/update_item_embeddings.py embeds the items with
+EMBEDDING_MODEL_NAME = "all-mpnet-base-v2"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Cache key of a query: lowercased, with runs of whitespace collapsed."""
+    return _WHITESPACE.sub(" ", query.strip().lower())
+
+
+def _load_model_encoder() -> Callable[[List[str]], np.ndarray]:
+    # Imported here: sentence-transformers (and torch) are only needed once a semantic search runs
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return model.encode
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU of query embeddings (float32 vectors) keyed by normalized query. Misses are encoded with the
+    model loaded by load_model(), or with encoder if one is passed, e.g. to share a model that is already loaded.
+    """
+
+    def __init__(self, max_size: int, encoder: Optional[Callable[[List[str]], np.ndarray]] = None):
+        self.max_size = max_size
+        self._encoder = encoder
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._encoder_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._encoder is not None
+
+    def load_model(self):
+        """Load the embedding model if no encoder is set yet. Blocks for the whole load; call it at startup."""
+        with self._encoder_lock:
+            if self._encoder is None:
+                self._encoder = _load_model_encoder()
+
+    def _encode(self, text: str) -> np.ndarray:
+        encoder = self._encoder
+        if encoder is None:
+            raise RuntimeError("Query embedding model is not loaded; call load_model() first")
+        return np.asarray(encoder([text])[0], dtype=np.float32)
+
+    def get(self, query: str) -> np.ndarray:
+        """Return the embedding of a query, running the model on a miss. Raises RuntimeError if no model is loaded."""
+        key = normalize_query(query)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        # Encoded outside the lock, so other queries are not held up; a query missed by two requests at once is encoded twice
+        vector = self._encode(key)
+        vector.setflags(write=False)
+        with self._lock:
+            self._vectors[key] = vector
+            while len(self._vectors) > self.max_size:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._vectors.clear()
+
+
+query_embedding_cache = QueryEmbeddingCache(max_size=settings.QUERY_EMBEDDING_CACHE_SIZE)
@@ -0,0 +1,141 @@
+"""
+Opt-in slow-query log.
+Statements slower than a threshold are written as JSON lines to a size-rotated local file, with their SQL normalized:
+string, number and vector literals are elided, so the 768-float vectors the kNN queries embed collapse to one
+fingerprint per query shape. For a sampled fraction of slow SELECTs the statement is re-run under
+EXPLAIN (ANALYZE, BUFFERS) on the same connection (inside a savepoint) and the plan is stored with the entry,
+which shows e.g. when a kNN query stopped using its index and fell back to a sequential scan.
+The re-run doubles the cost of the sampled statement, so keep the sample rate low in production.
+
+Read the log with `python -m scripts.slow_queries`.
+"""
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from core.timing import current_request_stats
+
+logger = logging.getLogger(__name__)
+
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+MAX_SQL_LENGTH = 4000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_VECTOR_LITERAL = re.compile(r"\[\s*-?[\d.]+(?:[eE][-+]?\d+)?(?:\s*,\s*-?[\d.]+(?:[eE][-+]?\d+)?)*\s*\]")
+_NUMBER_LITERAL = re.compile(r"(?<![\w%])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s)(?:\s*,\s*(?:\?|%\(\w+\)s|%s))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Elide literals and collapse IN-lists and whitespace, so one query shape always normalizes to the same text."""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _VECTOR_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode("utf-8")).hexdigest()[:16]
+
+
+def seq_scanned_tables(plan: Dict) -> List[str]:
+    """Relations read with a Seq Scan anywhere in an EXPLAIN (FORMAT JSON) plan tree."""
+    found = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found.extend(seq_scanned_tables(child))
+    return found
+
+
+class SlowQueryLog:
+    """
+    Args:
+        path (str): JSON-lines file to write; rotated at MAX_LOG_BYTES keeping LOG_BACKUP_COUNT old files.
+        threshold_ms (float): Statements taking at least this long are logged.
+        explain_sample_rate (float): Fraction of logged SELECTs that are re-run under EXPLAIN (ANALYZE, BUFFERS).
+    """
+
+    def __init__(self, path: str, threshold_ms: float, explain_sample_rate: float = 0.1):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self._writer = logging.getLogger(f"{__name__}.writer")
+        self._writer.propagate = False
+        self._writer.setLevel(logging.INFO)
+        if not self._writer.handlers:
+            handler = RotatingFileHandler(path, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._writer.addHandler(handler)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["slow_query_start_time"].pop()) * 1000
+        if elapsed_ms < self.threshold_ms or statement.lstrip().upper().startswith("EXPLAIN"):
+            return
+        normalized = normalize_sql(statement)
+        stats = current_request_stats()
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "fingerprint": fingerprint(normalized),
+            "duration_ms": round(elapsed_ms, 3),
+            "sql": normalized[:MAX_SQL_LENGTH],
+            "request": stats.endpoint if stats is not None else None,
+        }
+        if not executemany and statement.lstrip().upper().startswith("SELECT") and random.random() < self.explain_sample_rate:
+            entry.update(self._explain(conn, statement, parameters))
+        self._writer.info(json.dumps(entry))
+
+    def _handle_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_start_time"):
+            conn.info["slow_query_start_time"].pop()
+
+    def _explain(self, conn, statement: str, parameters) -> Dict:
+        """Re-run a SELECT under EXPLAIN ANALYZE in a savepoint, so a failure cannot abort the caller's transaction."""
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+                result = cursor.fetchone()[0]
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            except Exception as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                return {"explain_error": str(e)}
+        except Exception as e:
+            logger.warning(f"Could not explain slow query: {e}")
+            return {"explain_error": str(e)}
+        finally:
+            cursor.close()
+        plan = result if isinstance(result, list) else json.loads(result)
+        return {
+            "plan": plan[0]["Plan"],
+            "execution_ms": plan[0].get("Execution Time"),
+            "seq_scans": sorted(set(seq_scanned_tables(plan[0]["Plan"]))),
+        }
+
+    def install(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+
+def install_slow_query_log(engine, path: str, threshold_ms: Optional[float], explain_sample_rate: float) -> Optional[SlowQueryLog]:
+    """Start logging slow statements executed on engine. Does nothing when threshold_ms is None."""
+    if threshold_ms is None:
+        return None
+    slow_query_log = SlowQueryLog(path, threshold_ms, explain_sample_rate)
+    slow_query_log.install(engine)
+    logger.info(f"Logging statements slower than {threshold_ms}ms to {path}")
+    return slow_query_log
@@ -0,0 +1,122 @@
+"""
+Per-request timing: latency per route, plus the number of SQL statements each request issued and the time spent in them.
+TimingMiddleware puts a RequestStats object in a context variable for the duration of the request; the SQLAlchemy
+cursor listeners installed by install_query_listeners add every statement to it. Sync endpoints run in a worker
+thread with a copy of the request's context, so the statements they issue land in the same object.
+Totals go to the metrics registry (served at /metrics), and optionally to a Server-Timing response header.
+"""
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from core.metrics import COUNT_BUCKETS, registry
+
+REQUESTS = registry.counter("http_requests_total", "HTTP requests by route and status code.", ["method", "route", "status"])
+REQUEST_DURATION = registry.histogram("http_request_duration_seconds", "HTTP request latency by route.", ["method", "route"])
+REQUEST_DB_STATEMENTS = registry.histogram("http_request_db_statements", "SQL statements issued per HTTP request.", ["method", "route"], buckets=COUNT_BUCKETS)
+REQUEST_DB_DURATION = registry.histogram("http_request_db_duration_seconds", "Time spent executing SQL per HTTP request.", ["method", "route"])
+
+# Requests that did not match a route share one label, so random paths cannot blow up the number of series
+UNMATCHED_ROUTE = "unmatched"
+
+
+@dataclass
+class RequestStats:
+    """SQL activity of the request being handled."""
+    endpoint: str = ""
+    db_statements: int = 0
+    db_seconds: float = 0.0
+
+
+_current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """The stats of the request being handled, or None outside of a request (scripts, startup)."""
+    return _current_request_stats.get()
+
+
+"""
+SQLAlchemy cursor listeners
+"""
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_time"].pop()
+    stats = _current_request_stats.get()
+    if stats is not None:
+        stats.db_statements += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def install_query_listeners(engine):
+    """Count and time every statement executed on engine. Safe to call more than once."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+"""
+ASGI middleware
+"""
+def _server_timing(elapsed: float, stats: RequestStats) -> str:
+    return f'app;dur={elapsed * 1000:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_statements} statements"'
+
+
+class TimingMiddleware:
+    """
+    Records latency, SQL statement count and SQL time per route template (e.g. /likes/{user_id}).
+    Args:
+        app: The wrapped ASGI app.
+        server_timing (bool): Also report the timings to the client in a Server-Timing header.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(endpoint=f"{scope['method']} {scope['path']}")
+        token = _current_request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", _server_timing(time.perf_counter() - start, stats))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_request_stats.reset(token)
+            # FastAPI stores the matched route in the scope while routing
+            route = scope.get("route")
+            labels = {"method": scope["method"], "route": getattr(route, "path", UNMATCHED_ROUTE)}
+            REQUESTS.inc(status=status_code, **labels)
+            REQUEST_DURATION.observe(elapsed, **labels)
+            REQUEST_DB_STATEMENTS.observe(stats.db_statements, **labels)
+            REQUEST_DB_DURATION.observe(stats.db_seconds, **labels)
@@ -1,5 +1,10 @@
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, exists, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
 from models.category import Category
-from models.associations import item_category
+from models.item import Item
+from models.associations import category_closure, item_category
 
 
 """
@@ -9,6 +14,23 @@ def get_category(db, category_id: str) -> Category:
     """Retrieve a category by its ID."""
     return db.query(Category).filter(Category.id == category_id).first()
 
+def get_most_specific_category_ids(db, item_ids: list[str]) -> dict[str, str]:
+    """
+    Map each item to its most specific category, taken as the one with the fewest items (items are linked to leaf
+    categories; the ones linked to several leaves, or to ancestors left by an older sync, get the smallest one).
+    """
+    if not item_ids:
+        return {}
+    rows = (
+        db.query(item_category.c.item_id, item_category.c.category_id)
+        .join(Category, Category.id == item_category.c.category_id)
+        .filter(item_category.c.item_id.in_(item_ids))
+        .order_by(item_category.c.item_id, Category.itemCount.asc().nulls_last(), item_category.c.category_id)
+        .distinct(item_category.c.item_id)
+        .all()
+    )
+    return {item_id: category_id for item_id, category_id in rows}
+
 def get_all_categories(db) -> list[Category]:
     """Retrieve all categories."""
     return db.query(Category).order_by(Category.itemCount.desc()).all()
@@ -21,6 +43,16 @@ def create_category(db, id: str, name: str, itemCount: int) -> Category:
     db.refresh(db_category)
     return db_category
 
+def create_missing_categories(db, names: Dict[str, str]) -> None:
+    """Create the categories (id -> name) that don't exist yet, in one statement and without committing."""
+    if not names:
+        return
+    db.execute(
+        insert(Category)
+        .values([{"id": category_id, "name": name, "itemCount": 0} for category_id, name in sorted(names.items())])
+        .on_conflict_do_nothing(index_elements=[Category.id])
+    )
+
 def update_category(db, id: str, name: str = None, itemCount: int = None) -> Category:
     """Update an existing category."""
     db_category = db.query(Category).filter(Category.id == id).first()
@@ -53,14 +85,121 @@ def get_categories_count(db) -> int:
     """Get the total count of categories."""
     return db.query(Category).count()
 
+def item_counts_refresh():
+    """
+    UPDATE statement that sets itemCount of every category to the number of items whose category_ids contain it,
+    i.e. the distinct items linked to the category or any of its descendants. Counts in one pass over items and only
+    rewrites the categories whose count changed. Execute it with a session or a connection.
+    """
+    category_id = func.unnest(Item.category_ids).label("category_id")
+    memberships = select(category_id).subquery()
+    counts = (
+        select(memberships.c.category_id, func.count().label("n"))
+        .group_by(memberships.c.category_id)
+        .subquery()
+    )
+    categories = Category.__table__.alias("counted")
+    counted = (
+        select(categories.c.id, func.coalesce(counts.c.n, 0).label("n"))
+        .select_from(categories.outerjoin(counts, counts.c.category_id == categories.c.id))
+        .subquery()
+    )
+    return (
+        update(Category)
+        .where(Category.id == counted.c.id, Category.itemCount.is_distinct_from(counted.c.n))
+        .values(itemCount=counted.c.n)
+    )
+
 def refresh_item_counts(db):
-    """Refresh itemCount for all categories based on current associations."""
-    categories = db.query(Category).all()
-    for category in categories:
-        item_count = db.query(item_category).filter(item_category.c.category_id == category.id).count()
-        category.itemCount = item_count
-        db.add(category)
+    """Refresh itemCount for all categories from items.category_ids."""
+    db.execute(item_counts_refresh())
+    db.commit()
+
+
+"""
+Category hierarchy (category_closure)
+"""
+def descendant_category_ids(category_ids: List[str]):
+    """SELECT of the given categories and all their descendants, to use as a subquery (one primary-key range read per category)."""
+    return select(category_closure.c.descendant_id).where(category_closure.c.ancestor_id.in_(category_ids)).distinct()
+
+def get_descendant_category_ids(db, category_ids: List[str]) -> List[str]:
+    """Expand a category filter to the given categories and everything under them. Categories missing from the closure are kept as is."""
+    if not category_ids:
+        return []
+    descendants = {row[0] for row in db.execute(descendant_category_ids(category_ids))}
+    return sorted(descendants | set(category_ids))
+
+def get_ancestor_category_ids(db, category_ids: List[str]) -> List[str]:
+    """The given categories and all their ancestors."""
+    if not category_ids:
+        return []
+    rows = db.execute(select(category_closure.c.ancestor_id).where(category_closure.c.descendant_id.in_(category_ids)).distinct())
+    return sorted({row[0] for row in rows} | set(category_ids))
+
+def tree_closure(paths: Iterable[List[Tuple[str, str]]]) -> Tuple[Dict[str, str], Dict[Tuple[str, str], int]]:
+    """
+    Categories and closure pairs of a tree given as its root-to-leaf paths of (id, name).
+    Returns:
+        (category id -> name, (ancestor id, descendant id) -> depth). A category reachable by several paths keeps
+        the shortest distance to each ancestor.
+    """
+    names, depths = {}, {}
+    for path in paths:
+        for i, (ancestor_id, name) in enumerate(path):
+            names[ancestor_id] = name
+            for j in range(i, len(path)):
+                key = (ancestor_id, path[j][0])
+                depths[key] = min(depths.get(key, j - i), j - i)
+    return names, depths
+
+def save_category_tree(db, names: Dict[str, str], depths: Dict[Tuple[str, str], int]) -> bool:
+    """
+    Store a category tree built by tree_closure and commit: missing categories are created, and the closure rows of
+    the tree's categories are replaced if they differ from the stored ones. Safe to run from several sync shards at once.
+    Returns:
+        Whether the closure changed (the ancestors of some items may then be stale, see crud.item.category_ids_refresh).
+    """
+    if not names:
+        return False
+    create_missing_categories(db, names)
+    stored = {
+        (row.ancestor_id, row.descendant_id): row.depth
+        for row in db.execute(select(category_closure).where(category_closure.c.descendant_id.in_(list(names))))
+    }
+    if stored == depths:
+        db.commit()
+        return False
+    stale = [pair for pair in stored if pair not in depths or stored[pair] != depths[pair]]
+    if stale:
+        db.execute(delete(category_closure).where(tuple_(category_closure.c.ancestor_id, category_closure.c.descendant_id).in_(stale)))
+    db.execute(
+        insert(category_closure)
+        .values([{"ancestor_id": a, "descendant_id": d, "depth": depth} for (a, d), depth in depths.items()])
+        .on_conflict_do_nothing()
+    )
+    db.commit()
+    return True
+
+def prune_ancestor_links(db) -> int:
+    """
+    Delete the item_category rows that link an item to an ancestor of another category it is linked to, which the
+    catalog sync wrote for every category on the path before the closure table existed. Returns the number of deleted rows.
+    """
+    narrower = item_category.alias("narrower")
+    result = db.execute(
+        delete(item_category).where(
+            exists()
+            .where(
+                narrower.c.item_id == item_category.c.item_id,
+                category_closure.c.ancestor_id == item_category.c.category_id,
+                category_closure.c.descendant_id == narrower.c.category_id,
+                category_closure.c.depth > 0,
+            )
+        )
+    )
     db.commit()
+    return result.rowcount
 
 if __name__ == "__main__":
     from db.session import SessionLocal
@@ -0,0 +1,112 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, cast, delete, func, insert, literal, select, union_all, String
+from models.item import Item
+from models.category import Category
+from models.category_facets import CategoryFacetCount
+from crud.category import item_counts_refresh
+from core.facets import PRICE_BUCKET_BOUNDS, price_bucket_range
+
+DESIGNER_FACET = "designer"
+COLOR_FACET = "color"
+PRICE_FACET = "price"
+
+
+"""
+Aggregation of the items of every category into facet counts, after each catalog sync
+"""
+def _price_bucket(price_cents):
+    """SQL expression: lower bound (in cents) of the price bucket of price_cents, as text."""
+    bounds = sorted(PRICE_BUCKET_BOUNDS, reverse=True)
+    return case(*[(price_cents >= bound, str(bound)) for bound in bounds])
+
+def refresh_category_facet_counts(db) -> int:
+    """
+    Recompute the designer, colour and price bucket counts of every category, and its itemCount, and commit them.
+    An item counts in every category of its category_ids (its leaf categories and their ancestors). The table is
+    replaced in one transaction, so readers see either the previous counts or the new ones.
+    Args:
+        db: Database session.
+    Returns:
+        Number of (category, facet, value) rows.
+    """
+    memberships = (
+        select(
+            func.unnest(Item.category_ids).label("category_id"),
+            Item.designer_id,
+            Item.designer_name,
+            Item.color_family,
+            _price_bucket(Item.price_cents).label("price_bucket"),
+        )
+        .cte("memberships")
+    )
+    designers = (
+        select(memberships.c.category_id, literal(DESIGNER_FACET), memberships.c.designer_id, func.min(memberships.c.designer_name), func.count())
+        .where(memberships.c.designer_id.is_not(None))
+        .group_by(memberships.c.category_id, memberships.c.designer_id)
+    )
+    colors = (
+        select(memberships.c.category_id, literal(COLOR_FACET), memberships.c.color_family, cast(None, String), func.count())
+        .where(memberships.c.color_family.is_not(None))
+        .group_by(memberships.c.category_id, memberships.c.color_family)
+    )
+    prices = (
+        select(memberships.c.category_id, literal(PRICE_FACET), memberships.c.price_bucket, cast(None, String), func.count())
+        .where(memberships.c.price_bucket.is_not(None))
+        .group_by(memberships.c.category_id, memberships.c.price_bucket)
+    )
+    # Only categories that still exist: a concurrent sync may have pruned one since the items were read
+    counts = union_all(designers, colors, prices).subquery()
+    rows = select(counts).where(counts.c[0].in_(select(Category.id)))
+
+    db.execute(delete(CategoryFacetCount))
+    result = db.execute(
+        insert(CategoryFacetCount).from_select(["category_id", "facet", "value", "label", "item_count"], rows)
+    )
+    db.execute(item_counts_refresh())
+    db.commit()
+    return result.rowcount
+
+
+"""
+Facets of a category for the filter UIs
+"""
+def get_category_facets(db, category: Category) -> Dict:
+    """
+    Facet counts of a category, read from the precomputed table.
+    Args:
+        db: Database session.
+        category (Category): Category to describe.
+    Returns:
+        Dict shaped like schemas.category.CategoryFacetsOut: designers and colours by decreasing count, price buckets
+        by increasing price; values without items are left out.
+    """
+    rows: List[CategoryFacetCount] = (
+        db.query(CategoryFacetCount)
+        .filter(CategoryFacetCount.category_id == category.id)
+        .all()
+    )
+    by_facet: Dict[str, List[CategoryFacetCount]] = {DESIGNER_FACET: [], COLOR_FACET: [], PRICE_FACET: []}
+    refreshed_at: Optional[datetime] = None
+    for row in rows:
+        by_facet.setdefault(row.facet, []).append(row)
+        refreshed_at = row.refreshed_at if refreshed_at is None else max(refreshed_at, row.refreshed_at)
+
+    def values(facet: str) -> List[Dict]:
+        ordered = sorted(by_facet[facet], key=lambda row: (-row.item_count, row.value))
+        return [{"value": row.value, "label": row.label or row.value, "count": row.item_count} for row in ordered]
+
+    prices = []
+    for row in sorted(by_facet[PRICE_FACET], key=lambda row: int(row.value)):
+        min_price_cents, max_price_cents = price_bucket_range(int(row.value))
+        prices.append({"min_price_cents": min_price_cents, "max_price_cents": max_price_cents, "count": row.item_count})
+
+    return {
+        "category_id": category.id,
+        "item_count": category.itemCount or 0,
+        "designers": values(DESIGNER_FACET),
+        "colors": values(COLOR_FACET),
+        "prices": prices,
+        "refreshed_at": refreshed_at,
+    }
@@ -1,16 +1,50 @@
 
-from typing import List
-
-from sqlalchemy import desc, func, text, update
-from models.item import Item, ProductImages
-from models.associations import item_category, item_outfit
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, desc, exists, func, select, text, true, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy.orm import aliased, load_only, selectinload
+from models.item import Item
+from models.outfitless_product import OutfitlessProduct
+from models.associations import category_closure, item_category, item_outfit, user_dislike_items, UserLikeItems
+from core.facets import item_facets
+
+
+@dataclass
+class FacetFilters:
+    """
+    Facet filters of the feeds (see core/facets.py), applied in the same query as the category filter and the
+    ordering. Unset fields do not filter.
+    """
+    min_price_cents: Optional[int] = None
+    max_price_cents: Optional[int] = None
+    designer_ids: List[str] = field(default_factory=list)
+    color_families: List[str] = field(default_factory=list)
+
+    def clauses(self) -> list:
+        """WHERE clauses on Item, empty when nothing is filtered."""
+        clauses = []
+        if self.min_price_cents is not None:
+            clauses.append(Item.price_cents >= self.min_price_cents)
+        if self.max_price_cents is not None:
+            clauses.append(Item.price_cents <= self.max_price_cents)
+        if self.designer_ids:
+            clauses.append(Item.designer_id.in_(self.designer_ids))
+        if self.color_families:
+            clauses.append(Item.color_family.in_(self.color_families))
+        return clauses
+
+NO_FACET_FILTERS = FacetFilters()
 
 
 """
 Operations prepared for the frontend-facing API endpoints to get basic item recommendations based on category filters.
 """
 
-def get_items_by_categories_filter(db, category_ids: List[str], offset: int = 0, limit: int = 10):
+def get_items_by_categories_filter(db, category_ids: List[str], offset: int = 0, limit: int = 10, facets: FacetFilters = NO_FACET_FILTERS):
     """
     Retrieve items that are associated with any of the specified category IDs, with pagination.
     Args:
@@ -18,12 +52,14 @@ def get_items_by_categories_filter(db, category_ids: List[str], offset: int = 0,
         category_ids (List[str]): List of category IDs to filter items by. It will return items that belong to any of these categories.
         offset (int): Number of items to skip (for pagination).
         limit (int): Maximum number of items to return.
+        facets (FacetFilters): Price, designer and colour filters.
     Returns:
         List of items matching the criteria.
     """
     if not category_ids:
         return (
             db.query(Item)
+            .filter(*facets.clauses())
             .order_by(func.random())
             .limit(limit)
             .all()
@@ -31,7 +67,8 @@ def get_items_by_categories_filter(db, category_ids: List[str], offset: int = 0,
     
     query = (
         db.query(Item)
-        .filter(Item.categories.any(item_category.c.category_id.in_(category_ids)))
+        .filter(Item.category_ids.overlap(category_ids))
+        .filter(*facets.clauses())
         .order_by(func.random())
         .limit(limit)
 
@@ -64,11 +101,8 @@ def create_item(
     """Create a new item."""
     db_item = Item(id=id, 
         name=name, image_url_suffix=image_url_suffix, product_detail_url=product_detail_url, designer_name=designer_name,
-        price=price, color=color, stretch=stretch, embedding=embedding, detailed_embedding=detailed_embedding)
-    if product_images_urls:
-        for url in product_images_urls:
-            pi = ProductImages(item_id=id, image_url_suffix=url)
-            db_item.product_images.append(pi)
+        price=price, color=color, stretch=stretch, embedding=embedding, detailed_embedding=detailed_embedding,
+        product_images=list(product_images_urls or []), **item_facets(price, designer_name, color))
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
@@ -78,9 +112,15 @@ def get_item_by_id(db, id: str) -> Item:
     """Retrieve an item by its ID."""
     return db.query(Item).filter(Item.id == id).first()
 
+def get_items_by_ids(db, item_ids: List[str]) -> List[Item]:
+    """Retrieve the items with the given IDs (missing ones are left out), with their categories loaded."""
+    if not item_ids:
+        return []
+    return db.query(Item).options(selectinload(Item.categories)).filter(Item.id.in_(item_ids)).all()
+
 def get_all_items(db, offset: int = 0, limit: int = 10) -> List[Item]:
-    """Retrieve all items with pagination."""
-    return db.query(Item).offset(offset).limit(limit).all()
+    """Retrieve all items with pagination, in id order so offsets stay stable across calls."""
+    return db.query(Item).order_by(Item.id).offset(offset).limit(limit).all()
 
 def get_items_count(db) -> int:
     """Get the total count of items."""
@@ -119,18 +159,183 @@ def update_item(
             db_item.color = color
         if stretch is not None:
             db_item.stretch = stretch
-        if product_images_urls is not None:
-            db_item.product_images = []
-            for url in product_images_urls:
-                pi = ProductImages(item_id=id, image_url_suffix=url)
-                db_item.product_images.append(pi)
+        if product_images_urls is not None and list(db_item.product_images or []) != list(product_images_urls):
+            db_item.product_images = list(product_images_urls)
         if detailed_embedding is not None:
             db_item.detailed_embedding = detailed_embedding
+        if db.is_modified(db_item):
+            db_item.content_version = (db_item.content_version or 0) + 1
+        # Facets are not part of the item card, so set after the content check
+        for column, value in item_facets(db_item.price, db_item.designer_name, db_item.color).items():
+            setattr(db_item, column, value)
         db.add(db_item)
         db.commit()
         db.refresh(db_item)
     return db_item
 
+# Item columns the catalog sync writes from a listing
+LISTING_COLUMNS = ("name", "image_url_suffix", "product_detail_url", "designer_name", "price", "color", "stretch", "product_images")
+
+def get_items_for_sync(db, item_ids: List[str]) -> Dict[str, Item]:
+    """Retrieve the given items (missing ones are left out) with only the columns upsert_items compares loaded."""
+    if not item_ids:
+        return {}
+    columns = [getattr(Item, column) for column in LISTING_COLUMNS + ("content_version", "listing_fingerprint", "outfits_fingerprint")]
+    return {db_item.id: db_item for db_item in db.query(Item).options(load_only(*columns)).filter(Item.id.in_(item_ids))}
+
+def upsert_items(db, rows: List[dict], existing: Dict[str, Item]) -> None:
+    """
+    Create or update items in one statement, without committing, the way create_item and update_item do one item:
+    a None listing field keeps the stored value, content_version is bumped when a listing field changes, and the
+    facets are recomputed.
+    Args:
+        rows (List[dict]): One row per item: "id", every column of LISTING_COLUMNS, and the same other columns in all.
+        existing (Dict[str, Item]): The stored items among them, from get_items_for_sync.
+    """
+    if not rows:
+        return
+    values = []
+    # In id order, so concurrent writers lock the rows in the same order
+    for row in sorted(rows, key=lambda row: row["id"]):
+        stored = existing.get(row["id"])
+        listing = {column: row[column] for column in LISTING_COLUMNS}
+        content_version = 0
+        if stored is not None:
+            listing = {column: getattr(stored, column) if value is None else value for column, value in listing.items()}
+            changed = any(listing[column] != getattr(stored, column) for column in LISTING_COLUMNS)
+            content_version = (stored.content_version or 0) + (1 if changed else 0)
+        listing["product_images"] = list(listing["product_images"] or [])
+        values.append({
+            **row, **listing, "content_version": content_version,
+            **item_facets(listing["price"], listing["designer_name"], listing["color"]),
+        })
+    statement = pg_insert(Item).values(values)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[Item.id],
+        set_={column: statement.excluded[column] for column in values[0] if column != "id"},
+    ))
+
+def link_items_to_category(db, item_ids: List[str], category_id: str) -> None:
+    """Add the missing item_category links of the items to the category, in one statement and without committing."""
+    if not item_ids:
+        return
+    db.execute(
+        pg_insert(item_category)
+        .values([{"item_id": item_id, "category_id": category_id} for item_id in sorted(set(item_ids))])
+        .on_conflict_do_nothing()
+    )
+
+def get_sync_states(db, item_ids: List[str]) -> Dict[str, Tuple[Optional[str], Optional[datetime]]]:
+    """
+    Retrieve what the catalog sync last wrote for the given items, in one query.
+    Args:
+        item_ids (List[str]): Product sins of a listing page.
+    Returns:
+        Dict[str, Tuple]: item id -> (listing_fingerprint, synced_at), for the items that exist.
+    """
+    if not item_ids:
+        return {}
+    rows = db.query(Item.id, Item.listing_fingerprint, Item.synced_at).filter(Item.id.in_(item_ids)).all()
+    return {row.id: (row.listing_fingerprint, row.synced_at) for row in rows}
+
+def get_outfitless_states(db, product_sins: List[str]) -> Dict[str, Tuple[str, datetime]]:
+    """
+    Retrieve what the catalog sync recorded for the given products when it found them without outfits, in one query.
+    Returns:
+        Dict[str, Tuple]: product sin -> (listing_fingerprint, checked_at), for the recorded products.
+    """
+    if not product_sins:
+        return {}
+    rows = (
+        db.query(OutfitlessProduct.product_sin, OutfitlessProduct.listing_fingerprint, OutfitlessProduct.checked_at)
+        .filter(OutfitlessProduct.product_sin.in_(product_sins))
+        .all()
+    )
+    return {row.product_sin: (row.listing_fingerprint, row.checked_at) for row in rows}
+
+def record_outfitless_product(db, product_sin: str, listing_fingerprint: str):
+    """Record (or refresh) that the product had no outfit with this listing, and commit."""
+    values = {"product_sin": product_sin, "listing_fingerprint": listing_fingerprint, "checked_at": func.now()}
+    db.execute(
+        pg_insert(OutfitlessProduct)
+        .values(**values)
+        .on_conflict_do_update(index_elements=[OutfitlessProduct.product_sin], set_={k: v for k, v in values.items() if k != "product_sin"})
+    )
+    db.commit()
+
+def get_item_ids_in_category(db, category_id: str, item_ids: List[str]) -> Set[str]:
+    """Return the subset of item_ids that are associated with the category."""
+    if not item_ids:
+        return set()
+    rows = db.execute(
+        select(item_category.c.item_id)
+        .where(item_category.c.category_id == category_id, item_category.c.item_id.in_(item_ids))
+    )
+    return {row.item_id for row in rows}
+
+def get_item_ids_without_detailed_embedding(db, item_ids: List[str]) -> List[str]:
+    """Return the subset of item_ids whose detailed_embedding has not been computed."""
+    if not item_ids:
+        return []
+    return [row.id for row in db.query(Item.id).filter(Item.id.in_(item_ids), Item.detailed_embedding.is_(None))]
+
+def category_ids_refresh(item_ids: List[str] = None):
+    """
+    UPDATE statement that recomputes items.category_ids, for all items or only item_ids: the categories of their
+    item_category rows and every ancestor of those in category_closure (a category missing from the closure counts
+    as its own only ancestor). Aggregates in one pass and joins the result to items, so it runs fine while the indexes
+    are dropped during a bulk load, and only rewrites items whose categories changed.
+    Execute it with a session or a connection.
+    """
+    category_id = func.coalesce(category_closure.c.ancestor_id, item_category.c.category_id).label("category_id")
+    pairs = (
+        select(item_category.c.item_id, category_id)
+        .select_from(item_category.outerjoin(category_closure, category_closure.c.descendant_id == item_category.c.category_id))
+        .distinct()
+    )
+    if item_ids is not None:
+        pairs = pairs.where(item_category.c.item_id.in_(item_ids))
+    pairs = pairs.subquery()
+    memberships = (
+        select(pairs.c.item_id, func.array_agg(aggregate_order_by(pairs.c.category_id, pairs.c.category_id)).label("category_ids"))
+        .group_by(pairs.c.item_id)
+        .subquery()
+    )
+    return (
+        update(Item)
+        .where(Item.id == memberships.c.item_id, Item.category_ids.is_distinct_from(memberships.c.category_ids))
+        .values(category_ids=memberships.c.category_ids)
+    )
+
+def backfill_item_facets(db, batch_size: int = 5000) -> int:
+    """
+    Recompute the facet columns of every item from its listing fields and write the ones that differ.
+    Works with a session or a connection; the caller commits. Returns the number of items updated.
+    """
+    items = Item.__table__
+    write = (
+        update(items)
+        .where(items.c.id == bindparam("item_id"))
+        .values(price_cents=bindparam("price_cents"), designer_id=bindparam("designer_id"), color_family=bindparam("color_family"))
+    )
+    updated, last_id = 0, None
+    while True:
+        query = select(items.c.id, items.c.price, items.c.designer_name, items.c.color, items.c.price_cents, items.c.designer_id, items.c.color_family)
+        if last_id is not None:
+            query = query.where(items.c.id > last_id)
+        rows = db.execute(query.order_by(items.c.id).limit(batch_size)).all()
+        if not rows:
+            return updated
+        changes = []
+        for row in rows:
+            facets = item_facets(row.price, row.designer_name, row.color)
+            if (row.price_cents, row.designer_id, row.color_family) != (facets["price_cents"], facets["designer_id"], facets["color_family"]):
+                changes.append({"item_id": row.id, **facets})
+        if changes:
+            db.execute(write, changes)
+            updated += len(changes)
+        last_id = rows[-1].id
+
 def bulk_update_items(db, items: List[Item]) -> None:
     """Bulk update multiple items."""
     db.execute(update(Item),items)
@@ -163,17 +368,17 @@ def get_items_by_category(db, category_id: str, limit: int = 10) -> List[Item]:
     """Retrieve items by category ID with a limit."""
     return (
         db.query(Item)
-        .filter(Item.categories.any(item_category.c.category_id == category_id))
+        .filter(Item.category_ids.overlap([category_id]))
         .order_by(func.random())
         .limit(limit)
         .all()
     )
 
-def get_random_unseen_items_from_categories(db, user_id:str, category_ids: List[str], limit: int = 10) -> List[Item]:
+def get_random_unseen_items_from_categories(db, user_id:str, category_ids: List[str], limit: int = 10, facets: FacetFilters = NO_FACET_FILTERS) -> List[Item]:
     """Retrieve random items from specified categories with a limit."""
-    query = db.query(Item)
+    query = db.query(Item).filter(*facets.clauses())
     if category_ids and len(category_ids) > 0:
-        query = query.filter(Item.categories.any(item_category.c.category_id.in_(category_ids)))
+        query = query.filter(Item.category_ids.overlap(category_ids))
 
     query = (
         query
@@ -223,21 +428,21 @@ def get_kNN_by_item_id(db, item_id: str, top_k: int = 10) -> List[Item]:
         .all()
     )
 
-def get_similar_unseen_items_for_user(db, item_id: str, user_id: str, top_k: int = 10, category_ids: List[str] = []) -> List[Item]:
+def get_similar_unseen_items_for_user(db, item_id: str, user_id: str, top_k: int = 10, category_ids: List[str] = [], facets: FacetFilters = NO_FACET_FILTERS) -> List[Item]:
     """
     Given an item ID and a user ID, retrieve top-k similar items based on embedding,
     excluding items that the user has already liked or disliked.
     """
     lookup_by_item = get_item_by_id(db, item_id)
-    if lookup_by_item is None or lookup_by_item.embedding is None:
+    if lookup_by_item is None or lookup_by_item.detailed_embedding is None:
         return []
 
-    vec_literal = '\'[' + ','.join(map(str, lookup_by_item.embedding)) + ']\''
+    vec_literal = '\'[' + ','.join(map(str, lookup_by_item.detailed_embedding)) + ']\''
 
-    query = db.query(Item)
+    query = db.query(Item).filter(*facets.clauses())
 
     if category_ids and len(category_ids) > 0:
-        query = query.filter(Item.categories.any(item_category.c.category_id.in_(category_ids)))
+        query = query.filter(Item.category_ids.overlap(category_ids))
 
      # Perform vector similarity search
 
@@ -255,6 +460,54 @@ def get_similar_unseen_items_for_user(db, item_id: str, user_id: str, top_k: int
     return query.all()
 
 
+"""
+Candidate pool of the two-stage recommender: a bounded number of queries per feed, re-ranked in recommender/reranker.py
+"""
+def get_detailed_embeddings(db, item_ids: List[str]) -> Dict[str, np.ndarray]:
+    """Return item id -> detailed_embedding for the given items that have one."""
+    if not item_ids:
+        return {}
+    rows = db.query(Item.id, Item.detailed_embedding).filter(Item.id.in_(item_ids), Item.detailed_embedding.isnot(None)).all()
+    return {row.id: np.asarray(row.detailed_embedding, dtype=np.float32) for row in rows}
+
+def get_unseen_neighbours_of_seeds(db, seed_ids: List[str], user_id: str, per_seed: int = 10, category_ids: List[str] = [], ef_search: int = 100, facets: FacetFilters = NO_FACET_FILTERS) -> List[Tuple[str, Item]]:
+    """
+    Nearest neighbours (by detailed_embedding) of every seed item in one query, excluding items the user has already
+    liked or disliked. A LATERAL subquery runs the top-k search once per seed, with the seed vectors read in the database.
+    Args:
+        seed_ids (List[str]): Items to search around.
+        per_seed (int): Neighbours returned per seed.
+        category_ids (List[str]): Only return items in any of these categories, if given.
+        ef_search (int): Candidates the HNSW index scan visits per seed. The user, category and facet filters are
+            applied to those candidates, so a seed can return fewer than per_seed items when the filters are selective.
+        facets (FacetFilters): Price, designer and colour filters.
+    Returns:
+        List of (seed id, neighbour) pairs, nearest first within each seed. An item near several seeds appears once per seed.
+    """
+    if not seed_ids or per_seed <= 0:
+        return []
+    # Scoped to the current transaction
+    db.execute(text(f"SET LOCAL hnsw.ef_search = {max(int(ef_search), per_seed)}"))
+    seeds = (
+        select(Item.id.label("seed_id"), Item.detailed_embedding.label("seed_vector"))
+        .where(Item.id.in_(seed_ids), Item.detailed_embedding.isnot(None))
+        .subquery("seeds")
+    )
+    neighbours = select(Item).where(
+        Item.detailed_embedding.isnot(None),
+        Item.id != seeds.c.seed_id,
+        ~exists().where(UserLikeItems.item_id == Item.id, UserLikeItems.user_id == user_id),
+        ~exists().where(user_dislike_items.c.item_id == Item.id, user_dislike_items.c.user_id == user_id),
+        *facets.clauses(),
+    )
+    if category_ids:
+        neighbours = neighbours.where(Item.category_ids.overlap(category_ids))
+    neighbours = neighbours.order_by(Item.detailed_embedding.l2_distance(seeds.c.seed_vector)).limit(per_seed).lateral("neighbours")
+    neighbour = aliased(Item, neighbours)
+    rows = db.execute(select(seeds.c.seed_id, neighbour).join_from(seeds, neighbour, true()))
+    return [(row[0], row[1]) for row in rows]
+
+
 """
 Manual tests
 """
@@ -302,23 +555,23 @@ def _test_multiple_image_urls():
     item = get_item_by_id(db, "1571990997")
     print("Item:", item)
     print("Product image URLs:")
-    for img in item.product_images:
-        print("\t", img.image_url_suffix)
+    for url in item.product_images:
+        print("\t", url)
     
     product_images = [
-        ("10157196", "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450023062_2-0.jpg"),
-        ("10157197", "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450023041_2-0.jpg"),
-        ("10157195", "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450023077_2-0.jpg"),
-        ("10157189", "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450022013_2-0.jpg"),
-        ("10157198", "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450023508_2-0.jpg"),
-        ("10157192", "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450022229_2-0.jpg"),
+        "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450023062_2-0.jpg",
+        "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450023041_2-0.jpg",
+        "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450023077_2-0.jpg",
+        "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450022013_2-0.jpg",
+        "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450023508_2-0.jpg",
+        "/prod/products/rthir/rthir21453215d2/rthir21453215d2_1701450022229_2-0.jpg",
     ]
     update_item(db, id=item.id, product_images_urls=product_images)
 
     item = get_item_by_id(db, "1571990997")
     print("After update, product image URLs:")
-    for img in item.product_images:
-        print("\t", img.image_url_suffix)
+    for url in item.product_images:
+        print("\t", url)
 
 if __name__ == "__main__":
     _test_multiple_image_urls()
\ No newline at end of file
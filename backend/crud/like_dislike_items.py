@@ -3,7 +3,9 @@ from sqlalchemy.orm import selectinload
 from models.outfit import Outfit
 from models.user import User
 from models.item import Item
-from models.associations import UserLikeItems, user_dislike_items, item_category, UserPreferenceItems
+from models.associations import UserLikeItems, user_dislike_items, UserPreferenceItems
+from crud.outfit import outfit_graph_options
+from crud.user import bump_interaction_version
 
 def like_item(db, user_id: int, item_id: str):
     """Add an item to the user's liked items. Also add to preference items."""
@@ -21,6 +23,7 @@ def like_item(db, user_id: int, item_id: str):
         db.add(user_like_item)
         user_preference_item = UserPreferenceItems(user_id=user_id, item_id=item_id)
         db.add(user_preference_item)
+        bump_interaction_version(db, user_id, preferences=True)
         db.commit()
     return query.first()
 
@@ -30,14 +33,18 @@ def like_outfit(db, user_id: int, outfit_id: str):
     outfit = db.query(Outfit).filter(Outfit.id == outfit_id).first()
     if outfit not in user.liked_outfits:
         user.liked_outfits.append(outfit)
+        bump_interaction_version(db, user_id)
         db.commit()
     return user
 
-def get_user_liked_outfits(db, user_id: int) -> list[Outfit]:
-    """Retrieve all outfits liked by the user."""
+def get_user_liked_outfits(db, user_id: int, compact: bool = False) -> list[Outfit]:
+    """
+    Retrieve all outfits liked by the user, with the outfit -> items -> images graph eagerly loaded.
+    If compact is True, only the item ids of each outfit are loaded.
+    """
     user = (
         db.query(User)
-        .options(selectinload(User.liked_outfits))
+        .options(selectinload(User.liked_outfits).options(outfit_graph_options(compact=compact)))
         .filter(User.id == user_id)
         .first()
     )
@@ -51,6 +58,7 @@ def remove_liked_outfit(db, user_id: int, outfit_id: str):
     outfit = db.query(Outfit).filter(Outfit.id == outfit_id).first()
     if outfit in user.liked_outfits:
         user.liked_outfits.remove(outfit)
+        bump_interaction_version(db, user_id)
         db.commit()
     return user
 
@@ -60,6 +68,7 @@ def dislike_item(db, user_id: int, item_id: str):
     item = db.query(Item).filter(Item.id == item_id).first()
     if item not in user.disliked_items:
         user.disliked_items.append(item)
+        bump_interaction_version(db, user_id)
         db.commit()
     return user
 
@@ -74,6 +83,7 @@ def add_to_user_preferences(db, user_id: int, item_id: str):
     if query.first() is None:
         user_preference_item = UserPreferenceItems(user_id=user_id, item_id=item_id)
         db.add(user_preference_item)
+        bump_interaction_version(db, user_id, preferences=True)
         db.commit()
     return query.first()
 
@@ -84,6 +94,8 @@ def clear_user_preferences(db, user_id: int):
         .filter(UserPreferenceItems.user_id == user_id)
         .delete()
     )
+    if count:
+        bump_interaction_version(db, user_id, preferences=True)
     db.commit()
     return count
 
@@ -128,6 +140,7 @@ def remove_liked_items_from_closet_display(db, user_id: int, item_id: str):
     ).first()
     if user_like_item_row:
         db.delete(user_like_item_row)
+        bump_interaction_version(db, user_id)
         db.commit()
     return True
 
@@ -146,10 +159,12 @@ def remove_from_liked_items(db, user_id: int, item_id: str):
 
     if user_like_item_row:
         db.delete(user_like_item_row)
+        bump_interaction_version(db, user_id)
         db.commit()
         
     if user_preference_item_row:
         db.delete(user_preference_item_row)
+        bump_interaction_version(db, user_id, preferences=True)
         db.commit()
 
     user = db.query(User).filter(User.id == user_id).first()
@@ -180,9 +195,8 @@ def get_user_liked_items_by_category(db, user_id: int, category_id: str):
     # Get items that match both: liked by user AND in the specified category
     items = (
         db.query(Item)
-        .join(item_category)
         .filter(Item.id.in_(liked_item_ids))
-        .filter(item_category.c.category_id == category_id)
+        .filter(Item.category_ids.overlap([category_id]))
         .all()
     )
     
@@ -226,6 +240,28 @@ def get_user_liked_items_randomized(db, user_id:int, limit:int=10, weighted_by_t
         )
         return [item for (item,) in query.all()]
 
+def get_user_preference_timestamps(db, user_id: int, after=None):
+    """
+    Retrieve (item_id, set_timestamp) for every item in the user's preference table, oldest first.
+    If after is given, only the items set later than it.
+    """
+    query = (
+        db.query(UserPreferenceItems.item_id, UserPreferenceItems.set_timestamp)
+        .filter(UserPreferenceItems.user_id == user_id)
+    )
+    if after is not None:
+        query = query.filter(UserPreferenceItems.set_timestamp > after)
+    return query.order_by(UserPreferenceItems.set_timestamp, UserPreferenceItems.item_id).all()
+
+def count_user_preferences(db, user_id: int) -> int:
+    """Number of items in the user's preference table."""
+    return (
+        db.query(func.count())
+        .select_from(UserPreferenceItems)
+        .filter(UserPreferenceItems.user_id == user_id)
+        .scalar()
+    )
+
 """"
 Manual tests
 """
@@ -1,5 +1,6 @@
-from typing import List
-from sqlalchemy.orm import Session
+from typing import Dict, List, Tuple
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, load_only, selectinload
 from models.outfit import Outfit
 from models.item import Item
 from models.associations import item_outfit
@@ -24,6 +25,26 @@ def create_outfit(db, id: str, image_url_suffix: str = None) -> Outfit:
     db.refresh(db_outfit)
     return db_outfit
 
+def create_missing_outfits(db, outfits: Dict[str, str]) -> None:
+    """Create the outfits (id -> image_url_suffix) that don't exist yet, in one statement and without committing."""
+    if not outfits:
+        return
+    db.execute(
+        insert(Outfit)
+        .values([{"id": outfit_id, "image_url_suffix": suffix} for outfit_id, suffix in sorted(outfits.items())])
+        .on_conflict_do_nothing(index_elements=[Outfit.id])
+    )
+
+def link_items_to_outfits(db, links: List[Tuple[str, str]]) -> None:
+    """Add the missing (item_id, outfit_id) links, in one statement and without committing."""
+    if not links:
+        return
+    db.execute(
+        insert(item_outfit)
+        .values([{"item_id": item_id, "outfit_id": outfit_id} for item_id, outfit_id in sorted(set(links))])
+        .on_conflict_do_nothing()
+    )
+
 def get_all_outfits(db, offset: int = 0, limit: int = 10) -> List[Outfit]:
     """Retrieve all outfits with pagination."""
     return db.query(Outfit).offset(offset).limit(limit).all()
@@ -58,13 +79,33 @@ def delete_all_outfits(db) -> int:
     db.commit()
     return count
 
-def get_outfit_by_item_id(db: Session, item_id: str) -> List[Outfit]:
+def outfit_graph_options(compact: bool = False):
+    """
+    Loader options that fetch the outfit -> items graph up front (product images are a column of the item).
+    The items are loaded with one SELECT ... IN query, so serializing OutfitOut never triggers lazy loads.
+    Args:
+        compact (bool): Only load the item ids of each outfit (no other item columns).
+    Returns:
+        Loader option to pass to Query.options() for an Outfit query, or chain after a relationship to Outfit.
+    """
+    if compact:
+        return selectinload(Outfit.items).load_only(Item.id)
+    return selectinload(Outfit.items)
+
+def get_outfits_by_item_id(db: Session, item_id: str, compact: bool = False) -> List[Outfit]:
     """
-    Retrieve all outfits that contain a specific item.
+    Retrieve all outfits that contain a specific item, with their items and images eagerly loaded.
     Args:
         db: Database session.
         item_id (str): The ID of the item.
+        compact (bool): Only load the item ids of each outfit.
     Returns:
         List of outfit objects that contain the item.
     """
-    return db.query(Outfit).join(item_outfit).filter(item_outfit.c.item_id == item_id).all()
+    return (
+        db.query(Outfit)
+        .join(item_outfit)
+        .filter(item_outfit.c.item_id == item_id)
+        .options(outfit_graph_options(compact=compact))
+        .all()
+    )
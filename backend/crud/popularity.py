@@ -0,0 +1,135 @@
+import math
+from typing import List
+
+from sqlalchemy import delete, exists, extract, func, insert, select
+from models.item import Item
+from crud.item import FacetFilters, NO_FACET_FILTERS
+from models.popularity import ItemPopularity
+from models.associations import user_dislike_items, UserLikeItems
+
+# A like (or dislike) counts half as much after this many days
+DEFAULT_HALF_LIFE_DAYS = 14
+# Weight of a decayed dislike against a decayed like in the score
+DEFAULT_DISLIKE_WEIGHT = 0.5
+# Items kept per category; enough for the explore slots of many feeds before a user has seen them all
+DEFAULT_ITEMS_PER_CATEGORY = 500
+
+
+"""
+Periodic aggregation of likes and dislikes into the per-category popularity ranking
+"""
+def _decayed_counts(table, timestamp_column, half_life_days: float):
+    """Per item: raw count and sum of exp(-ln2 * age / half_life) over the interactions of table."""
+    age_seconds = extract("epoch", func.now() - timestamp_column)
+    weight = func.exp(-math.log(2) * age_seconds / (half_life_days * 24 * 3600))
+    return (
+        select(
+            table.c.item_id,
+            func.count().label("n"),
+            func.sum(func.coalesce(weight, 1.0)).label("decayed"),
+        )
+        .group_by(table.c.item_id)
+        .subquery()
+    )
+
+def refresh_item_popularity(
+        db,
+        half_life_days: float = DEFAULT_HALF_LIFE_DAYS,
+        dislike_weight: float = DEFAULT_DISLIKE_WEIGHT,
+        items_per_category: int = DEFAULT_ITEMS_PER_CATEGORY
+    ) -> int:
+    """
+    Recompute the popularity ranking of every category from user_like_items and user_dislike_items and commit it.
+    The table is replaced in one transaction, so readers see either the previous ranking or the new one.
+    Args:
+        db: Database session.
+        half_life_days (float): Decay of an interaction's weight with its age.
+        dislike_weight (float): Score = decayed likes - dislike_weight * decayed dislikes. Items scoring <= 0 are left out.
+        items_per_category (int): Number of top items kept per category.
+    Returns:
+        Number of ranked (category, item) rows.
+    """
+    likes = _decayed_counts(UserLikeItems.__table__, UserLikeItems.like_timestamp, half_life_days)
+    dislikes = _decayed_counts(user_dislike_items, user_dislike_items.c.dislike_timestamp, half_life_days)
+    item_id = func.coalesce(likes.c.item_id, dislikes.c.item_id)
+    score = func.coalesce(likes.c.decayed, 0.0) - dislike_weight * func.coalesce(dislikes.c.decayed, 0.0)
+    scores = (
+        select(
+            item_id.label("item_id"),
+            score.label("score"),
+            func.coalesce(likes.c.n, 0).label("likes"),
+            func.coalesce(dislikes.c.n, 0).label("dislikes"),
+        )
+        .select_from(likes.join(dislikes, likes.c.item_id == dislikes.c.item_id, full=True))
+        .where(score > 0)
+        .subquery()
+    )
+    # Ranked in every category of the item, ancestors of its leaf categories included
+    memberships = (
+        select(scores, func.unnest(Item.category_ids).label("category_id"))
+        .join_from(scores, Item, Item.id == scores.c.item_id)
+        .subquery()
+    )
+    ranked = (
+        select(
+            memberships.c.category_id,
+            func.row_number().over(
+                partition_by=memberships.c.category_id,
+                order_by=(memberships.c.score.desc(), memberships.c.item_id),
+            ).label("rank"),
+            memberships.c.item_id,
+            memberships.c.score,
+            memberships.c.likes,
+            memberships.c.dislikes,
+        )
+        .subquery()
+    )
+    columns = ["category_id", "rank", "item_id", "score", "likes", "dislikes", "refreshed_at"]
+    top = (
+        select(*[ranked.c[name] for name in columns[:-1]], func.now())
+        .where(ranked.c.rank <= items_per_category)
+    )
+
+    db.execute(delete(ItemPopularity))
+    result = db.execute(insert(ItemPopularity).from_select(columns, top))
+    db.commit()
+    return result.rowcount
+
+
+"""
+Cold-start and explore candidates of the personalized feed
+"""
+def get_popular_unseen_items_from_categories(db, user_id: str, category_ids: List[str], limit: int = 10, facets: FacetFilters = NO_FACET_FILTERS) -> List[Item]:
+    """
+    Retrieve the most popular items of the specified categories that the user has neither liked nor disliked,
+    most popular first. Reads the precomputed ranking, so it returns fewer items than limit (possibly none) when the
+    categories have few ranked items or the user has seen them.
+    Args:
+        db: Database session.
+        user_id (str): User whose likes and dislikes are excluded.
+        category_ids (List[str]): Categories to rank items in; all categories if empty.
+        limit (int): Maximum number of items to return.
+        facets (FacetFilters): Price, designer and colour filters, applied to the ranked items.
+    Returns:
+        List of items, in popularity order.
+    """
+    query = (
+        select(ItemPopularity.item_id, func.min(ItemPopularity.rank).label("rank"))
+        .where(~exists().where(UserLikeItems.user_id == user_id, UserLikeItems.item_id == ItemPopularity.item_id))
+        .where(~exists().where(user_dislike_items.c.user_id == user_id, user_dislike_items.c.item_id == ItemPopularity.item_id))
+        .group_by(ItemPopularity.item_id)
+        .order_by(func.min(ItemPopularity.rank), ItemPopularity.item_id)
+        .limit(limit)
+    )
+    if category_ids:
+        query = query.where(ItemPopularity.category_id.in_(category_ids))
+    clauses = facets.clauses()
+    if clauses:
+        query = query.join(Item, Item.id == ItemPopularity.item_id).where(*clauses)
+    ranked = query.subquery()
+    return (
+        db.query(Item)
+        .join(ranked, Item.id == ranked.c.item_id)
+        .order_by(ranked.c.rank, Item.id)
+        .all()
+    )
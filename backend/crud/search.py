@@ -0,0 +1,174 @@
+import base64
+import json
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, and_, cast, func, literal, or_, select, text
+from models.item import Item
+from crud.item import FacetFilters, NO_FACET_FILTERS
+
+# Text search configuration of items.search_vector and of the queries run against it
+SEARCH_CONFIG = "english"
+# Shorter queries match by full-text prefix only: pg_trgm cannot use its index for fewer than three characters
+MIN_TRIGRAM_QUERY_LENGTH = 3
+
+_QUERY_WORD = re.compile(r"\w+")
+
+# (rank, item id) of the last result of a page; the next page starts after it
+SearchCursor = Tuple[float, str]
+
+
+"""
+Search cursors (keyset paging)
+"""
+def encode_cursor(cursor: SearchCursor) -> str:
+    """Opaque URL-safe token of a search cursor."""
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode("utf-8")).decode("ascii")
+
+def decode_cursor(token: str) -> SearchCursor:
+    """Search cursor of a token made by encode_cursor. Raises ValueError if the token is malformed."""
+    try:
+        rank, item_id = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        return float(rank), str(item_id)
+    except (TypeError, ValueError, UnicodeEncodeError) as e:
+        raise ValueError(f"Invalid search cursor: {token!r}") from e
+
+
+"""
+Lexical search over item names and designers
+"""
+def prefix_tsquery(query: str):
+    """
+    SQL tsquery matching items whose name or designer has every word of query, the last one as a prefix
+    ("free peo" -> 'free' & 'peo':*), so it works while the user is typing. None if query has no words.
+    """
+    words = _QUERY_WORD.findall(query.lower())
+    if not words:
+        return None
+    terms = words[:-1] + [f"{words[-1]}:*"]
+    return func.to_tsquery(SEARCH_CONFIG, " & ".join(terms))
+
+def lexical_search(query: str):
+    """
+    (match, rank) SQL expressions of a free-text query against Item: full-text match of the words on search_vector,
+    or a fuzzy (trigram word similarity) match of the whole query on the name or designer, which also catches typos.
+    Rank is ts_rank_cd of the full-text match plus the best word similarity, as double precision.
+    Returns (None, None) if the query has no words.
+    """
+    tsquery = prefix_tsquery(query)
+    if tsquery is None:
+        return None, None
+    phrase = query.strip()
+    match = Item.search_vector.op("@@")(tsquery)
+    similarity = literal(0.0)
+    if len(phrase) >= MIN_TRIGRAM_QUERY_LENGTH:
+        # q <% column is word_similarity(q, column) > pg_trgm.word_similarity_threshold, and uses the trigram indexes
+        match = or_(match, literal(phrase).op("<%")(Item.name), literal(phrase).op("<%")(Item.designer_name))
+        similarity = func.greatest(func.word_similarity(phrase, Item.name), func.word_similarity(phrase, Item.designer_name))
+    rank = cast(func.ts_rank_cd(Item.search_vector, tsquery) + func.coalesce(similarity, 0.0), Float)
+    return match, rank
+
+def search_items(
+        db,
+        query: str,
+        category_ids: List[str] = [],
+        limit: int = 20,
+        after: Optional[SearchCursor] = None,
+        facets: FacetFilters = NO_FACET_FILTERS
+    ) -> List[Tuple[Item, float]]:
+    """
+    Search items by name and designer, best match first.
+    Args:
+        db: Database session.
+        query (str): Free text as typed by the user.
+        category_ids (List[str]): Only items in any of these categories (or their descendants); all items if empty.
+        limit (int): Maximum number of items to return.
+        after (SearchCursor): Cursor of the last item of the previous page, to get the page after it.
+        facets (FacetFilters): Price, designer and colour filters.
+    Returns:
+        List of (item, rank) tuples, by decreasing rank then item id. The cursor of the next page is
+        (rank, item.id) of the last tuple.
+    """
+    match, rank = lexical_search(query)
+    if match is None:
+        return []
+    matches = (
+        select(Item.id, rank.label("rank"))
+        .where(match)
+        .where(*facets.clauses())
+    )
+    if category_ids:
+        matches = matches.where(Item.category_ids.overlap(category_ids))
+    matches = matches.subquery()
+
+    page = select(matches.c.id, matches.c.rank)
+    if after is not None:
+        after_rank, after_id = after
+        page = page.where(or_(matches.c.rank < after_rank, and_(matches.c.rank == after_rank, matches.c.id > after_id)))
+    page = page.order_by(matches.c.rank.desc(), matches.c.id).limit(limit).subquery()
+
+    return (
+        db.query(Item, page.c.rank)
+        .join(page, Item.id == page.c.id)
+        .order_by(page.c.rank.desc(), Item.id)
+        .all()
+    )
+
+
+"""
+Semantic search over item embeddings
+"""
+def semantic_search_items(
+        db,
+        query_vector,
+        category_ids: List[str] = [],
+        limit: int = 20,
+        facets: FacetFilters = NO_FACET_FILTERS,
+        lexical_query: Optional[str] = None,
+        lexical_weight: float = 0.0,
+        candidates: int = 100,
+        ef_search: int = 100
+    ) -> List[Tuple[Item, float]]:
+    """
+    Items whose detailed_embedding is nearest to a query embedding (see core/query_embeddings.py), optionally blended
+    with the lexical match of the query text.
+    Args:
+        db: Database session.
+        query_vector: Embedding of the query, from the model the items are embedded with.
+        category_ids (List[str]): Only items in any of these categories (or their descendants); all items if empty.
+        limit (int): Maximum number of items to return.
+        facets (FacetFilters): Price, designer and colour filters.
+        lexical_query (str): Query text to blend lexical scores in with; lexical_weight 0 ignores it.
+        lexical_weight (float): Score = (1 - lexical_weight) * cosine similarity + lexical_weight * lexical rank,
+            the rank scaled to 1 for the best lexical match among the candidates.
+        candidates (int): Nearest items (and, when blending, best lexical matches) scored for the blend.
+        ef_search (int): Candidates the HNSW index scan visits. The category and facet filters are applied to those,
+            so selective filters can return fewer than limit items.
+    Returns:
+        List of (item, score) tuples, best first.
+    """
+    distance = Item.detailed_embedding.l2_distance(query_vector)
+    filters = [Item.detailed_embedding.isnot(None), *facets.clauses()]
+    if category_ids:
+        filters.append(Item.category_ids.overlap(category_ids))
+    blend = lexical_weight > 0 and lexical_query is not None
+    match, rank = lexical_search(lexical_query) if blend else (None, None)
+    # Scoped to the current transaction
+    db.execute(text(f"SET LOCAL hnsw.ef_search = {max(int(ef_search), candidates if blend else limit)}"))
+
+    # Item embeddings are unit length, so cosine similarity is 1 - l2_distance^2 / 2
+    if match is None:
+        rows = db.query(Item, distance).filter(*filters).order_by(distance).limit(limit).all()
+        return [(item, 1.0 - item_distance ** 2 / 2) for item, item_distance in rows]
+
+    nearest = db.query(Item.id).filter(*filters).order_by(distance).limit(candidates)
+    best_matches = db.query(Item.id).filter(match, *filters).order_by(rank.desc(), Item.id).limit(candidates)
+    pool = {item_id for item_id, in nearest.all()} | {item_id for item_id, in best_matches.all()}
+    rows = db.query(Item, distance, rank).filter(Item.id.in_(pool)).all()
+    best_rank = max((item_rank for _, _, item_rank in rows), default=0.0)
+    scored = [
+        (item, (1.0 - lexical_weight) * (1.0 - item_distance ** 2 / 2) + lexical_weight * (item_rank / best_rank if best_rank > 0 else 0.0))
+        for item, item_distance, item_rank in rows
+    ]
+    scored.sort(key=lambda pair: (-pair[1], pair[0].id))
+    return scored[:limit]
@@ -0,0 +1,52 @@
+from typing import Optional
+
+from models.sync_checkpoint import SyncCheckpoint
+
+
+"""
+Checkpoints of the batch jobs in scripts/
+"""
+def get_checkpoint(db, job: str, shard: str = "0/1") -> Optional[SyncCheckpoint]:
+    """Retrieve the checkpoint of a job shard, or None if it never ran."""
+    return db.query(SyncCheckpoint).filter(SyncCheckpoint.job == job, SyncCheckpoint.shard == shard).first()
+
+def get_resumable_checkpoint(db, job: str, shard: str = "0/1") -> Optional[SyncCheckpoint]:
+    """Retrieve the checkpoint of an unfinished run of a job shard, or None if the next run should start over."""
+    checkpoint = get_checkpoint(db, job, shard)
+    if checkpoint is None or checkpoint.completed:
+        return None
+    return checkpoint
+
+def save_checkpoint(
+        db,
+        job: str,
+        shard: str = "0/1",
+        category_id: str = None,
+        page_offset: int = 0,
+        added: int = 0,
+        updated: int = 0,
+        skipped: int = 0,
+        unchanged: int = 0,
+        completed: bool = False
+    ) -> SyncCheckpoint:
+    """
+    Create or overwrite the checkpoint of a job shard and commit it.
+    Call it only after the batch it describes has been committed, so a resumed run never skips unsaved work.
+    """
+    checkpoint = get_checkpoint(db, job, shard) or SyncCheckpoint(job=job, shard=shard)
+    checkpoint.category_id = category_id
+    checkpoint.page_offset = page_offset
+    checkpoint.added = added
+    checkpoint.updated = updated
+    checkpoint.skipped = skipped
+    checkpoint.unchanged = unchanged
+    checkpoint.completed = completed
+    db.add(checkpoint)
+    db.commit()
+    return checkpoint
+
+def delete_checkpoint(db, job: str, shard: str = "0/1") -> bool:
+    """Forget a job shard's progress so its next run starts from the beginning."""
+    deleted = db.query(SyncCheckpoint).filter(SyncCheckpoint.job == job, SyncCheckpoint.shard == shard).delete()
+    db.commit()
+    return deleted > 0
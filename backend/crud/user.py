@@ -75,6 +75,28 @@ def update_user(db: Session, user: User, username: Optional[str] = None, passwor
   return user
 
 
+def get_interaction_version(db: Session, user_id: int) -> Optional[int]:
+  """Return the user's interaction version, or None if the user does not exist. Reads only the users row."""
+  return db.query(User.interaction_version).filter(User.id == user_id).scalar()
+
+
+def get_preference_version(db: Session, user_id: int) -> Optional[int]:
+  """Return the user's preference version, or None if the user does not exist. Reads only the users row."""
+  return db.query(User.preference_version).filter(User.id == user_id).scalar()
+
+
+def bump_interaction_version(db: Session, user_id: int, preferences: bool = False) -> None:
+  """
+  Increment the user's interaction version in the current transaction, and the preference version too if the write
+  adds or removes preference items.
+  Does not commit; call it right before the commit of the like/dislike/preference write it belongs to.
+  """
+  values = {User.interaction_version: User.interaction_version + 1}
+  if preferences:
+    values[User.preference_version] = User.preference_version + 1
+  db.query(User).filter(User.id == user_id).update(values, synchronize_session=False)
+
+
 if __name__ == "__main__":
   # test code
   from db.session import SessionLocal
@@ -0,0 +1,31 @@
+import logging
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def deferred_indexes(conn, table_names: List[str]):
+    """
+    Drop the secondary (non-constraint) indexes of the given tables for the duration of a bulk write and rebuild
+    them afterwards from their original definitions.
+    Writing every row of a table while its indexes are in place updates them row by row. That is much slower than
+    building them once at the end, most of all for the HNSW index on items.detailed_embedding, so bulk loads wrap
+    their writes in this. Migrations that rewrite every item drop and recreate that index themselves, with the
+    definition frozen in the revision, since they must not depend on app code that changes after them.
+    """
+    query = (
+        "SELECT indexname, indexdef FROM pg_indexes i "
+        "WHERE schemaname = current_schema() AND tablename = ANY(:tables) "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)"
+    )
+    indexes = conn.execute(text(query), {"tables": list(table_names)}).all()
+    for name, _ in indexes:
+        conn.execute(text(f'DROP INDEX "{name}"'))
+    yield
+    for name, definition in indexes:
+        conn.execute(text(definition))
+    logger.info(f"Rebuilt {len(indexes)} secondary indexes")
@@ -1,6 +1,14 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from core.config import settings
+from core.query_embeddings import query_embedding_cache
+from core.slow_query_log import install_slow_query_log
+from core.timing import TimingMiddleware, install_query_listeners
+from db.session import engine
+
 from routers import user as user_router
 from routers import category as category_router
 from routers import items as items_router
@@ -8,8 +16,17 @@ from routers import likes as likes_router
 from routers import outfit as outfit_router
 from routers import dislikes as dislikes_router
 from routers import preferences as preferences_router
+from routers import metrics as metrics_router
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	# Before the first request rather than on the first semantic search, so no request waits for torch and the model
+	if settings.SEMANTIC_SEARCH_ENABLED:
+		query_embedding_cache.load_model()
+	yield
 
-app = FastAPI(title="Bop-Browse Backend")
+
+app = FastAPI(title="Bop-Browse Backend", lifespan=lifespan)
 
 # Add CORS middleware to allow requests from Expo mobile app
 app.add_middleware(
@@ -20,6 +37,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and SQL statement counts, served at /metrics
+install_query_listeners(engine)
+app.add_middleware(TimingMiddleware, server_timing=settings.SERVER_TIMING_HEADERS)
+install_slow_query_log(engine, settings.SLOW_QUERY_LOG_PATH, settings.SLOW_QUERY_MS, settings.SLOW_QUERY_EXPLAIN_RATE)
+
 app.include_router(user_router.router)
 app.include_router(category_router.router)
 app.include_router(items_router.router)
@@ -27,6 +49,7 @@ app.include_router(likes_router.router)
 app.include_router(outfit_router.router)
 app.include_router(dislikes_router.router)
 app.include_router(preferences_router.router)
+app.include_router(metrics_router.router)
 
 
 @app.get("/", tags=["root"])
@@ -6,6 +6,10 @@ from .category import Category
 from .item import Item
 from .outfit import Outfit
 from .user import User
+from .sync_checkpoint import SyncCheckpoint
+from .outfitless_product import OutfitlessProduct
+from .popularity import ItemPopularity
+from .category_facets import CategoryFacetCount
 
 __all__ = [
     "associations",
@@ -13,4 +17,8 @@ __all__ = [
     "Item",
     "Outfit",
     "User",
+    "SyncCheckpoint",
+    "OutfitlessProduct",
+    "ItemPopularity",
+    "CategoryFacetCount",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, String, ForeignKey, Table, Integer, func, DateTime
+from sqlalchemy import Boolean, Column, String, ForeignKey, Index, Table, Integer, func, DateTime
 from sqlalchemy.orm import relationship
 from db.base import Base
 
@@ -6,7 +6,22 @@ item_category = Table(
     'item_category',
     Base.metadata,
     Column('item_id', String, ForeignKey('items.id'), primary_key=True),
-    Column('category_id', String, ForeignKey('categories.id'), primary_key=True)
+    Column('category_id', String, ForeignKey('categories.id'), primary_key=True),
+    # The primary key only serves item -> categories; category filters need the reverse direction
+    Index('ix_item_category_category_id_item_id', 'category_id', 'item_id'),
+)
+
+# Closure of the category tree: every (ancestor, descendant) pair, each category also paired with itself at depth 0.
+# Written by the catalog sync from the Shopbop category tree; items are only linked to leaf categories in
+# item_category, and "everything under a category" goes through this table
+category_closure = Table(
+    'category_closure',
+    Base.metadata,
+    Column('ancestor_id', String, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True),
+    Column('descendant_id', String, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True),
+    Column('depth', Integer, nullable=False),
+    # The primary key serves ancestor -> descendants; ancestor lookups need the reverse direction
+    Index('ix_category_closure_descendant_id_ancestor_id', 'descendant_id', 'ancestor_id'),
 )
 
 item_outfit = Table(
@@ -14,6 +29,7 @@ item_outfit = Table(
     Base.metadata,
     Column('item_id', String, ForeignKey('items.id'), primary_key=True),
     Column('outfit_id', String, ForeignKey('outfits.id'), primary_key=True),
+    Index('ix_item_outfit_outfit_id_item_id', 'outfit_id', 'item_id'),
 )
 
 class UserLikeItems(Base):
@@ -22,6 +38,11 @@ class UserLikeItems(Base):
     item_id = Column(String, ForeignKey('items.id'), primary_key=True)
     like_timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Closet display reads a user's likes newest first
+    __table_args__ = (
+        Index('ix_user_like_items_user_id_like_timestamp', user_id, like_timestamp.desc()),
+    )
+
     user = relationship("User", back_populates="liked_items")
     item = relationship("Item", back_populates="liked_by_users")
 
@@ -31,6 +52,11 @@ class UserPreferenceItems(Base):
     item_id = Column(String, ForeignKey('items.id'), primary_key=True)
     set_timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Seed sampling for the recommender reads a user's preferences with their timestamps
+    __table_args__ = (
+        Index('ix_user_preference_items_user_id_set_timestamp', user_id, set_timestamp),
+    )
+
     user = relationship("User", back_populates="preference_items")
     item = relationship("Item", back_populates="preferred_by_users")
 
@@ -38,7 +64,9 @@ user_dislike_items = Table(
     'user_dislike_items',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('item_id', String, ForeignKey('items.id'), primary_key=True)
+    Column('item_id', String, ForeignKey('items.id'), primary_key=True),
+    # Decays dislikes in the popularity ranking (scripts/refresh_popularity.py)
+    Column('dislike_timestamp', DateTime(timezone=True), server_default=func.now())
 )
 
 user_like_outfits = Table(
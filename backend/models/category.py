@@ -19,4 +19,4 @@ class Category(Base):
     name = Column(String)
     itemCount = Column(Integer)
 
-    items = relationship("Item", secondary=item_category, back_populates="categories")
+    items = relationship("Item", secondary=item_category, back_populates="leaf_categories")
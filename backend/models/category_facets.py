@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+from db.base import Base
+
+
+class CategoryFacetCount(Base):
+    """
+    Number of items of a category with each designer, colour family and price bucket, rebuilt after every catalog
+    sync (crud/category_facets.py). The facets of a category are one primary-key range instead of GROUP BYs over
+    its items per request.
+    Attributes:
+        category_id (str): Category counted, including the items of its descendants.
+        facet (str): "designer", "color" or "price".
+        value (str): Designer id, colour family, or lower bound in cents of the price bucket (core/facets.py).
+        label (str): Display name of the value (the designer's name); None when the value is its own label.
+        item_count (int): Items of the category with this value.
+        refreshed_at (datetime): When the counts were computed.
+    """
+    __tablename__ = "category_facet_counts"
+    category_id = Column(String, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    facet = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    label = Column(String, nullable=True)
+    item_count = Column(Integer, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,9 +1,21 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, Computed, DateTime, Index, Integer, String, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
 
 from db.base import Base
-from .associations import item_category, item_outfit, user_dislike_items, UserLikeItems
+from .associations import category_closure, item_category, item_outfit, user_dislike_items, UserLikeItems
+from .category import Category
+
+
+def _category_depth():
+    # Number of ancestors of a category, 0 for a root
+    return (
+        select(func.count())
+        .select_from(category_closure)
+        .where(category_closure.c.descendant_id == Category.id, category_closure.c.depth > 0)
+        .scalar_subquery()
+    )
 
 class Item(Base):
     __tablename__ = "items"
@@ -15,14 +27,69 @@ class Item(Base):
     price = Column(String, nullable=True)
     color = Column(String, nullable=True)
     stretch = Column(String, nullable=True)
+    # Bumped whenever update_item changes the item, so cached serialized item cards can be keyed by (id, content_version)
+    content_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set by the catalog sync: hashes of the listing fields and of the outfit membership it last wrote, and when.
+    # A product whose listing fingerprint is unchanged is skipped without calling the outfit API
+    listing_fingerprint = Column(String, nullable=True)
+    outfits_fingerprint = Column(String, nullable=True)
+    synced_at = Column(DateTime(timezone=True), nullable=True)
+    # Denormalized categories of the item: its item_category (leaf) rows and all their ancestors from category_closure,
+    # rewritten by the catalog sync next to them. Category filters at any level test it with one GIN-indexed overlap
+    # (category_ids && ARRAY[...]) instead of an EXISTS per row
+    category_ids = Column(ARRAY(String), nullable=False, default=list, server_default="{}")
+    # Normalized facets of price, designer_name and color (core/facets.py), set by create_item/update_item
+    price_cents = Column(Integer, nullable=True)
+    designer_id = Column(String, nullable=True)
+    color_family = Column(String, nullable=True)
+    # Full-text document of the search endpoint (crud/search.py): name weighted above designer name. Generated by
+    # Postgres, so every write path keeps it current
+    search_vector = Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(designer_name, '')), 'B')",
+            persisted=True,
+        ),
+    )
 
-    product_images = relationship("ProductImages", back_populates="item")
-
+    # Image url suffixes of the item's default colour, in listing order. Stored on the row so feeds read an item card
+    # without another query, and the sync rewrites them with the rest of the item
+    product_images = Column(ARRAY(String), nullable=False, default=list, server_default="{}")
 
     embedding = Column(Vector(768), nullable=True)
     detailed_embedding = Column(Vector(768), nullable=True)
 
-    categories = relationship("Category", secondary=item_category, back_populates="items")
+    # Approximate nearest-neighbour index for the recommender's kNN lookups (ORDER BY detailed_embedding <-> ...)
+    __table_args__ = (
+        Index(
+            'ix_items_detailed_embedding_hnsw', detailed_embedding,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'detailed_embedding': 'vector_l2_ops'},
+        ),
+        Index('ix_items_category_ids', category_ids, postgresql_using='gin'),
+        # Feed facet filters
+        Index('ix_items_price_cents', price_cents),
+        Index('ix_items_designer_id', designer_id),
+        Index('ix_items_color_family', color_family),
+        # Search: full-text match, and fuzzy/typeahead matches of the raw text (needs the pg_trgm extension)
+        Index('ix_items_search_vector', search_vector, postgresql_using='gin'),
+        Index('ix_items_name_trgm', name, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index('ix_items_designer_name_trgm', designer_name, postgresql_using='gin', postgresql_ops={'designer_name': 'gin_trgm_ops'}),
+    )
+
+    # The item's item_category links, to its leaf categories only; written by the catalog sync
+    leaf_categories = relationship("Category", secondary=item_category, back_populates="items")
+    # Every category of the item, leaves and their ancestors (category_ids), root first, as the item's API responses
+    # and embedding text show them. Read-only: it follows category_ids, which the sync refreshes with the links
+    categories = relationship(
+        "Category",
+        primaryjoin="remote(Category.id) == any_(foreign(Item.category_ids))",
+        order_by=lambda: (_category_depth(), Category.id),
+        uselist=True,
+        viewonly=True,
+    )
     outfits = relationship("Outfit", secondary=item_outfit, back_populates="items")
 
     liked_by_users = relationship("UserLikeItems", back_populates="item")
@@ -32,11 +99,3 @@ class Item(Base):
 
     def __repr__(self):
         return f"<Item(id={self.id}, name={self.name})>"
-
-class ProductImages(Base):
-    __tablename__ = "product_images"
-    id = Column(Integer, primary_key=True, index=True)
-    item_id = Column(String, ForeignKey(Item.id, ondelete="CASCADE"))
-    image_url_suffix = Column(String)
-
-    item = relationship("Item", back_populates="product_images")
\ No newline at end of file
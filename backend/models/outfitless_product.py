@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, String
+from db.base import Base
+
+
+class OutfitlessProduct(Base):
+    """
+    Listed product the catalog sync found without any outfit, so it stored no item for it. The next syncs skip the
+    product without calling the outfit API while its listing is unchanged, and check again once checked_at is older
+    than the outfit recheck age, like the fingerprints stored on items.
+    Attributes:
+        product_sin (str): Product sin, the id an item of the product would get.
+        listing_fingerprint (str): ProductInfo.fingerprint() of the listing that was checked.
+        checked_at (datetime): When the outfit API last returned no outfit for it.
+    """
+    __tablename__ = "outfitless_products"
+    product_sin = Column(String, primary_key=True)
+    listing_fingerprint = Column(String, nullable=False)
+    checked_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, func
+from db.base import Base
+
+
+class ItemPopularity(Base):
+    """
+    Ranked most popular items of each category, rebuilt periodically by scripts/refresh_popularity.py.
+    Only the top items of every category are kept, so cold-start and explore feeds read a short index range
+    instead of sorting the category at random.
+    Attributes:
+        category_id (str): Category the item is ranked in (an item appears once per category it belongs to).
+        rank (int): 1 for the most popular item of the category.
+        item_id (str): Ranked item.
+        score (float): Time-decayed likes minus weighted time-decayed dislikes.
+        likes, dislikes (int): Raw interaction counts, for inspection.
+        refreshed_at (datetime): When the ranking was computed.
+    """
+    __tablename__ = "item_popularity"
+    category_id = Column(String, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    item_id = Column(String, ForeignKey("items.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=False)
+    likes = Column(Integer, nullable=False, default=0, server_default="0")
+    dislikes = Column(Integer, nullable=False, default=0, server_default="0")
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Deleting an item cascades here; without it the foreign key check scans the table
+    __table_args__ = (
+        Index("ix_item_popularity_item_id", item_id),
+    )
@@ -0,0 +1,27 @@
+from sqlalchemy import Boolean, Column, DateTime, Integer, String, func
+from db.base import Base
+
+
+class SyncCheckpoint(Base):
+    """
+    Progress of a long-running batch job (catalog sync, item refresh, embeddings), saved after every committed batch
+    so a restarted job resumes where it stopped.
+    Attributes:
+        job (str): Job name, e.g. "catalog_sync".
+        shard (str): "<index>/<count>" of the worker process when the job is split across processes, else "0/1".
+        category_id (str): Leaf category being scanned (catalog sync only).
+        page_offset (int): Offset of the next batch to process, within the category for the catalog sync.
+        added, updated, skipped, unchanged (int): Running counters of the job.
+        completed (bool): The last run finished; the next run starts over.
+    """
+    __tablename__ = "sync_checkpoints"
+    job = Column(String, primary_key=True)
+    shard = Column(String, primary_key=True, default="0/1")
+    category_id = Column(String, nullable=True)
+    page_offset = Column(Integer, nullable=False, default=0, server_default="0")
+    added = Column(Integer, nullable=False, default=0, server_default="0")
+    updated = Column(Integer, nullable=False, default=0, server_default="0")
+    skipped = Column(Integer, nullable=False, default=0, server_default="0")
+    unchanged = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Boolean, nullable=False, default=False, server_default="false")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
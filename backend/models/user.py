@@ -9,6 +9,11 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_new_user = Column(Boolean, default=True)
+    # Bumped on every like/dislike/preference write; used as the ETag of the user's closet endpoints
+    interaction_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped only on preference writes; keys the recommender's cached seed arrays (recommender/seed_sampler.py), which
+    # dislikes and outfit likes do not affect
+    preference_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     liked_items = relationship("UserLikeItems", back_populates="user")
     disliked_items = relationship("Item", secondary=user_dislike_items, back_populates="disliked_by_users")
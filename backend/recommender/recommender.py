@@ -3,51 +3,107 @@ Logic for recommending items based on user's like history and item similarities.
 Using crud operations to fetch data from the database.
 """
 
-from typing import List
-from crud.like_dislike_items import get_user_liked_items_randomized
-from crud.item import get_similar_unseen_items_for_user, get_random_unseen_items_from_categories
+import math
+from typing import List, Optional
 
+import numpy as np
 
-def get_personalized_item_feed_for_user(db, user_id: str, category_ids: List[str], limit: int = 10):
+from crud.category import get_most_specific_category_ids
+from crud.item import NO_FACET_FILTERS, FacetFilters, get_detailed_embeddings, get_unseen_neighbours_of_seeds, get_random_unseen_items_from_categories
+from crud.popularity import get_popular_unseen_items_from_categories
+from recommender.reranker import DEFAULT_CATEGORY_PENALTY, DEFAULT_DIVERSITY, MMRSelector, seed_similarity, stack_vectors
+from recommender.seed_sampler import recency_seed_sampler, uniform_seed_sampler
+from recommender.tracing import FeedTrace
+
+EMBEDDING_DIMENSIONS = 768
+# Candidates fetched per feed slot, so the re-ranking has alternatives to choose from
+POOL_OVERSAMPLING = 3
+
+
+def get_personalized_item_feed_for_user(
+        db,
+        user_id: str,
+        category_ids: List[str],
+        limit: int = 10,
+        weighted_by_timestamp: bool = True,
+        trace: Optional[FeedTrace] = None,
+        diversity: float = DEFAULT_DIVERSITY,
+        category_penalty: float = DEFAULT_CATEGORY_PENALTY,
+        facets: FacetFilters = NO_FACET_FILTERS
+    ):
     """
     Get a personalized item feed for user by getting unseen items that are similar to their liked items and is within the specified categories.
     It will also contain some random items to add diversity.
+    If weighted_by_timestamp is True, more recently liked items are more likely to be picked as seeds.
+
+    Two stages: one deduplicated candidate pool (kNN neighbours of all seeds, plus explore items) is fetched in a fixed
+    number of queries, then re-ranked in NumPy by similarity to the seeds with MMR diversity and category balancing
+    (see recommender/reranker.py for diversity and category_penalty).
+    facets (price, designer, colour) filter every candidate query the same way as category_ids.
+    Each stage is timed in a FeedTrace. Pass one in to read the stages back (the caller then calls trace.finish());
+    otherwise the trace only feeds the recommender metrics.
     """
+    owns_trace = trace is None
+    if owns_trace:
+        trace = FeedTrace()
+
     # if category_ids is empty, get the item from the clothing category to prevent returning non-clothing items
     if len(category_ids) == 0:
         category_ids = ["13266"]
 
 
-    recommended_items = []
     liked_item_number = int(limit * 0.3) # the number of items that the user has already liked to base recommendations on
-    random_liked_items = get_user_liked_items_randomized(db, user_id=user_id, limit=liked_item_number)
+    seed_sampler = recency_seed_sampler if weighted_by_timestamp else uniform_seed_sampler
+    with trace.stage("seed_sampling") as stage:
+        random_liked_items = seed_sampler.sample(db, user_id=user_id, k=liked_item_number)
+        stage.candidates = len(random_liked_items)
 
     similar_items_limit = int(limit * 0.7) # number of items to get based on similarity
 
-    # Get similar items based on liked items
-    for item_id in random_liked_items:
-        similar_items = get_similar_unseen_items_for_user(
-            db,
-            item_id=item_id,
-            user_id=user_id,
-            top_k=similar_items_limit // liked_item_number,
-            category_ids=category_ids
-        )
-        recommended_items.extend(similar_items)
-
+    # Candidate pool, stage 1: neighbours of all seeds in one query, each item once even if it is close to several seeds
+    with trace.stage("candidate_pool") as stage:
+        seed_vectors = get_detailed_embeddings(db, random_liked_items)
+        neighbours = {}
+        if seed_vectors and similar_items_limit > 0:
+            per_seed = math.ceil(similar_items_limit * POOL_OVERSAMPLING / len(seed_vectors))
+            for _, item in get_unseen_neighbours_of_seeds(db, list(seed_vectors), user_id=user_id, per_seed=per_seed, category_ids=category_ids, facets=facets):
+                neighbours.setdefault(item.id, item)
+        stage.candidates = len(neighbours)
 
-    explore_items_limit = limit - len(recommended_items) # number of random items to explore
-    # Get random items to explore
+    # Items to explore, also filling in for missing neighbours (all of the feed on cold start): popular items the user
+    # has not seen, read from the precomputed ranking, then random ones if the ranking runs short
+    explore_items_limit = limit - min(similar_items_limit, len(neighbours))
+    explore = {}
     if explore_items_limit > 0:
-        random_explore_items = get_random_unseen_items_from_categories(
-            db,
-            user_id=user_id,
-            category_ids=category_ids,
-            limit=explore_items_limit
-        )
-        recommended_items.extend(random_explore_items)
+        with trace.stage("explore") as stage:
+            for item in get_popular_unseen_items_from_categories(db, user_id=user_id, category_ids=category_ids, limit=explore_items_limit * 2, facets=facets):
+                if item.id not in neighbours:
+                    explore.setdefault(item.id, item)
+            if len(explore) < explore_items_limit:
+                for item in get_random_unseen_items_from_categories(db, user_id=user_id, category_ids=category_ids, limit=explore_items_limit * 2, facets=facets):
+                    if item.id not in neighbours:
+                        explore.setdefault(item.id, item)
+            stage.candidates = len(explore)
+
+    # Stage 2: score and re-rank the pool
+    with trace.stage("rerank") as stage:
+        pool = list(neighbours.values()) + list(explore.values())
+        categories = get_most_specific_category_ids(db, [item.id for item in pool])
+        vectors = stack_vectors([item.detailed_embedding for item in pool], EMBEDDING_DIMENSIONS)
+        relevance = seed_similarity(vectors, np.stack(list(seed_vectors.values())) if seed_vectors else np.zeros((0, EMBEDDING_DIMENSIONS)))
+        is_neighbour = np.arange(len(pool)) < len(neighbours)
+
+        selector = MMRSelector(vectors, [categories.get(item.id) for item in pool], diversity=diversity, category_penalty=category_penalty)
+        picked = selector.pick(relevance, k=similar_items_limit, eligible=is_neighbour)
+        # Explore picks ignore relevance: the most novel items and categories relative to the feed so far
+        picked += selector.pick(np.zeros_like(relevance), k=limit - len(picked), eligible=~is_neighbour)
+        # Too few explore items: top up with the remaining neighbours
+        picked += selector.pick(relevance, k=limit - len(picked))
+        stage.candidates = len(picked)
 
-    return recommended_items[:limit]
+    if owns_trace:
+        trace.finish()
+    return [pool[index] for index in picked][:limit]
 
 if __name__ == "__main__":
     from db.session import SessionLocal
@@ -55,4 +111,3 @@ if __name__ == "__main__":
     user_id = "1"
     items = get_personalized_item_feed_for_user(db, user_id=user_id, category_ids=["74367"], limit=10)
     print(f"Personalized item feed for user {user_id}: {items}")
-    
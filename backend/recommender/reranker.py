@@ -0,0 +1,93 @@
+"""
+Second stage of the personalized feed: scoring and re-ranking the candidate pool in NumPy.
+The pool (kNN neighbours of every seed plus random explore items, deduplicated) is fetched in a fixed number of
+queries; everything here works on its embedding matrix in memory:
+  - relevance of a candidate is its cosine similarity to the closest seed, for all candidates and seeds at once;
+  - items are picked greedily by maximal marginal relevance (MMR), trading relevance against similarity to what was
+    already picked, so near-duplicates of one seed do not fill the feed;
+  - every pick from a category lowers the score of the remaining candidates of that category, balancing the feed
+    across categories.
+"""
+from typing import Hashable, List, Optional, Sequence
+
+import numpy as np
+
+# Weight of novelty vs relevance in MMR: 0 ranks by relevance only, 1 by dissimilarity to the picked items only
+DEFAULT_DIVERSITY = 0.3
+# Subtracted from a candidate's score for every item already picked from its category
+DEFAULT_CATEGORY_PENALTY = 0.1
+
+
+def unit_rows(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length; all-zero rows (items without an embedding) stay zero."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def stack_vectors(vectors: Sequence[Optional[np.ndarray]], dimensions: int) -> np.ndarray:
+    """Stack embeddings into a matrix, with a zero row for a missing one."""
+    matrix = np.zeros((len(vectors), dimensions), dtype=np.float32)
+    for row, vector in enumerate(vectors):
+        if vector is not None:
+            matrix[row] = vector
+    return matrix
+
+
+def seed_similarity(candidates: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each candidate (row) to its most similar seed (row); 0 when there are no seeds."""
+    if len(candidates) == 0 or len(seeds) == 0:
+        return np.zeros(len(candidates), dtype=np.float32)
+    return (unit_rows(candidates) @ unit_rows(seeds).T).max(axis=1)
+
+
+class MMRSelector:
+    """
+    Greedy maximal-marginal-relevance selection over a candidate pool, with a per-category penalty.
+    pick() can be called several times (e.g. for the similar items, then the explore items): diversity and category
+    counts carry over, so later picks also avoid what earlier ones chose.
+    Args:
+        vectors (np.ndarray): (n, d) candidate embeddings, zero rows for candidates without one.
+        categories (Sequence): Category of each candidate; None never gets a category penalty.
+        diversity (float): MMR trade-off, see DEFAULT_DIVERSITY.
+        category_penalty (float): See DEFAULT_CATEGORY_PENALTY.
+    """
+
+    def __init__(self, vectors: np.ndarray, categories: Sequence[Optional[Hashable]], diversity: float = DEFAULT_DIVERSITY, category_penalty: float = DEFAULT_CATEGORY_PENALTY):
+        self.unit = unit_rows(vectors)
+        self.diversity = diversity
+        self.category_penalty = category_penalty
+        n = len(self.unit)
+        codes = {}
+        # Candidates without a category each get a code of their own
+        self.category_codes = np.array([
+            codes.setdefault(category, len(codes)) if category is not None else -1 - i
+            for i, category in enumerate(categories)
+        ], dtype=np.int64)
+        self._picked_per_category = np.zeros(len(codes), dtype=np.float32)
+        self._max_similarity = np.zeros(n, dtype=np.float32)
+        self._available = np.ones(n, dtype=bool)
+        self.selected: List[int] = []
+
+    def _category_counts(self) -> np.ndarray:
+        known = self.category_codes >= 0
+        counts = np.zeros(len(self.category_codes), dtype=np.float32)
+        counts[known] = self._picked_per_category[self.category_codes[known]]
+        return counts
+
+    def pick(self, relevance: np.ndarray, k: int, eligible: Optional[np.ndarray] = None) -> List[int]:
+        """Pick up to k more candidates among the eligible ones (all by default) and return their indices in pick order."""
+        candidates = self._available.copy() if eligible is None else self._available & eligible
+        picked = []
+        for _ in range(min(k, int(candidates.sum()))):
+            scores = (1 - self.diversity) * relevance - self.diversity * self._max_similarity - self.category_penalty * self._category_counts()
+            scores = np.where(candidates, scores, -np.inf)
+            best = int(np.argmax(scores))
+            picked.append(best)
+            candidates[best] = False
+            self._available[best] = False
+            self._max_similarity = np.maximum(self._max_similarity, self.unit @ self.unit[best])
+            if self.category_codes[best] >= 0:
+                self._picked_per_category[self.category_codes[best]] += 1
+        self.selected.extend(picked)
+        return picked
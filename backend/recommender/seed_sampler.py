@@ -0,0 +1,182 @@
+"""
+Recency-weighted sampling of seed items from a user's preference history.
+The recommender bases each feed on a handful of liked items, preferring recent ones. Instead of computing a random
+key for every preference row and sorting them in the database on every feed call, the sampler keeps a per-user
+array of preference timestamps in memory together with the cumulative weights under a decay function.
+A sample of k seeds is then k binary searches, O(k log n), no matter how many likes the user has.
+The cached array is keyed by the user's preference version, which only preference writes bump (dislikes and outfit
+likes leave it alone). When the new version only added preferences, as every like of a swipe session does, the new
+rows are appended to the cached arrays; the array is rebuilt from scratch only after a preference was removed, or
+once it gets too old for the decay weights to be accurate.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from crud.like_dislike_items import count_user_preferences, get_user_preference_timestamps
+from crud.user import get_preference_version
+
+# Maps the age of each preference in seconds to its (unnormalized) sampling weight
+DecayFunction = Callable[[np.ndarray], np.ndarray]
+
+
+def hyperbolic_decay(scale_seconds: float = 24 * 3600) -> DecayFunction:
+    """Weight 1 / (1 + age / scale): a like from `scale_seconds` ago counts half as much as one from now."""
+    return lambda ages: 1.0 / (1.0 + ages / scale_seconds)
+
+
+def exponential_decay(half_life_seconds: float = 7 * 24 * 3600) -> DecayFunction:
+    """Weight halves every `half_life_seconds`."""
+    rate = math.log(2) / half_life_seconds
+    return lambda ages: np.exp(-rate * ages)
+
+
+def uniform_weights() -> DecayFunction:
+    """Every preference is equally likely, regardless of age."""
+    return lambda ages: np.ones_like(ages)
+
+
+class _UserSeeds:
+    """
+    Cached preference array of one user. Ages are measured from built_at, and latest is the newest set_timestamp
+    in the array, from which later preferences are appended.
+    """
+    __slots__ = ("version", "built_at", "latest", "item_ids", "weights", "cumulative_weights")
+
+    def __init__(self, version: int, built_at: float, latest: Optional[datetime], item_ids: List[str], weights: np.ndarray):
+        self.version = version
+        self.built_at = built_at
+        self.latest = latest
+        self.item_ids = item_ids
+        self.weights = weights
+        self.cumulative_weights = np.cumsum(weights)
+
+    def extended(self, version: int, latest: Optional[datetime], item_ids: List[str], weights: np.ndarray) -> "_UserSeeds":
+        """Copy with more preferences appended; the cumulative weights are extended, not recomputed."""
+        seeds = _UserSeeds.__new__(_UserSeeds)
+        seeds.version = version
+        seeds.built_at = self.built_at
+        seeds.latest = latest
+        seeds.item_ids = self.item_ids + item_ids
+        seeds.weights = np.concatenate([self.weights, weights])
+        total = self.cumulative_weights[-1] if len(self.cumulative_weights) else 0.0
+        seeds.cumulative_weights = np.concatenate([self.cumulative_weights, total + np.cumsum(weights)])
+        return seeds
+
+
+class SeedSampler:
+    """
+    Samples k distinct item ids from a user's preferences with probability proportional to decay(age).
+    Args:
+        decay (DecayFunction): Weight of a preference given its age in seconds.
+        max_users (int): Number of users whose preference arrays are kept in memory (LRU).
+        max_age_seconds (float): Rebuild a cached array older than this even if the user did not interact,
+            since the ages the weights were computed from drift over time.
+    """
+
+    def __init__(self, decay: Optional[DecayFunction] = None, max_users: int = 10000, max_age_seconds: float = 3600):
+        self.decay = decay or hyperbolic_decay()
+        self.max_users = max_users
+        self.max_age_seconds = max_age_seconds
+        self._users: "OrderedDict[int, _UserSeeds]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng()
+
+    def _weigh(self, rows, now: float) -> np.ndarray:
+        # A missing timestamp is treated as a like from right now
+        ages = np.array([max(now - ts.timestamp(), 0.0) if ts is not None else 0.0 for _, ts in rows], dtype=np.float64)
+        return np.asarray(self.decay(ages), dtype=np.float64) if len(rows) else np.zeros(0)
+
+    @staticmethod
+    def _latest(rows, latest: Optional[datetime] = None) -> Optional[datetime]:
+        return max((ts for _, ts in rows if ts is not None), default=latest)
+
+    def _build(self, db, user_id: int, version: int) -> _UserSeeds:
+        rows = get_user_preference_timestamps(db, user_id=user_id)
+        now = time.time()
+        return _UserSeeds(version, now, self._latest(rows), [item_id for item_id, _ in rows], self._weigh(rows, now))
+
+    def _extend(self, db, user_id: int, version: int, seeds: _UserSeeds) -> Optional[_UserSeeds]:
+        """
+        seeds with the preferences set since it was built appended, or None if preferences were removed (or set with
+        a timestamp that is not later than the cached ones), in which case the array has to be rebuilt.
+        """
+        if seeds.latest is None:
+            return None
+        rows = get_user_preference_timestamps(db, user_id=user_id, after=seeds.latest)
+        # Only appends if nothing but the new rows changed the count
+        if len(seeds.item_ids) + len(rows) != count_user_preferences(db, user_id=user_id):
+            return None
+        return seeds.extended(version, self._latest(rows, seeds.latest), [item_id for item_id, _ in rows], self._weigh(rows, seeds.built_at))
+
+    def _get_user_seeds(self, db, user_id: int) -> Optional[_UserSeeds]:
+        version = get_preference_version(db, user_id)
+        if version is None:
+            return None
+        with self._lock:
+            seeds = self._users.get(user_id)
+            if seeds is not None and time.time() - seeds.built_at >= self.max_age_seconds:
+                seeds = None
+            if seeds is not None and seeds.version == version:
+                self._users.move_to_end(user_id)
+                return seeds
+
+        seeds = (seeds is not None and self._extend(db, user_id, version, seeds)) or self._build(db, user_id, version)
+        with self._lock:
+            self._users[user_id] = seeds
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return seeds
+
+    def _sample_indices(self, seeds: _UserSeeds, k: int) -> List[int]:
+        n = len(seeds.item_ids)
+        total = seeds.cumulative_weights[-1]
+        if k >= n or total <= 0:
+            return list(self._rng.permutation(n)[:k])
+
+        # Draw with replacement by binary search over the cumulative weights and drop repeats.
+        # A few rounds are enough unless the weights are concentrated on very few items.
+        chosen: List[int] = []
+        seen = set()
+        for _ in range(4):
+            draws = np.searchsorted(seeds.cumulative_weights, self._rng.random(2 * (k - len(chosen))) * total, side="right")
+            for index in draws:
+                index = int(min(index, n - 1))
+                if index not in seen:
+                    seen.add(index)
+                    chosen.append(index)
+                    if len(chosen) == k:
+                        return chosen
+
+        # Fallback for skewed weights: Efraimidis-Spirakis keys -log(u) / w over the remaining items, O(n)
+        keys = -np.log(self._rng.random(n)) / np.maximum(seeds.weights, np.finfo(np.float64).tiny)
+        keys[list(seen)] = np.inf
+        rest = np.argpartition(keys, k - len(chosen) - 1)[:k - len(chosen)]
+        return chosen + [int(i) for i in rest[np.argsort(keys[rest])]]
+
+    def sample(self, db, user_id: int, k: int) -> List[str]:
+        """Return up to k distinct item ids from the user's preferences, favouring recent ones."""
+        if k <= 0:
+            return []
+        seeds = self._get_user_seeds(db, user_id)
+        if seeds is None or not seeds.item_ids:
+            return []
+        with self._lock:
+            indices = self._sample_indices(seeds, k)
+        return [seeds.item_ids[i] for i in indices]
+
+    def clear(self):
+        """Drop every cached preference array."""
+        with self._lock:
+            self._users.clear()
+
+
+# Shared samplers used by the recommender
+recency_seed_sampler = SeedSampler(decay=hyperbolic_decay())
+uniform_seed_sampler = SeedSampler(decay=uniform_weights())
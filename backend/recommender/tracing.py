@@ -0,0 +1,106 @@
+"""
+Stage-level tracing of the personalized feed.
+A FeedTrace records, for each stage of building a feed (seed_sampling, candidate_pool: the neighbours of all seeds
+in one kNN query, explore: popular then random unseen items, rerank, and the endpoint's render), how long it took,
+how many candidates it produced and how many SQL round trips it made. Round trips are
+counted by a cursor listener on every engine that credits the stage active in the current context, so nothing has
+to be threaded through the crud functions.
+Finished traces feed the recommender_* histograms served at /metrics; the feed endpoint can also return a trace to
+the client (?explain=true, or a Server-Timing header when SERVER_TIMING_HEADERS is on).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.metrics import COUNT_BUCKETS, registry
+
+FEED_DURATION = registry.histogram("recommender_feed_duration_seconds", "Time to build a personalized feed.")
+STAGE_DURATION = registry.histogram("recommender_stage_duration_seconds", "Duration of each personalized feed stage.", ["stage"])
+STAGE_CANDIDATES = registry.histogram("recommender_stage_candidates", "Candidates produced by each personalized feed stage.", ["stage"], buckets=COUNT_BUCKETS)
+STAGE_DB_ROUND_TRIPS = registry.histogram("recommender_stage_db_round_trips", "SQL round trips made by each personalized feed stage.", ["stage"], buckets=COUNT_BUCKETS)
+
+
+class Stage:
+    """One timed step of a feed. detail identifies the step among several of the same name (e.g. the seed item id)."""
+    __slots__ = ("name", "detail", "duration_ms", "candidates", "db_round_trips")
+
+    def __init__(self, name: str, detail: Optional[str] = None):
+        self.name = name
+        self.detail = detail
+        self.duration_ms = 0.0
+        self.candidates = 0
+        self.db_round_trips = 0
+
+    def to_dict(self) -> Dict:
+        stage = {"stage": self.name, "duration_ms": round(self.duration_ms, 3), "candidates": self.candidates, "db_round_trips": self.db_round_trips}
+        if self.detail is not None:
+            stage["detail"] = self.detail
+        return stage
+
+
+_active_stage: ContextVar[Optional[Stage]] = ContextVar("active_recommender_stage", default=None)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_round_trip(conn, cursor, statement, parameters, context, executemany):
+    stage = _active_stage.get()
+    if stage is not None:
+        stage.db_round_trips += 1
+
+
+class FeedTrace:
+    def __init__(self):
+        self.stages: List[Stage] = []
+        self.total_ms: Optional[float] = None
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, detail: Optional[str] = None):
+        """Time the block as a stage; set .candidates on the yielded Stage."""
+        stage = Stage(name, detail)
+        token = _active_stage.set(stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.duration_ms = (time.perf_counter() - start) * 1000
+            _active_stage.reset(token)
+            self.stages.append(stage)
+
+    def finish(self):
+        """Close the trace and record it in the recommender metrics."""
+        self.total_ms = (time.perf_counter() - self._start) * 1000
+        FEED_DURATION.observe(self.total_ms / 1000)
+        for stage in self.stages:
+            STAGE_DURATION.observe(stage.duration_ms / 1000, stage=stage.name)
+            STAGE_CANDIDATES.observe(stage.candidates, stage=stage.name)
+            STAGE_DB_ROUND_TRIPS.observe(stage.db_round_trips, stage=stage.name)
+
+    def totals_by_stage(self) -> Dict[str, Dict]:
+        """Stages of the same name (e.g. every kNN lookup) summed together, in first-seen order."""
+        totals: Dict[str, Dict] = {}
+        for stage in self.stages:
+            total = totals.setdefault(stage.name, {"count": 0, "duration_ms": 0.0, "candidates": 0, "db_round_trips": 0})
+            total["count"] += 1
+            total["duration_ms"] += stage.duration_ms
+            total["candidates"] += stage.candidates
+            total["db_round_trips"] += stage.db_round_trips
+        return totals
+
+    def to_dict(self) -> Dict:
+        return {
+            "total_ms": round(self.total_ms, 3) if self.total_ms is not None else None,
+            "stages": [stage.to_dict() for stage in self.stages],
+            "totals": self.totals_by_stage(),
+        }
+
+    def server_timing(self) -> str:
+        """Per-stage totals in Server-Timing header syntax, e.g. rec-explore;dur=12.3;desc="5 candidates, 1 queries"."""
+        return ", ".join(
+            f'rec-{name};dur={total["duration_ms"]:.1f};desc="{total["candidates"]} candidates, {total["db_round_trips"]} queries"'
+            for name, total in self.totals_by_stage().items()
+        )
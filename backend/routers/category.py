@@ -3,7 +3,8 @@ from sqlalchemy.orm import Session
 
 from db.session import SessionLocal
 from crud import category as crud_category
-from schemas.category import CategoryOut
+from crud import category_facets as crud_category_facets
+from schemas.category import CategoryFacetsOut, CategoryOut
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
@@ -23,6 +24,14 @@ def read_category(category_id: str, db: Session = Depends(get_db)):
 		raise HTTPException(status_code=404, detail="Category not found")
 	return category
 
+@router.get("/{category_id}/facets", response_model=CategoryFacetsOut)
+def read_category_facets(category_id: str, db: Session = Depends(get_db)):
+	"""Item counts of the category by designer, colour family and price bucket, as of the last catalog sync."""
+	category = crud_category.get_category(db, category_id)
+	if not category:
+		raise HTTPException(status_code=404, detail="Category not found")
+	return crud_category_facets.get_category_facets(db, category)
+
 @router.get("/", response_model=list[CategoryOut])
 def get_all_categories(db: Session = Depends(get_db)):
 	categories = crud_category.get_all_categories(db)
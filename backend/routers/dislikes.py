@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 
 from db.session import SessionLocal
+from core.etag import check_user_etag
 from crud import like_dislike_items as crud_likes
 from schemas.dislike import DislikeRequest, DislikeResponse
 from schemas.item import ItemOut
@@ -48,10 +49,16 @@ def dislike_item(
 @router.get("/{user_id}", response_model=List[ItemOut])
 def get_user_dislikes(
     user_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """Get all items disliked by a user"""
     try:
+        not_modified = check_user_etag(db, request, response, user_id)
+        if not_modified is not None:
+            return not_modified
+
         # Get user to access disliked_items
         from models.user import User
         user = db.query(User).filter(User.id == user_id).first()
@@ -1,11 +1,17 @@
-from typing import List, Optional, Optional
-from fastapi import APIRouter, Depends, Query
+import json
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
 from db.session import SessionLocal
+from core.config import settings
+from core.item_cards import item_card_cache, item_cards_response
+from core.query_embeddings import query_embedding_cache
 from crud import item as crud_item
+from crud import search as crud_search
 from recommender import recommender
-from schemas.item import ItemOut, PersonalizedFeedRequest
+from recommender.tracing import FeedTrace
+from schemas.item import ItemOut, ItemSearchResults, PersonalizedFeedExplainOut, PersonalizedFeedRequest
 
 router = APIRouter(prefix="/items", tags=["items"])
 
@@ -23,24 +29,98 @@ def get_feed(
 	category_id: Optional[str] = Query(None, description="Optional category filter. If not provided, returns items from all categories"),
 	offset: int = Query(0, ge=0),
 	limit: int = Query(10, ge=1, le=100),
+	min_price_cents: Optional[int] = Query(None, ge=0),
+	max_price_cents: Optional[int] = Query(None, ge=0),
+	designer_id: Optional[List[str]] = Query(None, description="Designer ids (slugified designer names); repeat for several"),
+	color_family: Optional[List[str]] = Query(None, description="Colour families, e.g. black, blue, multi; repeat for several"),
 	db: Session = Depends(get_db),
 ):
-	"""Return items feed, optionally filtered by category. Returns all items if no category specified."""
+	"""Return items feed, optionally filtered by category, price range, designers and colour families. Returns all items if no filter is specified."""
 	category_ids = [category_id] if category_id is not None else []
-	items = crud_item.get_items_by_categories_filter(db, category_ids, offset=offset, limit=limit)
-	return items
+	facets = crud_item.FacetFilters(min_price_cents, max_price_cents, designer_id or [], color_family or [])
+	items = crud_item.get_items_by_categories_filter(db, category_ids, offset=offset, limit=limit, facets=facets)
+	return item_cards_response(items)
 
-@router.post("/personalized-feed", response_model=List[ItemOut])
+@router.get("/search", response_model=ItemSearchResults)
+def search_items(
+	q: str = Query(..., min_length=1, max_length=200, description="Free text matched against item names and designers; the last word may be partial"),
+	category_id: Optional[List[str]] = Query(None, description="Category filter; repeat for several"),
+	limit: int = Query(20, ge=1, le=100),
+	cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+	min_price_cents: Optional[int] = Query(None, ge=0),
+	max_price_cents: Optional[int] = Query(None, ge=0),
+	designer_id: Optional[List[str]] = Query(None, description="Designer ids (slugified designer names); repeat for several"),
+	color_family: Optional[List[str]] = Query(None, description="Colour families, e.g. black, blue, multi; repeat for several"),
+	db: Session = Depends(get_db),
+):
+	"""Search items by name and designer, best match first, a page at a time."""
+	try:
+		after = crud_search.decode_cursor(cursor) if cursor is not None else None
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+	facets = crud_item.FacetFilters(min_price_cents, max_price_cents, designer_id or [], color_family or [])
+	results = crud_search.search_items(db, q, category_ids=category_id or [], limit=limit, after=after, facets=facets)
+	# A full page may have more after it; a short one is the last
+	next_cursor = crud_search.encode_cursor((results[-1][1], results[-1][0].id)) if len(results) == limit else None
+	cards = item_card_cache.render(item for item, _ in results)
+	return Response(content=b'{"items":' + cards + b',"next_cursor":' + json.dumps(next_cursor).encode("utf-8") + b"}", media_type="application/json")
+
+@router.get("/semantic-search", response_model=List[ItemOut])
+def semantic_search_items(
+	q: str = Query(..., min_length=1, max_length=200, description="Free-text description of what to find, e.g. 'flowy summer dress'"),
+	category_id: Optional[List[str]] = Query(None, description="Category filter; repeat for several"),
+	limit: int = Query(20, ge=1, le=100),
+	lexical_weight: float = Query(0.0, ge=0.0, le=1.0, description="Weight of name/designer text matches against embedding similarity"),
+	min_price_cents: Optional[int] = Query(None, ge=0),
+	max_price_cents: Optional[int] = Query(None, ge=0),
+	designer_id: Optional[List[str]] = Query(None, description="Designer ids (slugified designer names); repeat for several"),
+	color_family: Optional[List[str]] = Query(None, description="Colour families, e.g. black, blue, multi; repeat for several"),
+	db: Session = Depends(get_db),
+):
+	"""Return the items whose embeddings are closest to the query's, best first, optionally blended with lexical matches."""
+	if not query_embedding_cache.loaded:
+		raise HTTPException(status_code=503, detail="Semantic search is not enabled on this instance")
+	query_vector = query_embedding_cache.get(q)
+	facets = crud_item.FacetFilters(min_price_cents, max_price_cents, designer_id or [], color_family or [])
+	results = crud_search.semantic_search_items(
+		db,
+		query_vector,
+		category_ids=category_id or [],
+		limit=limit,
+		facets=facets,
+		lexical_query=q,
+		lexical_weight=lexical_weight,
+	)
+	return item_cards_response(item for item, _ in results)
+
+@router.post("/personalized-feed", response_model=Union[List[ItemOut], PersonalizedFeedExplainOut])
 def get_personalized_feed(
 	request: PersonalizedFeedRequest,
 	db: Session = Depends(get_db),
-	weighted_by_timestamp: bool = Query(True, description="Whether to weight liked items by recency")
+	weighted_by_timestamp: bool = Query(True, description="Whether to weight liked items by recency"),
+	explain: bool = Query(False, description="Return {items, explain} with the duration, candidate count and DB round trips of each recommender stage")
 ):
 	"""Return a personalized item feed for the user based on their like history and specified categories."""
+	trace = FeedTrace()
 	items = recommender.get_personalized_item_feed_for_user(
 		db,
 		user_id=request.user_id,
 		category_ids=request.category_ids or [],
-		limit=request.limit or 10
+		limit=request.limit or 10,
+		weighted_by_timestamp=weighted_by_timestamp,
+		trace=trace,
+		facets=crud_item.FacetFilters(request.min_price_cents, request.max_price_cents, request.designer_ids or [], request.color_families or [])
 	)
-	return items
\ No newline at end of file
+	with trace.stage("render") as stage:
+		cards = item_card_cache.render(items)
+		stage.candidates = len(items)
+	trace.finish()
+
+	if explain:
+		content = b'{"items":' + cards + b',"explain":' + json.dumps(trace.to_dict()).encode("utf-8") + b"}"
+	else:
+		content = cards
+	response = Response(content=content, media_type="application/json")
+	if settings.SERVER_TIMING_HEADERS:
+		response.headers.append("Server-Timing", trace.server_timing())
+	return response
\ No newline at end of file
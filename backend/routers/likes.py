@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from db.session import SessionLocal
+from core.etag import check_user_etag
 from crud import like_dislike_items as crud_likes
-from schemas.like import LikeRequest, LikeResponse, UserLikesOutfitsResponse, UserLikesResponse
+from schemas.like import LikeRequest, LikeResponse, UserLikesOutfitsResponse, UserLikesOutfitsCompactResponse, UserLikesResponse
 from schemas.item import ItemOut, ItemWithCategories
-from scripts.sync_items import SyncItems
 
 router = APIRouter(prefix="/likes", tags=["likes"])
 
@@ -29,6 +29,8 @@ def like_item(
         result = crud_likes.like_item(db, user_id=like_data.user_id, item_id=like_data.item_id)
         
         if result is None:
+            # Imported here so the sync stack (Shopbop client, httpx) only loads when the catalog misses an item
+            from scripts.sync_items import SyncItems
             if not SyncItems().addItemByProductSin(like_data.item_id):
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -57,10 +59,16 @@ def like_item(
 @router.get("/{user_id}", response_model=List[ItemWithCategories])
 def get_user_likes(
     user_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """Get all items liked by a user"""
     try:
+        not_modified = check_user_etag(db, request, response, user_id)
+        if not_modified is not None:
+            return not_modified
+
         liked_items = crud_likes.get_user_liked_items_for_closet_display(db, user_id=user_id)
         
         if liked_items is None:
@@ -85,6 +93,7 @@ def like_outfit(
 ):
     """Like an outfit - adds it to the user's liked outfits"""
     try:
+        from scripts.sync_items import SyncItems
         SyncItems().addRelatedItemByOutfitId(like_data.item_id)
         result = crud_likes.like_outfit(db, user_id=like_data.user_id, outfit_id=like_data.item_id)
         
@@ -105,19 +114,28 @@ def like_outfit(
             detail=f"Error liking outfit: {str(e)}"
         )
 
-@router.get("/outfits/{user_id}", response_model=UserLikesOutfitsResponse)
+@router.get("/outfits/{user_id}", response_model=Union[UserLikesOutfitsResponse, UserLikesOutfitsCompactResponse])
 def get_user_likes_outfits(
     user_id: int,
+    request: Request,
+    response: Response,
+    compact: bool = Query(False, description="Return only the item ids of each outfit instead of full items"),
     db: Session = Depends(get_db)
 ):
     """Get all outfits liked by a user"""
     try:
-        liked_outfits = crud_likes.get_user_liked_outfits(db, user_id=user_id)
+        not_modified = check_user_etag(db, request, response, user_id)
+        if not_modified is not None:
+            return not_modified
+
+        liked_outfits = crud_likes.get_user_liked_outfits(db, user_id=user_id, compact=compact)
         if liked_outfits is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
+        if compact:
+            return UserLikesOutfitsCompactResponse(user_id=user_id, liked_outfits=liked_outfits)
         return UserLikesOutfitsResponse(user_id=user_id, liked_outfits=liked_outfits)
     except HTTPException:
         raise
@@ -183,11 +201,17 @@ def unlike_outfit(
 @router.get("/by-category/{user_id}", response_model=List[ItemOut])
 def get_user_likes_by_category(
     user_id: int,
+    request: Request,
+    response: Response,
     category_id: str = Query(..., description="Category ID to filter liked items"),
     db: Session = Depends(get_db)
 ):
     """Get all liked items for a user filtered by category"""
     try:
+        not_modified = check_user_etag(db, request, response, user_id)
+        if not_modified is not None:
+            return not_modified
+
         liked_items = crud_likes.get_user_liked_items_by_category(
             db, 
             user_id=user_id, 
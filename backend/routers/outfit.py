@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Union
 
 from db.session import SessionLocal
 from crud import outfit as crud_outfit
-from schemas.outfit import OutfitOut
+from schemas.outfit import OutfitOut, OutfitCompactOut
 
 router = APIRouter(prefix="/outfits", tags=["outfits"])
 
@@ -17,11 +17,14 @@ def get_db():
         db.close()
 
 
-@router.get("/", response_model=List[OutfitOut])
+@router.get("/", response_model=Union[List[OutfitOut], List[OutfitCompactOut]])
 def get_outfits_by_item(
     item_id: str = Query(..., description="Item ID to find outfits for"),
+    compact: bool = Query(False, description="Return only the item ids of each outfit instead of full items"),
     db: Session = Depends(get_db)
 ):
     """Get all outfits containing a specific item"""
-    outfits = crud_outfit.get_outfits_by_item_id(db, item_id=item_id)
+    outfits = crud_outfit.get_outfits_by_item_id(db, item_id=item_id, compact=compact)
+    if compact:
+        return [OutfitCompactOut.model_validate(outfit) for outfit in outfits]
     return outfits
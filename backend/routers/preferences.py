@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 
 from db.session import SessionLocal
+from core.etag import check_user_etag
 from crud import like_dislike_items as crud_likes
 from schemas.preference import PreferenceRequest, PreferenceResponse
 from schemas.item import ItemWithCategories
@@ -52,10 +53,16 @@ def add_preference(
 @router.get("/{user_id}", response_model=List[ItemWithCategories])
 def get_user_preferences(
     user_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """Get all preferences (liked items) for a user"""
     try:
+        not_modified = check_user_etag(db, request, response, user_id)
+        if not_modified is not None:
+            return not_modified
+
         preferences = crud_likes.get_user_preferences(db, user_id=user_id)
         
         if preferences is None:
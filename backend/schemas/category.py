@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -9,3 +10,24 @@ class CategoryOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class FacetValueCount(BaseModel):
+    value: str
+    label: str
+    count: int
+
+
+class PriceBucketCount(BaseModel):
+    min_price_cents: int
+    max_price_cents: Optional[int] = None
+    count: int
+
+
+class CategoryFacetsOut(BaseModel):
+    category_id: str
+    item_count: int
+    designers: List[FacetValueCount]
+    colors: List[FacetValueCount]
+    prices: List[PriceBucketCount]
+    refreshed_at: Optional[datetime] = None
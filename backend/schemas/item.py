@@ -1,5 +1,5 @@
-from typing import Optional, List
-from pydantic import BaseModel, field_validator
+from typing import Dict, Optional, List
+from pydantic import BaseModel, Field
 
 from schemas.category import CategoryOut
 
@@ -15,10 +15,6 @@ class ItemOut(BaseModel):
     stretch: Optional[str] = None
     product_images: Optional[List[str]] = []
 
-    @field_validator("product_images", mode="before")
-    def collapse(cls, v):
-        return [img.image_url_suffix for img in v]
-
     class Config:
         orm_mode = True
         from_attributes = True
@@ -29,6 +25,40 @@ class PersonalizedFeedRequest(BaseModel):
     user_id: int
     category_ids: Optional[List[str]] = []
     limit: Optional[int] = 10
+    # Facet filters, see core/facets.py
+    min_price_cents: Optional[int] = Field(None, ge=0)
+    max_price_cents: Optional[int] = Field(None, ge=0)
+    designer_ids: Optional[List[str]] = []
+    color_families: Optional[List[str]] = []
+
+class ItemSearchResults(BaseModel):
+    items: List[ItemOut]
+    # Pass as cursor to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+class FeedStageOut(BaseModel):
+    stage: str
+    duration_ms: float
+    candidates: int
+    db_round_trips: int
+    detail: Optional[str] = None
+
+class FeedStageTotalOut(BaseModel):
+    count: int
+    duration_ms: float
+    candidates: int
+    db_round_trips: int
+
+class FeedExplainOut(BaseModel):
+    """Recommender stages of a personalized feed request (recommender/tracing.py FeedTrace.to_dict)."""
+    total_ms: Optional[float] = None
+    stages: List[FeedStageOut]
+    # Stages of the same name summed together, keyed by name
+    totals: Dict[str, FeedStageTotalOut]
+
+class PersonalizedFeedExplainOut(BaseModel):
+    items: List[ItemOut]
+    explain: FeedExplainOut
 
 class ItemWithCategories(ItemOut):
     categories: List[CategoryOut] = []
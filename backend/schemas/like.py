@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from typing import List
 
-from schemas.outfit import OutfitOut
+from schemas.outfit import OutfitOut, OutfitCompactOut
 
 
 class LikeRequest(BaseModel):
@@ -35,4 +35,9 @@ class UserLikesResponse(BaseModel):
 class UserLikesOutfitsResponse(BaseModel):
     """Schema for getting user's liked outfits"""
     user_id: int
-    liked_outfits: List[OutfitOut]
\ No newline at end of file
+    liked_outfits: List[OutfitOut]
+
+class UserLikesOutfitsCompactResponse(BaseModel):
+    """Schema for getting user's liked outfits with item ids only"""
+    user_id: int
+    liked_outfits: List[OutfitCompactOut]
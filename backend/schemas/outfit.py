@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from typing import List
 
 from schemas.item import ItemOut
@@ -14,3 +14,17 @@ class OutfitOut(BaseModel):
     class Config:
         orm_mode = True
         from_attributes = True
+
+
+class OutfitCompactOut(BaseModel):
+    """Schema for outfit output with item ids only"""
+    id: str
+    image_url_suffix: Optional[str] = None
+    item_ids: List[str] = Field([], validation_alias="items")
+
+    @field_validator("item_ids", mode="before")
+    def collapse(cls, v):
+        return [item.id for item in v]
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,150 @@
+"""
+Query plan regression check for the hot read paths in crud/.
+Runs each hot crud function against a seeded database, captures the SQL it issues, and re-runs every statement
+under EXPLAIN with sequential scans disabled. With enable_seqscan off the planner only falls back to a full scan
+when no usable index exists, so the check is meaningful even on a small local database.
+Exits with status 1 if any statement reads one of the interaction/association tables in full.
+
+Usage (DATABASE_URL should point at a seeded local Postgres, never at production):
+    python -m scripts.check_query_plans
+"""
+import json
+import logging
+import sys
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import event, text
+
+from db.session import SessionLocal, engine
+from crud import category as crud_category, category_facets as crud_category_facets, item as crud_item, like_dislike_items as crud_likes, outfit as crud_outfit, popularity as crud_popularity, search as crud_search
+from schemas.item import ItemOut
+from schemas.outfit import OutfitOut
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tables that must always be reached through an index. items itself is excluded on purpose:
+# the random and vector-ordered feeds scan it by design.
+INDEXED_TABLES = {
+    "item_category",
+    "item_outfit",
+    "user_like_items",
+    "user_preference_items",
+    "user_dislike_items",
+    "user_like_outfits",
+    "item_popularity",
+    "category_facet_counts",
+}
+
+
+@contextmanager
+def capture_statements():
+    """Collect (statement, parameters) for every SELECT executed on the engine inside the block."""
+    captured: List[Tuple[str, object]] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _full_scanned_tables(plan: Dict) -> List[str]:
+    """
+    Walk an EXPLAIN (FORMAT JSON) plan tree and return the relations read in full: a Seq Scan, or an index scan
+    without an Index Cond (with seqscan disabled the planner walks a whole primary key index instead).
+    """
+    found = []
+    node_type = plan.get("Node Type")
+    if node_type == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    elif node_type in ("Index Scan", "Index Only Scan") and "Index Cond" not in plan:
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(_full_scanned_tables(child))
+    return found
+
+
+def explain_without_seqscan(db, statement: str, parameters) -> Dict:
+    conn = db.connection()
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    row = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    plan = row if isinstance(row, list) else json.loads(row)
+    return plan[0]["Plan"]
+
+
+def _sample_ids(db) -> Dict[str, object]:
+    """Pick ids from the seeded data to drive the hot queries."""
+    def first(sql):
+        return db.execute(text(sql)).scalar()
+
+    return {
+        "user_id": first("SELECT user_id FROM user_like_items GROUP BY user_id ORDER BY count(*) DESC LIMIT 1"),
+        "category_id": first("SELECT category_id FROM item_category GROUP BY category_id ORDER BY count(*) DESC LIMIT 1"),
+        "item_id": first("SELECT item_id FROM item_outfit LIMIT 1"),
+    }
+
+
+def hot_queries(ids: Dict[str, object]) -> Dict[str, Callable]:
+    """Hot read paths, each serialized the way its endpoint does so relationship loads are captured too."""
+    user_id, category_id, item_id = ids["user_id"], ids["category_id"], ids["item_id"]
+    return {
+        "closet display": lambda db: [ItemOut.model_validate(i) for i in crud_likes.get_user_liked_items_for_closet_display(db, user_id=user_id)],
+        "liked items by category": lambda db: crud_likes.get_user_liked_items_by_category(db, user_id=user_id, category_id=category_id),
+        "liked outfits": lambda db: [OutfitOut.model_validate(o) for o in crud_likes.get_user_liked_outfits(db, user_id=user_id)],
+        "preferences": lambda db: crud_likes.get_user_preferences(db, user_id=user_id),
+        "seed sampling": lambda db: crud_likes.get_user_preference_timestamps(db, user_id=user_id),
+        "category feed": lambda db: [ItemOut.model_validate(i) for i in crud_item.get_items_by_categories_filter(db, [category_id], limit=10)],
+        "price-filtered category feed": lambda db: crud_item.get_items_by_categories_filter(db, [category_id], limit=10, facets=crud_item.FacetFilters(min_price_cents=5000, max_price_cents=20000)),
+        "unseen explore items": lambda db: crud_item.get_random_unseen_items_from_categories(db, user_id=user_id, category_ids=[category_id], limit=10),
+        "popular unseen items": lambda db: crud_popularity.get_popular_unseen_items_from_categories(db, user_id=user_id, category_ids=[category_id], limit=10),
+        "category facets": lambda db: crud_category_facets.get_category_facets(db, crud_category.get_category(db, category_id)),
+        "item search": lambda db: [ItemOut.model_validate(i) for i, _ in crud_search.search_items(db, "silk dre", category_ids=[category_id], limit=20)],
+        "outfits by item": lambda db: [OutfitOut.model_validate(o) for o in crud_outfit.get_outfits_by_item_id(db, item_id=item_id)],
+    }
+
+
+def check_query_plans() -> List[str]:
+    """Run every hot query and return a list of failure descriptions (empty when all plans use indexes)."""
+    db = SessionLocal()
+    failures = []
+    try:
+        ids = _sample_ids(db)
+        if any(value is None for value in ids.values()):
+            raise RuntimeError(f"Database is not seeded with likes, categories and outfits: {ids}")
+
+        for name, run in hot_queries(ids).items():
+            with capture_statements() as statements:
+                run(db)
+            db.rollback()
+
+            # relationship loads repeat the same statement with different ids; explain each shape once
+            seen = set()
+            for statement, parameters in statements:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                plan = explain_without_seqscan(db, statement, parameters)
+                db.rollback()
+                scanned = [t for t in _full_scanned_tables(plan) if t in INDEXED_TABLES]
+                if scanned:
+                    failures.append(f"{name}: full scan of {', '.join(scanned)}\n    {' '.join(statement.split())}")
+            logger.info(f"Checked {name}: {len(seen)} statement(s)")
+    finally:
+        db.close()
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check_query_plans()
+    for failure in failures:
+        logger.error(failure)
+    if failures:
+        logger.error(f"{len(failures)} hot statement(s) fell back to a full table scan.")
+        sys.exit(1)
+    logger.info("All hot queries are index-driven.")
@@ -0,0 +1,299 @@
+"""
+Fast offline catalog loader based on COPY.
+Building a dev/test/benchmark database with sync_items means hours of Shopbop API calls. This script instead:
+  - exports the catalog tables of an existing database to a snapshot directory (COPY ... TO, binary or CSV),
+  - imports such a snapshot into another database (COPY ... FROM with indexes rebuilt afterwards, no per-row Python work),
+  - generates a synthetic catalog of any size and streams it in with binary COPY (vectors included).
+Import and synthetic generation REPLACE the catalog tables (and, through foreign keys, user interactions),
+so they refuse to run without --replace.
+
+Usage:
+    python -m scripts.load_catalog export snapshot/ [--format csv]
+    python -m scripts.load_catalog import snapshot/ --replace
+    python -m scripts.load_catalog synthetic --items 300000 --users 2000 --replace
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Boolean, DateTime, Integer, String, Table, create_engine, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+import models  # noqa: F401  registers every table on Base
+from crud.category_facets import refresh_category_facet_counts
+from crud.item import backfill_item_facets, category_ids_refresh
+from db.base import Base
+from db.indexes import deferred_indexes
+
+logger = logging.getLogger(__name__)
+
+# Catalog tables in foreign-key order; a snapshot holds one <table>.<format> file per entry
+SNAPSHOT_TABLES = ["categories", "category_closure", "items", "item_category", "outfits", "item_outfit"]
+_COPY_OPTIONS = {"binary": "FORMAT binary", "csv": "FORMAT csv, HEADER true"}
+
+_PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = datetime.resolution
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+_NULL = struct.pack(">i", -1)
+_VARCHAR_OID = 1043
+
+
+"""
+Binary COPY encoding
+"""
+def _encode_text(value) -> bytes:
+    return str(value).encode("utf-8")
+
+def _encode_int(value) -> bytes:
+    return struct.pack(">i", int(value))
+
+def _encode_bool(value) -> bytes:
+    return b"\x01" if value else b"\x00"
+
+def _encode_timestamptz(value: datetime) -> bytes:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return struct.pack(">q", (value - _PG_EPOCH) // _MICROSECOND)
+
+def _encode_vector(value) -> bytes:
+    # pgvector's binary format: int16 dimensions, int16 unused, then big-endian float4 values
+    vector = np.asarray(value, dtype=">f4")
+    return struct.pack(">hh", vector.shape[0], 0) + vector.tobytes()
+
+
+def _encode_varchar_array(values) -> bytes:
+    # One-dimensional array: ndim, has-nulls flag, element type, then length and lower bound, then the elements
+    elements = [_encode_text(value) for value in values]
+    if not elements:
+        return struct.pack(">iii", 0, 0, _VARCHAR_OID)
+    header = struct.pack(">iiiii", 1, 0, _VARCHAR_OID, len(elements), 1)
+    return header + b"".join(struct.pack(">i", len(element)) + element for element in elements)
+
+
+def _encoder_for(column_type):
+    if isinstance(column_type, Vector):
+        return _encode_vector
+    if isinstance(column_type, ARRAY) and isinstance(column_type.item_type, String):
+        return _encode_varchar_array
+    if isinstance(column_type, Boolean):
+        return _encode_bool
+    if isinstance(column_type, Integer):
+        return _encode_int
+    if isinstance(column_type, DateTime):
+        return _encode_timestamptz
+    if isinstance(column_type, String):
+        return _encode_text
+    raise TypeError(f"No binary COPY encoder for column type {column_type!r}")
+
+
+def _binary_copy_stream(table: Table, columns: List[str], rows: Iterable[Dict], rows_per_chunk: int = 1000) -> Iterator[bytes]:
+    encoders = [_encoder_for(table.c[name].type) for name in columns]
+    field_count = struct.pack(">h", len(columns))
+    yield _COPY_HEADER
+    chunk = []
+    for row in rows:
+        parts = [field_count]
+        for name, encode in zip(columns, encoders):
+            value = row.get(name)
+            if value is None:
+                parts.append(_NULL)
+            else:
+                data = encode(value)
+                parts.append(struct.pack(">i", len(data)))
+                parts.append(data)
+        chunk.append(b"".join(parts))
+        if len(chunk) == rows_per_chunk:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+    yield _COPY_TRAILER
+
+
+class _StreamReader:
+    """Minimal file-like object over an iterator of byte chunks, for cursor.copy_expert."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = bytearray()
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size < 0 or size >= len(self._buffer):
+            data, self._buffer = bytes(self._buffer), bytearray()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+
+def copy_rows(conn, table: Table, rows: Iterable[Dict], columns: List[str] = None) -> int:
+    """
+    Stream dict rows into a table with binary COPY. Columns not loaded get their server defaults.
+    Args:
+        conn: SQLAlchemy connection (the COPY runs inside its current transaction).
+        table (Table): Target table.
+        rows (Iterable[Dict]): Rows keyed by column name.
+        columns (List[str]): Columns to load. Defaults to the table columns present in the first row.
+    Returns:
+        Number of rows copied.
+    """
+    rows = iter(rows)
+    if columns is None:
+        first = next(rows, None)
+        if first is None:
+            return 0
+        columns = [c.name for c in table.columns if c.name in first]
+        rows = itertools.chain([first], rows)
+    column_list = ", ".join(f'"{name}"' for name in columns)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT binary)',
+            _StreamReader(_binary_copy_stream(table, columns, rows)),
+        )
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+"""
+Snapshots
+"""
+def truncate_catalog(conn):
+    """Empty the catalog tables. CASCADE also empties the user interaction tables that reference items/outfits."""
+    conn.execute(text(f"TRUNCATE {', '.join(SNAPSHOT_TABLES)} RESTART IDENTITY CASCADE"))
+
+
+def export_snapshot(engine, directory: str, format: str = "binary"):
+    """
+    Write every catalog table to <directory>/<table>.<format> plus a manifest.json recording the column order.
+    Binary snapshots are smaller and load much faster (vectors are not parsed from text); CSV ones are readable.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"format": format, "tables": {}}
+    with engine.connect() as conn:
+        cursor = conn.connection.cursor()
+        for table_name in SNAPSHOT_TABLES:
+            # Generated columns (items.search_vector) cannot be loaded; Postgres recomputes them on import
+            columns = [c.name for c in Base.metadata.tables[table_name].columns if c.computed is None]
+            column_list = ", ".join(f'"{name}"' for name in columns)
+            path = os.path.join(directory, f"{table_name}.{format}")
+            with open(path, "wb") as f:
+                cursor.copy_expert(f'COPY "{table_name}" ({column_list}) TO STDOUT WITH ({_COPY_OPTIONS[format]})', f)
+            manifest["tables"][table_name] = columns
+            logger.info(f"Exported {cursor.rowcount} rows of {table_name} to {path}")
+        cursor.close()
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def import_snapshot(engine, directory: str):
+    """Replace the catalog tables with a snapshot directory written by export_snapshot, in one transaction."""
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    format = manifest["format"]
+    with engine.begin() as conn:
+        truncate_catalog(conn)
+        with deferred_indexes(conn, SNAPSHOT_TABLES):
+            cursor = conn.connection.cursor()
+            for table_name in SNAPSHOT_TABLES:
+                columns = manifest["tables"].get(table_name)
+                if columns is None:
+                    logger.warning(f"Snapshot has no {table_name} table, leaving it empty")
+                    continue
+                column_list = ", ".join(f'"{name}"' for name in columns)
+                with open(os.path.join(directory, f"{table_name}.{format}"), "rb") as f:
+                    cursor.copy_expert(f'COPY "{table_name}" ({column_list}) FROM STDIN WITH ({_COPY_OPTIONS[format]})', f)
+                logger.info(f"Imported {cursor.rowcount} rows into {table_name}")
+            if "product_images" in manifest["tables"]:
+                _import_legacy_product_images(conn, cursor, directory, format, manifest["tables"]["product_images"])
+            cursor.close()
+            # Rebuilt rather than trusted from the snapshot, which may predate the columns
+            conn.execute(category_ids_refresh())
+            backfill_item_facets(conn)
+    with Session(engine) as db:
+        refresh_category_facet_counts(db)
+    analyze(engine)
+
+
+def _import_legacy_product_images(conn, cursor, directory: str, format: str, columns: List[str]):
+    """Fill items.product_images from the product_images table file of a snapshot taken before it became a column."""
+    column_list = ", ".join(f'"{name}"' for name in columns)
+    conn.execute(text("CREATE TEMP TABLE legacy_product_images (id integer, item_id varchar, image_url_suffix varchar) ON COMMIT DROP"))
+    with open(os.path.join(directory, f"product_images.{format}"), "rb") as f:
+        cursor.copy_expert(f"COPY legacy_product_images ({column_list}) FROM STDIN WITH ({_COPY_OPTIONS[format]})", f)
+    result = conn.execute(text(
+        "UPDATE items SET product_images = images.urls FROM ("
+        "SELECT item_id, array_agg(image_url_suffix ORDER BY id) AS urls FROM legacy_product_images GROUP BY item_id"
+        ") images WHERE items.id = images.item_id"
+    ))
+    logger.info(f"Moved the images of {result.rowcount} items from the snapshot's product_images table")
+
+
+def analyze(engine):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Target database (default: DATABASE_URL from settings)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the catalog tables to a snapshot directory")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--format", choices=sorted(_COPY_OPTIONS), default="binary")
+
+    import_parser = subparsers.add_parser("import", help="Replace the catalog with a snapshot directory")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--replace", action="store_true", help="Confirm that the catalog tables will be wiped")
+
+    synthetic_parser = subparsers.add_parser("synthetic", help="Replace the database contents with a synthetic catalog")
+    synthetic_parser.add_argument("--items", type=int, required=True)
+    synthetic_parser.add_argument("--users", type=int, default=1000)
+    synthetic_parser.add_argument("--categories", type=int, default=200)
+    synthetic_parser.add_argument("--no-vectors", action="store_true", help="Leave detailed_embedding empty")
+    synthetic_parser.add_argument("--seed", type=int, default=42)
+    synthetic_parser.add_argument("--replace", action="store_true", help="Confirm that the database contents will be wiped")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        engine = create_engine(args.database_url, future=True)
+    else:
+        from db.session import engine
+
+    if args.command != "export" and not args.replace:
+        parser.error(f"'{args.command}' wipes the catalog tables; pass --replace to confirm")
+
+    start = time.perf_counter()
+    if args.command == "export":
+        export_snapshot(engine, args.directory, format=args.format)
+    elif args.command == "import":
+        import_snapshot(engine, args.directory)
+    else:
+        from benchmarks.synthetic import CatalogSpec, create_schema, seed_catalog
+        create_schema(engine)
+        spec = CatalogSpec(n_items=args.items, n_users=args.users, n_categories=args.categories, with_vectors=not args.no_vectors, seed=args.seed)
+        seed_catalog(engine, spec)
+    logger.info(f"{args.command} finished in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    # Configured here rather than at import: benchmarks/synthetic.py imports this module and keeps its caller's logging setup
+    logging.basicConfig(level=logging.INFO)
+    main()
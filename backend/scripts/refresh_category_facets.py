@@ -0,0 +1,36 @@
+"""
+Rebuild the per-category facet counts (category_facet_counts) and Category.itemCount from the items table.
+Every catalog sync and snapshot import ends with this refresh; run it by hand after changing the catalog another
+way, e.g. after the migration that adds the table.
+
+Usage:
+    python -m scripts.refresh_category_facets
+"""
+import argparse
+import logging
+import sys
+import time
+
+from db.session import SessionLocal
+from crud.category_facets import refresh_category_facet_counts
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        rows = refresh_category_facet_counts(db)
+        logger.info(f"Counted {rows} (category, facet, value) rows in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
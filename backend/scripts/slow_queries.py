@@ -0,0 +1,122 @@
+"""
+Summarize the slow-query log written when SLOW_QUERY_MS is set (see core/slow_query_log.py).
+Entries are grouped by normalized-SQL fingerprint and the worst offenders listed first. Queries whose sampled
+EXPLAIN ANALYZE showed a sequential scan are flagged with the tables scanned.
+
+Usage:
+    python -m scripts.slow_queries                      # top 20 by total time
+    python -m scripts.slow_queries --sort max --seq-scans-only
+    python -m scripts.slow_queries --plan <fingerprint> # latest captured plan of one query
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterator, List
+
+from core.config import settings
+from core.slow_query_log import LOG_BACKUP_COUNT
+
+SORT_KEYS = {
+    "total": lambda s: s["total_ms"],
+    "max": lambda s: s["max_ms"],
+    "mean": lambda s: s["total_ms"] / s["count"],
+    "count": lambda s: s["count"],
+}
+
+
+def read_entries(path: str) -> Iterator[Dict]:
+    """Yield the entries of the log and its rotated backups (path.1, path.2, ...), oldest file first."""
+    for file_path in [f"{path}.{n}" for n in range(LOG_BACKUP_COUNT, 0, -1)] + [path]:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def summarize(entries: Iterator[Dict]) -> List[Dict]:
+    """Group entries by fingerprint; the latest plan of each query is kept."""
+    summaries: Dict[str, Dict] = {}
+    for entry in entries:
+        summary = summaries.setdefault(entry["fingerprint"], {
+            "fingerprint": entry["fingerprint"], "sql": entry["sql"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "last_seen": None, "requests": set(), "seq_scans": set(), "explained": 0, "plan": None,
+        })
+        summary["count"] += 1
+        summary["total_ms"] += entry["duration_ms"]
+        summary["max_ms"] = max(summary["max_ms"], entry["duration_ms"])
+        summary["last_seen"] = entry["timestamp"]
+        if entry.get("request"):
+            summary["requests"].add(entry["request"])
+        if "plan" in entry:
+            summary["explained"] += 1
+            summary["seq_scans"].update(entry.get("seq_scans", []))
+            summary["plan"] = entry["plan"]
+    return list(summaries.values())
+
+
+def format_plan(plan: Dict, depth: int = 0) -> List[str]:
+    """Render an EXPLAIN (FORMAT JSON) plan node and its children as an indented tree."""
+    label = plan["Node Type"]
+    if "Relation Name" in plan:
+        label += f" on {plan['Relation Name']}"
+    if "Index Name" in plan:
+        label += f" using {plan['Index Name']}"
+    timing = f"actual time={plan.get('Actual Total Time', 0):.2f}ms rows={plan.get('Actual Rows')} loops={plan.get('Actual Loops')}"
+    buffers = f"shared hit={plan.get('Shared Hit Blocks', 0)} read={plan.get('Shared Read Blocks', 0)}"
+    lines = [f"{'  ' * depth}-> {label}  ({timing}, {buffers})"]
+    for key in ("Index Cond", "Filter", "Order By"):
+        if key in plan:
+            lines.append(f"{'  ' * depth}     {key}: {plan[key]}")
+    for child in plan.get("Plans", []):
+        lines.extend(format_plan(child, depth + 1))
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default=settings.SLOW_QUERY_LOG_PATH, help="Slow-query log file (default: SLOW_QUERY_LOG_PATH)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="total")
+    parser.add_argument("--seq-scans-only", action="store_true", help="Only queries whose sampled plan had a sequential scan")
+    parser.add_argument("--plan", metavar="FINGERPRINT", help="Print the latest captured plan of one query")
+    args = parser.parse_args(argv)
+
+    summaries = summarize(read_entries(args.log))
+    if not summaries:
+        print(f"No slow queries logged in {args.log}")
+        return 0
+
+    if args.plan:
+        matches = [s for s in summaries if s["fingerprint"].startswith(args.plan)]
+        if not matches:
+            print(f"No logged query with fingerprint {args.plan}")
+            return 1
+        summary = matches[0]
+        print(summary["sql"])
+        print()
+        print("\n".join(format_plan(summary["plan"])) if summary["plan"] else "No plan captured for this query yet")
+        return 0
+
+    if args.seq_scans_only:
+        summaries = [s for s in summaries if s["seq_scans"]]
+    summaries.sort(key=SORT_KEYS[args.sort], reverse=True)
+    for summary in summaries[:args.top]:
+        print(
+            f"{summary['fingerprint']}  count={summary['count']}  total={summary['total_ms']:.0f}ms  "
+            f"mean={summary['total_ms'] / summary['count']:.1f}ms  max={summary['max_ms']:.1f}ms  "
+            f"explained={summary['explained']}  last={summary['last_seen']}"
+        )
+        if summary["seq_scans"]:
+            print(f"    SEQ SCAN on: {', '.join(sorted(summary['seq_scans']))}")
+        if summary["requests"]:
+            print(f"    requests: {', '.join(sorted(summary['requests'])[:5])}")
+        print(f"    {summary['sql'][:300]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,34 @@
 from asyncio import sleep
+import argparse
+import hashlib
+import json
+import multiprocessing
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 import logging
-from typing import List, Dict
+from typing import List, Optional, Tuple
 
 from services.shopbop_api import ShopbopAPIClient
+from services.shopbop_models import CategoryNode, Product, StyleColorOutfits
 from db.session import SessionLocal
-from crud import item as crud_item, category as crud_category, outfit as crud_outfit
+from crud import item as crud_item, category as crud_category, category_facets as crud_category_facets, outfit as crud_outfit, sync_checkpoint as crud_checkpoint
 
-logging.basicConfig(level=logging.INFO)
+# Checkpoint job names
+CATALOG_SYNC_JOB = "catalog_sync"
+UPDATE_EXISTING_ITEMS_JOB = "update_existing_items"
+
+# Outfits are not part of the listing, so an item whose listing never changes still gets its outfits re-fetched this often
+OUTFIT_RECHECK_DAYS = 7
+
+
+def _fingerprint(value) -> str:
+    return hashlib.sha1(json.dumps(value, separators=(",", ":")).encode("utf-8")).hexdigest()
 
 class CategoryInfo:
+    __slots__ = ("name", "id")
+
     def __init__(self, category_name: str, category_id: int):
         self.name = category_name
         self.id = category_id
@@ -21,6 +40,8 @@ class CategoryInfo:
         return self.__str__()
 
 class LeafCategoryInfo(CategoryInfo):
+    __slots__ = ("item_count", "path")
+
     def __init__(self, category_name: str, category_id: int, item_count: int, path: List[CategoryInfo]):
         super().__init__(category_name, category_id)
         self.item_count = item_count
@@ -35,6 +56,8 @@ class LeafCategoryInfo(CategoryInfo):
     
 class ProductInfo:
     # Info: ProductSin (str), ShortDescription (str)
+    __slots__ = ("product_sin", "short_description", "image_url_suffix", "product_detail_url", "designer_name", "price", "color", "stretch", "product_images")
+
     def __init__(self, 
             product_sin: str, 
             short_description: str, 
@@ -57,46 +80,49 @@ class ProductInfo:
         self.product_images = product_images
 
     @classmethod
-    def from_product_dict(cls, product: Dict):
-        default_color_sin = product.get("defaultColorSin")
-        colors = product.get("colors", [])
+    def from_product(cls, product: Product):
+        colors = product.colors
         default_color = None
-        if not colors or len(colors) == 0:
-            default_color = None
-        else:
+        if colors:
             for color in colors:
-                if color.get("colorSin") == default_color_sin:
+                if color.color_sin == product.default_color_sin:
                     default_color = color
                     break
             if not default_color:
                 for color in colors:
-                    if color.get("inStock") is True:
+                    if color.in_stock is True:
                         default_color = color
                         break
-            if not default_color and colors[0]["images"]:
+            if not default_color and colors[0].images:
                 default_color = colors[0]
-            if not default_color or default_color.get("images") is None or len(default_color.get("images")) == 0:
+            if not default_color or not default_color.images:
                 default_color = None
         return cls(
-            product_sin=product["productSin"],
-            short_description=product["shortDescription"],
-            image_url_suffix=default_color["images"][0]["src"] if default_color and default_color.get("images") and len(default_color.get("images")) > 0 else None,
-            product_detail_url=product["productDetailUrl"],
-            designer_name=product["designerName"],
-            price=product["retailPrice"]["price"],
-            color=default_color["name"] if default_color else None,
-            stretch=product.get("displayStretchAmount", None),
-            product_images=[img["src"] for img in default_color["images"]] if default_color and default_color.get("images") else []
+            product_sin=product.product_sin,
+            short_description=product.short_description,
+            image_url_suffix=default_color.images[0].src if default_color else None,
+            product_detail_url=product.product_detail_url,
+            designer_name=product.designer_name,
+            price=product.retail_price.price if product.retail_price else None,
+            color=default_color.name if default_color else None,
+            stretch=product.display_stretch_amount,
+            product_images=[img.src for img in default_color.images] if default_color else []
         )
 
     @classmethod
     def from_product_sin(cls, product_sin: str, api_client: ShopbopAPIClient):
         productresponse = api_client.get_product_by_product_sin(productSin=product_sin)
-        product = productresponse.get("products", [])[0]
-        if not product:
+        if not productresponse.products:
             return None
-        return cls.from_product_dict(product)
+        return cls.from_product(productresponse.products[0])
     
+    def fingerprint(self) -> str:
+        """Hash of the normalized listing fields the sync writes to the item; equal fingerprints mean nothing to update."""
+        fields = [self.product_sin, self.short_description, self.image_url_suffix, self.product_detail_url,
+                  self.designer_name, self.price, self.color, self.stretch]
+        normalized = [field.strip() if isinstance(field, str) else field for field in fields]
+        return _fingerprint(normalized + [[url.strip() for url in self.product_images or []]])
+
     def detailed_str(self):
         return f"ProductInfo(product_sin={self.product_sin}, short_description={self.short_description}, image_url_suffix={self.image_url_suffix}, product_detail_url={self.product_detail_url}, designer_name={self.designer_name}, price={self.price}, color={self.color}, stretch={self.stretch}, product_images={self.product_images})"
 
@@ -106,135 +132,268 @@ class ProductInfo:
     def __repr__(self):
         return self.__str__()
 
+def _outfits_fingerprint(style_color_outfits: List[StyleColorOutfits]) -> str:
+    """Hash of the outfits (id and image) a get_outfit response associates with the product, independent of order."""
+    outfits = {
+        outfit.id: outfit.image_url_suffix
+        for sc_outfit in style_color_outfits for outfit in sc_outfit.outfits if outfit.id
+    }
+    return _fingerprint(sorted(outfits.items()))
+
+def _category_order(category_id) -> Tuple:
+    """Sort key of a category id. Leaf categories are scanned in this order, so a checkpoint's category marks a position."""
+    category_id = str(category_id)
+    return (0, int(category_id), "") if category_id.isdigit() else (1, 0, category_id)
+
+def resume_offset(category: CategoryInfo, checkpoint) -> Optional[int]:
+    """Offset to start scanning the category at when resuming from checkpoint, or None if it was already synced."""
+    if checkpoint is None or checkpoint.category_id is None:
+        return 0
+    if _category_order(category.id) < _category_order(checkpoint.category_id):
+        return None
+    return checkpoint.page_offset if category.id == checkpoint.category_id else 0
+
+
 class SyncItems:
 
     # Do dfs on the category tree ("clothing" as the root) to get to all leaf categories. Record the path to each leaf category.
     # Then for each leaf category, fetch items in that category.
     # For each item, first fetch its outfit. Skip this item if there's no outfit associated with it.
     # Then check if this item is already in the database. If yes, update. If not, create.
+    # Items whose listing fingerprint matches what the last sync wrote are skipped without calling the outfit API
+    # (unless their outfits were last checked more than outfit_recheck_days ago, or full is set). Products found without
+    # outfits are recorded with their listing fingerprint and skipped the same way.
+    # Progress is checkpointed after every page, and leaf categories can be split across processes by id (shards).
 
-    def __init__(self):
+    def __init__(self, shard_index: int = 0, shard_count: int = 1, full: bool = False, outfit_recheck_days: int = OUTFIT_RECHECK_DAYS):
         self.api_client = ShopbopAPIClient()
         self.db: Session = SessionLocal()
         self.skipped_items = 0
         self.updated_existing_items = 0
         self.added_items = 0
+        self.unchanged_items = 0
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.full = full
+        self.outfit_recheck_age = timedelta(days=outfit_recheck_days)
+
+    @property
+    def shard(self) -> str:
+        return f"{self.shard_index}/{self.shard_count}"
+
+    def _in_shard(self, category: CategoryInfo) -> bool:
+        category_id = str(category.id)
+        # crc32 rather than hash() for non-numeric ids: string hashes differ between processes
+        key = int(category_id) if category_id.isdigit() else zlib.crc32(category_id.encode("utf-8"))
+        return key % self.shard_count == self.shard_index
+
+    def _save_progress(self, job: str, category_id: str = None, page_offset: int = 0, completed: bool = False):
+        crud_checkpoint.save_checkpoint(self.db, job, self.shard,
+                category_id=category_id,
+                page_offset=page_offset,
+                added=self.added_items,
+                updated=self.updated_existing_items,
+                skipped=self.skipped_items,
+                unchanged=self.unchanged_items,
+                completed=completed
+        )
 
-    def _get_dfs_root(self, category_root_id:str = "13266", dept: str = "WOMENS", lang: str = "en-US") -> Dict: 
+    def _get_dfs_root(self, category_root_id:str = "13266", dept: str = "WOMENS", lang: str = "en-US") -> Optional[CategoryNode]: 
         category_tree = self.api_client.get_categories(dept=dept, lang=lang)
-        for category in category_tree.get("categories", []):
-            if category.get("id") == category_root_id:
+        for category in category_tree.categories:
+            if category.id == category_root_id:
                 return category
             
         return None
 
-    def _category_dfs(self, current_category: Dict, path: List[CategoryInfo]) -> List[LeafCategoryInfo]:
+    def _category_dfs(self, current_category: CategoryNode, path: List[CategoryInfo]) -> List[LeafCategoryInfo]:
         """
         Perform DFS on category tree to find all leaf categories and their paths. 
         return: List of tuples (leaf_category, path_to_leaf_category)
         - Path is a list of (name, id) tuples from root to the leaf.
         """
-        children = current_category.get("children", [])
+        children = current_category.children
 
         # If there's no children, then this category is a leaf category
         if not children:
-            return [LeafCategoryInfo(current_category["name"], current_category["id"], current_category["count"], path)]
+            return [LeafCategoryInfo(current_category.name, current_category.id, current_category.count, path)]
         
         ret = []
         for child in children:
-            ret.extend(self._category_dfs(child, path + [CategoryInfo(child["name"], child["id"])]))
+            ret.extend(self._category_dfs(child, path + [CategoryInfo(child.name, child.id)]))
 
         return ret
 
 
-    def _scan_category_items(self, category: LeafCategoryInfo):
-        total_item_scanned = 0
+    def _scan_category_items(self, category: LeafCategoryInfo, start_offset: int = 0):
+        total_item_scanned = start_offset
         while (total_item_scanned < category.item_count):
             response = self.api_client.browse_by_category(categoryId=category.id, offset=total_item_scanned)
-            total_item_scanned += len(response.get("products", []))
-            products = response.get("products", [])
+            total_item_scanned += len(response.products)
+            products = response.products
 
             if not products or len(products) == 0:
                 break
 
-            for product in products:
-                item = ProductInfo(product["product"])
-                self._add_or_update_item(item, category_path=category.path)
+            items = [ProductInfo.from_product(listing.product) for listing in products]
+            to_sync, to_link = self._classify_page(category, items)
+            resolved = []
+            for item in to_sync:
+                style_color_outfits = self._fetch_outfits(item)
+                if style_color_outfits is not None:
+                    resolved.append((item, style_color_outfits))
+            self._write_page(category.path, to_link, resolved)
 
-    def _add_or_update_item(self, item: ProductInfo, category_path: List[CategoryInfo]):
-        # Check if the item has any outfit associated with it
+            # The page is written and committed, so it is done
+            self._save_progress(CATALOG_SYNC_JOB, category_id=category.id, page_offset=total_item_scanned)
+
+    def _classify_page(self, category: LeafCategoryInfo, items: List[ProductInfo]) -> Tuple[List[ProductInfo], List[ProductInfo]]:
+        """
+        Split a listing page into the items to sync and the unchanged items (counted here) that only need to be
+        linked to this category, because the same product was synced from another leaf category. Products recently
+        found without outfits under the same listing are dropped (counted as skipped) without asking for outfits again.
+        """
+        # What the last sync wrote for this page, in a few queries rather than one lookup per product
+        item_ids = [item.product_sin for item in items]
+        sync_states = {} if self.full else crud_item.get_sync_states(self.db, item_ids)
+        in_category = set() if self.full else crud_item.get_item_ids_in_category(self.db, category.id, item_ids)
+        missing_ids = [item_id for item_id in item_ids if item_id not in sync_states]
+        outfitless = {} if self.full else crud_item.get_outfitless_states(self.db, missing_ids)
+
+        to_sync, to_link = [], []
+        for item in items:
+            if self._is_unchanged(item, sync_states.get(item.product_sin)):
+                self.unchanged_items += 1
+                if item.product_sin not in in_category:
+                    to_link.append(item)
+            elif item.product_sin not in sync_states and self._is_unchanged(item, outfitless.get(item.product_sin)):
+                self.skipped_items += 1
+            else:
+                to_sync.append(item)
+        return to_sync, to_link
+
+    def _is_unchanged(self, item: ProductInfo, sync_state: Optional[Tuple]) -> bool:
+        """
+        Whether the stored state (of the item, or of the product found without outfits) matches this listing and its
+        outfits were checked recently enough.
+        """
+        if self.full or sync_state is None:
+            return False
+        listing_fingerprint, checked_at = sync_state
+        if listing_fingerprint != item.fingerprint() or checked_at is None:
+            return False
+        return datetime.now(timezone.utc) - checked_at < self.outfit_recheck_age
+
+    def _save_category_tree(self, leaf_categories: List[LeafCategoryInfo]):
+        """
+        Store the categories and closure of the tree the leaf paths describe. Every shard does it before scanning,
+        since the items it links need the closure for their ancestors; shard 0 also tidies up after a tree change.
+        """
+        names, depths = crud_category.tree_closure([(c.id, c.name) for c in leaf.path] for leaf in leaf_categories)
+        changed = crud_category.save_category_tree(self.db, names, depths)
+        logging.info(f"Category tree: {len(names)} categories, {len(depths)} closure rows{' (changed)' if changed else ''}.")
+        if self.shard_index != 0:
+            return
+        # Links to every category on the path, written before the closure existed
+        pruned = crud_category.prune_ancestor_links(self.db)
+        if pruned:
+            logging.info(f"Removed {pruned} item links to ancestor categories.")
+        if changed:
+            refreshed = self.db.execute(crud_item.category_ids_refresh()).rowcount
+            self.db.commit()
+            logging.info(f"Recomputed the categories of {refreshed} items after the tree changed.")
+
+    def _fetch_outfits(self, item: ProductInfo) -> Optional[List[StyleColorOutfits]]:
+        """
+        The product's styleColorOutfits, or None (counted as skipped) if it has no outfit. That result is recorded so
+        the next syncs skip the product while its listing is unchanged, until outfit_recheck_age has passed.
+        """
         outfit_response = self.api_client.get_outfit(productSin=item.product_sin)
-        style_color_outfits = outfit_response.get("styleColorOutfits", [])
+        style_color_outfits = outfit_response.style_color_outfits
         if not style_color_outfits or len(style_color_outfits) == 0:
             self.skipped_items += 1
+            crud_item.record_outfitless_product(self.db, item.product_sin, item.fingerprint())
+            return None
+        return style_color_outfits
+
+    def _add_or_update_item(self, item: ProductInfo, category_path: List[CategoryInfo]):
+        # Check if the item has any outfit associated with it
+        style_color_outfits = self._fetch_outfits(item)
+        if style_color_outfits is None:
             return
+        self._write_page(category_path, [], [(item, style_color_outfits)])
 
-        # Add all categories in the path to the database if they don't exist
-        for category in category_path:
-            db_category = crud_category.get_category(self.db, category.id)
-            if not db_category:
-                # Create the category if it doesn't exist
-                db_category = crud_category.create_category(self.db, id=category.id, name=category.name, itemCount=0)
-
-        # Check if the item is already in the database. If not, add it
-        db_item = crud_item.get_item_by_id(self.db, id=item.product_sin)
-        if not db_item:
-            self.added_items += 1
-            db_item = crud_item.create_item(self.db, 
-                    id=item.product_sin, 
-                    name=item.short_description, 
-                    image_url_suffix=item.image_url_suffix, 
-                    product_detail_url=item.product_detail_url,
-                    designer_name=item.designer_name,
-                    price=item.price,
-                    color=item.color,
-                    stretch=item.stretch,
-                    product_images_urls=item.product_images
-            )
-        
-        else: 
-            # update existing item
-            self.updated_existing_items += 1
-            db_item = crud_item.update_item(self.db, 
-                    id=item.product_sin, 
-                    name=item.short_description, 
-                    image_url_suffix=item.image_url_suffix, 
-                    product_detail_url=item.product_detail_url, 
-                    designer_name=item.designer_name, 
-                    price=item.price, 
-                    color=item.color, 
-                    stretch=item.stretch, 
-                    product_images_urls=item.product_images
-            )
-
-        # Update category associations
-        for category in category_path:
-            db_category = crud_category.get_category(self.db, category.id)
-            if db_category not in db_item.categories:
-                db_item.categories.append(db_category)
-                db_category.itemCount += 1
-                self.db.add(db_item)
-                self.db.add(db_category)
-                self.db.commit()
-
-        # Check if we need to update outfits associated with this item
-        for sc_outfit in style_color_outfits:
-            outfits = sc_outfit.get("outfits", [])
-            for outfit in outfits:
-                outfit_id = outfit.get("id")
-                outfit_image_url_suffix = outfit.get("primaryImage", {}).get("src")
-                if crud_outfit.get_outfit_by_id(self.db, outfit_id) is None:
-                    # Create the outfit if it doesn't exist
-                    crud_outfit.create_outfit(self.db, id=outfit_id, image_url_suffix=outfit_image_url_suffix)
-
-                if outfit_id and outfit_id not in [o.id for o in db_item.outfits]:
-                    # Associate this outfit with the item
-                    db_item.outfits.append(crud_outfit.get_outfit_by_id(self.db, outfit_id))
-                    self.db.add(db_item)
-                    self.db.commit()
+    def _write_page(self, category_path: List[CategoryInfo], to_link: List[ProductInfo], resolved: List[Tuple[ProductInfo, List[StyleColorOutfits]]]) -> List[str]:
+        """
+        Write a page in one transaction with bulk upserts, and commit once: the resolved items with their outfits and
+        fingerprints, and the links of these and of the to_link items to the leaf category of category_path.
+        Concurrent shards and workers writing the same rows are absorbed by the upserts.
+        Returns:
+            List[str]: Ids of the items whose listing fields were written.
+        """
+        resolved = list({item.product_sin: (item, outfits) for item, outfits in resolved}.values())
+        existing = crud_item.get_items_for_sync(self.db, [item.product_sin for item, _ in resolved])
+        synced_at = datetime.now(timezone.utc)
+        rows, outfits, outfit_links, written = [], {}, [], []
+        for item, style_color_outfits in resolved:
+            db_item = existing.get(item.product_sin)
+            listing_fingerprint = item.fingerprint()
+            outfits_fingerprint = _outfits_fingerprint(style_color_outfits)
+            listing = {
+                "name": item.short_description,
+                "image_url_suffix": item.image_url_suffix,
+                "product_detail_url": item.product_detail_url,
+                "designer_name": item.designer_name,
+                "price": item.price,
+                "color": item.color,
+                "stretch": item.stretch,
+                "product_images": item.product_images,
+            }
+            if not db_item:
+                self.added_items += 1
+                written.append(item.product_sin)
+            elif db_item.listing_fingerprint == listing_fingerprint and not self.full:
+                # Only here for the periodic outfit recheck; the listing fields are already up to date (None keeps them)
+                self.unchanged_items += 1
+                listing = dict.fromkeys(listing)
+            else:
+                self.updated_existing_items += 1
+                written.append(item.product_sin)
+            # Record what was written, so the next sync can skip this item while its listing stays the same
+            rows.append({"id": item.product_sin, **listing, "listing_fingerprint": listing_fingerprint,
+                         "outfits_fingerprint": outfits_fingerprint, "synced_at": synced_at})
+
+            # Check if we need to update outfits associated with this item
+            if db_item and db_item.outfits_fingerprint == outfits_fingerprint and not self.full:
+                continue
+            for sc_outfit in style_color_outfits:
+                for outfit in sc_outfit.outfits:
+                    if outfit.id:
+                        outfits.setdefault(outfit.id, outfit.image_url_suffix)
+                        outfit_links.append((item.product_sin, outfit.id))
+
+        crud_category.create_missing_categories(self.db, {category.id: category.name for category in category_path})
+        crud_outfit.create_missing_outfits(self.db, outfits)
+        crud_item.upsert_items(self.db, rows, existing)
+        crud_outfit.link_items_to_outfits(self.db, outfit_links)
+        if category_path:
+            # Link the items to the leaf only; their ancestors come from category_closure, and category_ids is
+            # recomputed from both
+            item_ids = [item.product_sin for item, _ in resolved] + [item.product_sin for item in to_link]
+            crud_item.link_items_to_category(self.db, item_ids, category_path[-1].id)
+            self.db.execute(crud_item.category_ids_refresh(item_ids))
+        self.db.commit()
+        return written
         
 
-    def update_existing_items(self, offset: int = 0, batch_size: int = 100, skip_designer_name_filled: bool = True):
+    def update_existing_items(self, offset: int = None, batch_size: int = 100, skip_designer_name_filled: bool = True):
+        """Refresh stored items from the product API. Without an explicit offset, resumes an interrupted run."""
+        if offset is None:
+            checkpoint = crud_checkpoint.get_resumable_checkpoint(self.db, UPDATE_EXISTING_ITEMS_JOB, self.shard)
+            offset = checkpoint.page_offset if checkpoint else 0
+            if checkpoint:
+                self.updated_existing_items = checkpoint.updated
+                logging.info(f"Resuming item update at offset {offset}")
         total_items = crud_item.get_items_count(self.db)
         current_db_index = offset
         for start in range(offset, total_items, batch_size):
@@ -257,35 +416,67 @@ class SyncItems:
                         stretch=product_info.stretch,
                         product_images_urls=product_info.product_images
                     )
+                    self.updated_existing_items += 1
                     logging.info(f"Updated item :{current_db_index} {db_item.id} - {product_info.short_description}")
+            self._save_progress(UPDATE_EXISTING_ITEMS_JOB, page_offset=start + batch_size)
             logging.info(f"Finished updating items from {start} to {start + batch_size}.")
+        self._save_progress(UPDATE_EXISTING_ITEMS_JOB, page_offset=total_items, completed=True)
     
 
-    def sync(self):
-        # Get a list of leaf categories
+    def _shard_leaf_categories(self) -> Optional[List[LeafCategoryInfo]]:
+        """This shard's leaf categories in scan order, or None if the category tree could not be loaded."""
         root = self._get_dfs_root(category_root_id = "13266", dept = "WOMENS", lang = "en-US")
         if not root:
             logging.error("Failed to find root category.")
-            return
-        logging.info(f"Found root category: {root['name']}({root['id']})")
+            return None
+        logging.info(f"Found root category: {root.name}({root.id})")
         
-        all_categories = self._category_dfs(root, path=[CategoryInfo(root["name"], root["id"])])
-        logging.info(f"Found {len(all_categories)} leaf categories.")
+        leaves = self._category_dfs(root, path=[CategoryInfo(root.name, root.id)])
+        # Every path goes into the closure, even for a leaf listed under several parents
+        self._save_category_tree(leaves)
+        leaf_categories = {c.id: c for c in leaves}
+        all_categories = sorted((c for c in leaf_categories.values() if self._in_shard(c)), key=lambda c: _category_order(c.id))
+        logging.info(f"Found {len(leaf_categories)} leaf categories, {len(all_categories)} in shard {self.shard}.")
+        return all_categories
+
+    def _resume_catalog_sync(self, restart: bool = False):
+        """Load the counters of an interrupted catalog sync and return its checkpoint, or None to start over."""
+        checkpoint = None if restart else crud_checkpoint.get_resumable_checkpoint(self.db, CATALOG_SYNC_JOB, self.shard)
+        if checkpoint:
+            self.added_items, self.updated_existing_items, self.skipped_items = checkpoint.added, checkpoint.updated, checkpoint.skipped
+            self.unchanged_items = checkpoint.unchanged
+            logging.info(f"Resuming shard {self.shard} at category {checkpoint.category_id}, offset {checkpoint.page_offset}")
+        return checkpoint
+
+    def sync(self, restart: bool = False):
+        """Sync this shard's leaf categories, resuming an interrupted run from its checkpoint unless restart is True."""
+        # Get a list of leaf categories
+        all_categories = self._shard_leaf_categories()
+        if all_categories is None:
+            return
+        checkpoint = self._resume_catalog_sync(restart)
 
         # Scan each leaf category
         for category in all_categories:
+            start_offset = resume_offset(category, checkpoint)
+            if start_offset is None:
+                continue
+
             logging.info(f"Scanning items in category: {category.name}: {category.id} - {category.item_count} items")
             # logging data
             old_added = self.added_items
             old_updated = self.updated_existing_items
             old_skipped = self.skipped_items
+            old_unchanged = self.unchanged_items
             
-            self._scan_category_items(category)
+            self._scan_category_items(category, start_offset=start_offset)
 
-            logging.info(f"Finished scanning category: {category.name}: {category.id}. Added {self.added_items - old_added}, Updated {self.updated_existing_items - old_updated}, Skipped {self.skipped_items - old_skipped}. Total so far - Added: {self.added_items}, Updated: {self.updated_existing_items}, Skipped: {self.skipped_items}")
+            logging.info(f"Finished scanning category: {category.name}: {category.id}. Added {self.added_items - old_added}, Updated {self.updated_existing_items - old_updated}, Skipped {self.skipped_items - old_skipped}, Unchanged {self.unchanged_items - old_unchanged}. Total so far - Added: {self.added_items}, Updated: {self.updated_existing_items}, Skipped: {self.skipped_items}, Unchanged: {self.unchanged_items}")
 
         
-        logging.info(f"Sync complete. Total items added: {self.added_items}, updated: {self.updated_existing_items}, skipped: {self.skipped_items}")
+        self._save_progress(CATALOG_SYNC_JOB, completed=True)
+        refresh_category_aggregates(self.db)
+        logging.info(f"Sync complete. Total items added: {self.added_items}, updated: {self.updated_existing_items}, skipped: {self.skipped_items}, unchanged: {self.unchanged_items}")
 
     def cleanTables(self):
         # Clean all tables
@@ -315,25 +506,25 @@ class SyncItems:
         itemInOutfit = outfit.items[0]
         print(f"Item in outfit: {itemInOutfit}")
         # fetch outfit from shopbop api
-        outfitsRelatedToItem = self.api_client.get_outfit(productSin=itemInOutfit.id)
+        outfitsRelatedToItem = self.api_client.get_outfit(productSin=itemInOutfit.id, with_products=True)
         # Find the outfit with the given outfit_id
         target_outfit = None
-        for sc_outfit in outfitsRelatedToItem.get("styleColorOutfits", []):
-            for outfit_data in sc_outfit.get("outfits", []):
-                if outfit_data.get("id") == outfit_id:
+        for sc_outfit in outfitsRelatedToItem.style_color_outfits:
+            for outfit_data in sc_outfit.outfits:
+                if outfit_data.id == outfit_id:
                     target_outfit = outfit_data
                     break
             if target_outfit:
                 break
-        print(f"Target outfit from API: {target_outfit.get('id')}")
         if not target_outfit:
             logging.error(f"Outfit with id {outfit_id} not found in Shopbop API for item {itemInOutfit.id}.")
             return False
         
         # Save all items in this outfit to the database
-        for sc in target_outfit.get("styleColors", []):
-            item = sc.get("product")
-            productInfo = ProductInfo.from_product_dict(item)
+        for sc in target_outfit.style_colors:
+            if sc.product is None:
+                continue
+            productInfo = ProductInfo.from_product(sc.product)
             self._add_or_update_item(productInfo, category_path=[])
             logging.info(f"Added/Updated related item with product_sin: {productInfo.product_sin} for outfit {outfit_id}")
         return True
@@ -342,7 +533,49 @@ class SyncItems:
 
 
 
+def refresh_category_aggregates(db: Session):
+    """
+    Recompute the facet counts and itemCount of every category once a shard has finished. Each shard does it, so
+    the counts are complete after the last one, wherever the shards run.
+    """
+    start = time.perf_counter()
+    rows = crud_category_facets.refresh_category_facet_counts(db)
+    logging.info(f"Refreshed {rows} category facet counts in {time.perf_counter() - start:.1f}s.")
+
+
+def run_shard(shard_index: int, shard_count: int, restart: bool = False, full: bool = False):
+    """Entry point of one sync worker process."""
+    logging.basicConfig(level=logging.INFO, format=f"[shard {shard_index}/{shard_count}] %(levelname)s %(message)s")
+    SyncItems(shard_index=shard_index, shard_count=shard_count, full=full).sync(restart=restart)
+
+
 if __name__ == "__main__":
-    syncer = SyncItems()
-    # syncer.update_existing_items(offset=0, batch_size=100, skip_designer_name_filled=True)
-    syncer.sync()
\ No newline at end of file
+    # Configured here rather than at import: the API imports this module lazily and must keep its own logging setup
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Sync the Shopbop catalog into the database, resuming from the last checkpoint.")
+    parser.add_argument("--shards", type=int, default=1, help="Split the leaf categories across this many worker processes")
+    parser.add_argument("--shard", help="Run only this shard, as <index>/<count> (e.g. to spread shards over machines)")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved checkpoints and start from the first category")
+    parser.add_argument("--full", action="store_true", help="Rewrite every item and its outfits, even when its listing is unchanged")
+    parser.add_argument("--update-existing", action="store_true", help="Refresh the stored items instead of syncing the category tree")
+    args = parser.parse_args()
+
+    if args.update_existing:
+        SyncItems().update_existing_items(offset=0 if args.restart else None, batch_size=100, skip_designer_name_filled=True)
+    elif args.shard:
+        index, count = (int(part) for part in args.shard.split("/"))
+        run_shard(index, count, args.restart, args.full)
+    elif args.shards == 1:
+        SyncItems(full=args.full).sync(restart=args.restart)
+    else:
+        # spawn, so every worker opens its own database connections and HTTP client
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=run_shard, args=(i, args.shards, args.restart, args.full)) for i in range(args.shards)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        failed = [i for i, worker in enumerate(workers) if worker.exitcode != 0]
+        if failed:
+            logging.error(f"Shards {failed} failed; rerun to resume them from their checkpoints")
+            raise SystemExit(1)
\ No newline at end of file
@@ -0,0 +1,487 @@
+"""
+Streaming version of the catalog sync in scripts/sync_items.py, with embeddings computed in the same run.
+Every listing page flows through five stages connected by bounded queues:
+
+    fetch (category pages) -> parse (ProductInfo) -> resolve (delta check, outfit API) -> persist -> embed
+
+Each stage is a pool of worker threads (the work is HTTP, database and torch calls, which release the GIL), and each
+worker has its own API client and database session. A stage that falls behind fills its inbox and blocks the stages
+upstream of it, so the slowest stage sets the pace and at most queue_size pages wait in front of each stage.
+Pages processed, throughput, busy/blocked time and inbox depth of every stage are logged every report interval.
+
+Progress goes to the same sync_checkpoints row as the sequential sync, so either can resume the other. Pages finish
+out of order, so the checkpoint only moves past a category once it and every category before it are fully persisted
+(and embedded).
+
+    python -m scripts.sync_pipeline --fetchers 2 --resolvers 8 --persisters 1 --embedders 1 --queue-size 8
+"""
+import argparse
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from crud import item as crud_item, sync_checkpoint as crud_checkpoint
+from db.session import SessionLocal
+from services.shopbop_api import ShopbopAPIClient
+from services.shopbop_models import ProductListing, StyleColorOutfits
+from scripts.sync_items import CATALOG_SYNC_JOB, LeafCategoryInfo, ProductInfo, SyncItems, refresh_category_aggregates, resume_offset
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("added", "updated", "skipped", "unchanged")
+
+
+@dataclass
+class Page:
+    """One listing page of a category on its way through the stages."""
+    category: LeafCategoryInfo
+    products: List[ProductListing]
+    size: int = 0
+    items: List[ProductInfo] = field(default_factory=list)
+    to_link: List[ProductInfo] = field(default_factory=list)
+    resolved: List[Tuple[ProductInfo, List[StyleColorOutfits]]] = field(default_factory=list)
+    embed_ids: List[str] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(COUNTERS, 0))
+
+
+class _Aborted(Exception):
+    pass
+
+
+_STOP = object()
+
+
+"""
+Stage workers. Each worker thread creates its own, and process() yields what goes to the next stage.
+"""
+class PageFetcher:
+    def __init__(self, pipeline: "SyncPipeline"):
+        self.progress = pipeline.progress
+        self.api_client = ShopbopAPIClient()
+
+    def process(self, work: Tuple[LeafCategoryInfo, int]) -> Iterable[Page]:
+        category, offset = work
+        pages = 0
+        while offset < category.item_count:
+            products = self.api_client.browse_by_category(categoryId=category.id, offset=offset).products
+            if not products:
+                break
+            offset += len(products)
+            pages += 1
+            yield Page(category, products, size=len(products))
+        self.progress.fetched(category, pages)
+
+    def close(self):
+        self.api_client.close()
+
+
+class PageParser:
+    def __init__(self, pipeline: "SyncPipeline"):
+        pass
+
+    def process(self, page: Page) -> Iterable[Page]:
+        page.items = [ProductInfo.from_product(listing.product) for listing in page.products]
+        page.products = []
+        yield page
+
+    def close(self):
+        pass
+
+
+class _SyncItemsWorker(ABC):
+    """A worker built on a SyncItems of its own; the counters it moves while processing a page are added to the page."""
+
+    def __init__(self, pipeline: "SyncPipeline"):
+        self.sync = SyncItems(shard_index=pipeline.shard_index, shard_count=pipeline.shard_count, full=pipeline.full)
+        self.embed = pipeline.embed
+
+    def _counters(self) -> Tuple[int, ...]:
+        return (self.sync.added_items, self.sync.updated_existing_items, self.sync.skipped_items, self.sync.unchanged_items)
+
+    def process(self, page: Page) -> Iterable[Page]:
+        before = self._counters()
+        self._process(page)
+        for name, old, new in zip(COUNTERS, before, self._counters()):
+            page.counts[name] += new - old
+        yield page
+
+    @abstractmethod
+    def _process(self, page: Page):
+        """Run the stage's work on the page, in place, with self.sync."""
+
+    def close(self):
+        self.sync.api_client.close()
+        self.sync.db.close()
+
+
+class OutfitResolver(_SyncItemsWorker):
+    """Drops the unchanged items of the page and fetches the outfits of the others."""
+
+    def _process(self, page: Page):
+        to_sync, page.to_link = self.sync._classify_page(page.category, page.items)
+        if self.embed:
+            # Unchanged but never embedded, e.g. persisted just before an interrupted run
+            synced_ids = {item.product_sin for item in to_sync}
+            unchanged_ids = [item.product_sin for item in page.items if item.product_sin not in synced_ids]
+            page.embed_ids.extend(crud_item.get_item_ids_without_detailed_embedding(self.sync.db, unchanged_ids))
+        for item in to_sync:
+            style_color_outfits = self.sync._fetch_outfits(item)
+            if style_color_outfits is not None:
+                page.resolved.append((item, style_color_outfits))
+        page.items = []
+
+
+class PagePersister(_SyncItemsWorker):
+    """Writes the page in one transaction (see SyncItems._write_page)."""
+
+    def _process(self, page: Page):
+        written = self.sync._write_page(page.category.path, page.to_link, page.resolved)
+        if self.embed:
+            page.embed_ids.extend(written)
+
+
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+
+class PageEmbedder:
+    """Computes detailed_embedding for the items of the page whose listing was written or that have none yet."""
+
+    def __init__(self, pipeline: "SyncPipeline"):
+        global _embedding_model
+        # Imported here: sentence-transformers (and torch) are only needed when embedding is on
+        from scripts.update_item_embeddings import SentenceTransformer, compute_item_embeddings
+        self.compute_item_embeddings = compute_item_embeddings
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                _embedding_model = SentenceTransformer("all-mpnet-base-v2")
+        self.model = _embedding_model
+        self.db = SessionLocal()
+
+    def process(self, page: Page) -> Iterable[Page]:
+        if page.embed_ids:
+            items = crud_item.get_items_by_ids(self.db, page.embed_ids)
+            embeddings = self.compute_item_embeddings(self.model, items)
+            crud_item.bulk_update_items(self.db, [{"id": item.id, "detailed_embedding": embedding} for item, embedding in zip(items, embeddings)])
+        yield page
+
+    def close(self):
+        self.db.close()
+
+
+"""
+Pipeline
+"""
+class SyncProgress:
+    """
+    Tracks which categories are done and saves the checkpoint. A category is done when its fetcher has emitted all
+    its pages and every one of them has left the last stage.
+    """
+
+    def __init__(self, shard: str, categories: List[LeafCategoryInfo], start_offsets: Dict[str, int], totals: Dict[str, int]):
+        self.shard = shard
+        self.categories = categories
+        self.start_offsets = start_offsets
+        self.totals = totals
+        self._expected_pages: Dict[str, int] = {}
+        self._done_pages: Dict[str, int] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._next = 0  # index of the first category that is not done
+        self._lock = threading.Lock()
+        self._db = SessionLocal()
+
+    def fetched(self, category: LeafCategoryInfo, pages: int):
+        with self._lock:
+            self._expected_pages[category.id] = pages
+            self._advance()
+
+    def page_done(self, page: Page):
+        with self._lock:
+            category_id = page.category.id
+            self._done_pages[category_id] = self._done_pages.get(category_id, 0) + 1
+            counts = self._counts.setdefault(category_id, dict.fromkeys(COUNTERS, 0))
+            for name in COUNTERS:
+                counts[name] += page.counts[name]
+            self._advance()
+
+    def _is_done(self, category_id: str) -> bool:
+        return category_id in self._expected_pages and self._done_pages.get(category_id, 0) == self._expected_pages[category_id]
+
+    def _advance(self):
+        advanced = False
+        while self._next < len(self.categories) and self._is_done(self.categories[self._next].id):
+            counts = self._counts.pop(self.categories[self._next].id, {})
+            for name in COUNTERS:
+                self.totals[name] += counts.get(name, 0)
+            self._next += 1
+            advanced = True
+        if advanced and self._next < len(self.categories):
+            category = self.categories[self._next]
+            self.save(category_id=category.id, page_offset=self.start_offsets.get(category.id, 0))
+
+    def save(self, category_id: Optional[str] = None, page_offset: int = 0, completed: bool = False):
+        crud_checkpoint.save_checkpoint(self._db, CATALOG_SYNC_JOB, self.shard,
+                category_id=category_id,
+                page_offset=page_offset,
+                added=self.totals["added"],
+                updated=self.totals["updated"],
+                skipped=self.totals["skipped"],
+                unchanged=self.totals["unchanged"],
+                completed=completed
+        )
+
+    def close(self):
+        self._db.close()
+
+
+class Stage:
+    """A pool of worker threads taking work from a bounded inbox."""
+
+    def __init__(self, name: str, worker_class, workers: int, queue_size: int):
+        self.name = name
+        self.worker_class = worker_class
+        self.workers = workers
+        self.inbox: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.next: Optional["Stage"] = None
+        self.running = workers
+        self.processed = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def report(self, elapsed: float) -> Dict:
+        capacity = max(elapsed * self.workers, 1e-9)
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "pages": self.processed,
+            "pages_per_second": self.processed / max(elapsed, 1e-9),
+            "products_per_second": self.items / max(elapsed, 1e-9),
+            "busy": self.busy_seconds / capacity,
+            "blocked": self.blocked_seconds / capacity,
+            "queue_depth": self.inbox.qsize(),
+            "queue_size": self.inbox.maxsize,
+        }
+
+
+class SyncPipeline:
+    """
+    The catalog sync of one shard as a staged, bounded-queue pipeline.
+    Args:
+        fetchers, parsers, resolvers, persisters, embedders (int): Worker threads per stage.
+        embed (bool): Compute detailed_embedding of the added/updated items as part of the run.
+        queue_size (int): Pages that can wait in front of each stage.
+        report_interval (float): Seconds between stage reports in the log.
+    """
+
+    def __init__(
+            self,
+            shard_index: int = 0,
+            shard_count: int = 1,
+            full: bool = False,
+            fetchers: int = 2,
+            parsers: int = 1,
+            resolvers: int = 8,
+            persisters: int = 1,
+            embedders: int = 1,
+            embed: bool = True,
+            queue_size: int = 8,
+            report_interval: float = 10.0
+        ):
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.full = full
+        self.embed = embed
+        self.report_interval = report_interval
+        self.stages = [
+            Stage("fetch", PageFetcher, fetchers, queue_size),
+            Stage("parse", PageParser, parsers, queue_size),
+            Stage("resolve", OutfitResolver, resolvers, queue_size),
+            Stage("persist", PagePersister, persisters, queue_size),
+        ]
+        if embed:
+            self.stages.append(Stage("embed", PageEmbedder, embedders, queue_size))
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next = next_stage
+        self.progress: Optional[SyncProgress] = None
+        self._abort = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._start = time.perf_counter()
+
+    def _put(self, stage: Stage, work):
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                stage.inbox.put(work, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, stage: Stage):
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                return stage.inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    def _run_worker(self, stage: Stage):
+        worker = None
+        try:
+            worker = stage.worker_class(self)
+            while True:
+                work = self._get(stage)
+                if work is _STOP:
+                    break
+                start = time.perf_counter()
+                blocked = 0.0
+                pages = products = 0
+                for page in worker.process(work):
+                    pages += 1
+                    products += page.size
+                    if stage.next is None:
+                        self.progress.page_done(page)
+                        continue
+                    put_start = time.perf_counter()
+                    self._put(stage.next, page)
+                    blocked += time.perf_counter() - put_start
+                with stage.lock:
+                    stage.processed += pages
+                    stage.items += products
+                    stage.busy_seconds += time.perf_counter() - start - blocked
+                    stage.blocked_seconds += blocked
+        except _Aborted:
+            pass
+        except BaseException as e:
+            logger.exception(f"{stage.name} worker failed")
+            if self._error is None:
+                self._error = e
+            self._abort.set()
+        finally:
+            if worker is not None:
+                worker.close()
+            with stage.lock:
+                stage.running -= 1
+                last = stage.running == 0
+            if last and stage.next is not None and not self._abort.is_set():
+                try:
+                    for _ in range(stage.next.workers):
+                        self._put(stage.next, _STOP)
+                except _Aborted:
+                    pass
+
+    def _feed(self, work: List[Tuple[LeafCategoryInfo, int]]):
+        try:
+            for category_work in work:
+                self._put(self.stages[0], category_work)
+            for _ in range(self.stages[0].workers):
+                self._put(self.stages[0], _STOP)
+        except _Aborted:
+            pass
+
+    def report(self) -> List[Dict]:
+        elapsed = time.perf_counter() - self._start
+        return [stage.report(elapsed) for stage in self.stages]
+
+    def _log_report(self):
+        for stage in self.report():
+            logger.info(
+                f"{stage['stage']:>8} x{stage['workers']}: {stage['pages']} pages, {stage['pages_per_second']:.2f} pages/s, "
+                f"{stage['products_per_second']:.1f} products/s, busy {stage['busy']:.0%}, blocked {stage['blocked']:.0%}, "
+                f"queue {stage['queue_depth']}/{stage['queue_size']}"
+            )
+
+    def run(self, restart: bool = False) -> List[Dict]:
+        """Sync this shard's leaf categories, resuming from the checkpoint unless restart is True. Returns the stage report."""
+        coordinator = SyncItems(shard_index=self.shard_index, shard_count=self.shard_count, full=self.full)
+        try:
+            categories = coordinator._shard_leaf_categories()
+            if categories is None:
+                return []
+            checkpoint = coordinator._resume_catalog_sync(restart)
+            totals = dict(zip(COUNTERS, (coordinator.added_items, coordinator.updated_existing_items, coordinator.skipped_items, coordinator.unchanged_items)))
+        finally:
+            coordinator.api_client.close()
+            coordinator.db.close()
+
+        work = [(category, resume_offset(category, checkpoint)) for category in categories]
+        work = [(category, offset) for category, offset in work if offset is not None]
+        self.progress = SyncProgress(f"{self.shard_index}/{self.shard_count}", [category for category, _ in work], {category.id: offset for category, offset in work}, totals)
+
+        self._start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._run_worker, args=(stage,), name=f"sync-{stage.name}-{i}", daemon=True)
+            for stage in self.stages for i in range(stage.workers)
+        ]
+        threads.append(threading.Thread(target=self._feed, args=(work,), name="sync-feed", daemon=True))
+        for thread in threads:
+            thread.start()
+        next_report = time.perf_counter() + self.report_interval
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+                    if time.perf_counter() >= next_report:
+                        self._log_report()
+                        next_report += self.report_interval
+            if self._error is not None:
+                raise self._error
+            self.progress.save(completed=True)
+            db = SessionLocal()
+            try:
+                refresh_category_aggregates(db)
+            finally:
+                db.close()
+        except KeyboardInterrupt:
+            self._abort.set()
+            raise
+        finally:
+            self.progress.close()
+
+        self._log_report()
+        logger.info(
+            f"Sync complete. Total items added: {totals['added']}, updated: {totals['updated']}, "
+            f"skipped: {totals['skipped']}, unchanged: {totals['unchanged']}"
+        )
+        return self.report()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(levelname)s %(message)s")
+    for noisy in ("sentence_transformers", "transformers", "torch", "urllib3", "httpx"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fetchers", type=int, default=2, help="Category page fetcher threads")
+    parser.add_argument("--parsers", type=int, default=1)
+    parser.add_argument("--resolvers", type=int, default=8, help="Threads calling the outfit API")
+    parser.add_argument("--persisters", type=int, default=1, help="Threads writing items to the database")
+    parser.add_argument("--embedders", type=int, default=1)
+    parser.add_argument("--no-embed", action="store_true", help="Leave embeddings to scripts.update_item_embeddings")
+    parser.add_argument("--queue-size", type=int, default=8, help="Pages that can wait in front of each stage")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between stage reports")
+    parser.add_argument("--shard", default="0/1", help="Run only this shard, as <index>/<count>")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and start from the first category")
+    parser.add_argument("--full", action="store_true", help="Rewrite every item and its outfits, even when its listing is unchanged")
+    args = parser.parse_args()
+
+    index, count = (int(part) for part in args.shard.split("/"))
+    SyncPipeline(
+        shard_index=index,
+        shard_count=count,
+        full=args.full,
+        fetchers=args.fetchers,
+        parsers=args.parsers,
+        resolvers=args.resolvers,
+        persisters=args.persisters,
+        embedders=args.embedders,
+        embed=not args.no_embed,
+        queue_size=args.queue_size,
+        report_interval=args.report_interval,
+    ).run(restart=args.restart)
@@ -7,6 +7,7 @@ from typing import List
 from sentence_transformers import SentenceTransformer
 from db.session import SessionLocal
 from crud.item import update_item, get_items_count, get_all_items, get_item_by_id, bulk_update_items
+from crud.sync_checkpoint import get_resumable_checkpoint, save_checkpoint
 from models.item import Item
 from pgvector.sqlalchemy import Vector
 import numpy as np
@@ -26,9 +27,26 @@ def compute_item_embedding(model: SentenceTransformer, item_descriptions: List[s
 
     return embedding
 
-async def update_embeddings(start_offset=0, batch_size=50, skip_existing=False):
+def item_embedding_text(item: Item) -> str:
+    # The text detailed_embedding is computed from
+    return f"[{item.color}] {item.name} [{[c.name for c in item.categories]}]"
+
+def compute_item_embeddings(model: SentenceTransformer, items: List[Item]) -> List[List[float]]:
+    # One encode call for the whole batch
+    embeddings = model.encode([item_embedding_text(item) for item in items])
+    return [[float(x) for x in embedding] for embedding in embeddings.tolist()]
+
+# Checkpoint job name
+UPDATE_EMBEDDINGS_JOB = "update_embeddings"
+
+async def update_embeddings(start_offset=None, batch_size=50, skip_existing=False):
     # update every single item in the database with its embedding
+    # without an explicit start_offset, resume an interrupted run from its checkpoint
     db = SessionLocal()
+    if start_offset is None:
+        checkpoint = get_resumable_checkpoint(db, UPDATE_EMBEDDINGS_JOB)
+        start_offset = checkpoint.page_offset if checkpoint else 0
+        logger.info(f"Starting at offset {start_offset}")
     total_items = get_items_count(db)
     logger.info(f"Total items to update: {total_items}")
 
@@ -43,11 +61,12 @@ async def update_embeddings(start_offset=0, batch_size=50, skip_existing=False):
             if item.detailed_embedding is not None and len(item.detailed_embedding) > 0 and skip_existing:
                 continue
                 
-            item.detailed_embedding = compute_item_embedding(model, f"[{item.color}] {item.name} [{[c.name for c in item.categories]}]")
+            item.detailed_embedding = compute_item_embedding(model, item_embedding_text(item))
 
         print(f"Updating embeddings for items {offset} to {offset + batch_size}...")
         print(f"Sample embedding for item {items[0].id}: {items[0].detailed_embedding[:5]}...")
         bulk_update_items(db, [{'id': item.id, 'detailed_embedding': item.detailed_embedding} for item in items])
+        save_checkpoint(db, UPDATE_EMBEDDINGS_JOB, page_offset=offset + batch_size)
             
 
         logger.info(f"Updated items up to offset {offset + batch_size}.")
@@ -64,6 +83,8 @@ async def update_embeddings(start_offset=0, batch_size=50, skip_existing=False):
 
         logger.info(f"Sample updated item: ID={item.id}, Name={item.name}, Embedding (first 5 dims)={item.detailed_embedding[:5]}")
 
+    save_checkpoint(db, UPDATE_EMBEDDINGS_JOB, page_offset=total_items, completed=True)
+
 
 if __name__ == "__main__":
-    asyncio.run(update_embeddings(0, 100, skip_existing=False))
\ No newline at end of file
+    asyncio.run(update_embeddings(None, 100, skip_existing=False))
\ No newline at end of file
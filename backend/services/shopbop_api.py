@@ -1,4 +1,14 @@
 import httpx
+import msgspec
+
+from services.shopbop_models import BrowseResponse, CategoryTree, OutfitResponse, OutfitResponseWithProducts, ProductResponse
+
+# Decoders are reusable and cheaper than decoding with a type argument on every call
+_CATEGORY_TREE_DECODER = msgspec.json.Decoder(CategoryTree)
+_BROWSE_DECODER = msgspec.json.Decoder(BrowseResponse)
+_OUTFIT_DECODER = msgspec.json.Decoder(OutfitResponse)
+_OUTFIT_WITH_PRODUCTS_DECODER = msgspec.json.Decoder(OutfitResponseWithProducts)
+_PRODUCT_DECODER = msgspec.json.Decoder(ProductResponse)
 
 class ShopbopAPIClient:
     BASE_URL = "https://api.shopbop.com/"
@@ -15,12 +25,14 @@ class ShopbopAPIClient:
             timeout=10.0
         )
 
-    def get_categories(self, dept: str = "WOMENS", lang: str = "en-US"):
+    # Responses are decoded from the raw bytes into the typed structs of services/shopbop_models.py
+
+    def get_categories(self, dept: str = "WOMENS", lang: str = "en-US") -> CategoryTree:
         response = self._client.get(f"/public/folders?lang={lang}&dept={dept}")
         response.raise_for_status()
-        return response.json()
+        return _CATEGORY_TREE_DECODER.decode(response.content)
     
-    def browse_by_category(self, categoryId: str, allowOutOfStockItems: bool = None, colors: str = None, lang: str = "en-US", sort: str = None, minPrice: str = None, maxPrice: str = None, limit: int = None, dept: str = "WOMENS", q: str = None, offset: int = None):
+    def browse_by_category(self, categoryId: str, allowOutOfStockItems: bool = None, colors: str = None, lang: str = "en-US", sort: str = None, minPrice: str = None, maxPrice: str = None, limit: int = None, dept: str = "WOMENS", q: str = None, offset: int = None) -> BrowseResponse:
         params = {
             "allowOutOfStockItems": allowOutOfStockItems,
             "colors": colors,
@@ -37,17 +49,18 @@ class ShopbopAPIClient:
         params = {k: v for k, v in params.items() if v is not None}
         response = self._client.get(f"/public/categories/{categoryId}/products", params=params)
         response.raise_for_status()
-        return response.json()
+        return _BROWSE_DECODER.decode(response.content)
     
-    def get_outfit(self, productSin, lang: str = "en-US"):
+    def get_outfit(self, productSin, lang: str = "en-US", with_products: bool = False):
+        """The product's outfits; with_products also decodes the products of each outfit, which the sync does not need."""
         response = self._client.get(f"/public/products/{productSin}/outfits")
         response.raise_for_status()
-        return response.json()
+        return (_OUTFIT_WITH_PRODUCTS_DECODER if with_products else _OUTFIT_DECODER).decode(response.content)
 
-    def get_product_by_product_sin(self, productSin: str):
+    def get_product_by_product_sin(self, productSin: str) -> ProductResponse:
         response = self._client.get(f"/public/products/{productSin}")
         response.raise_for_status()
-        return response.json()
+        return _PRODUCT_DECODER.decode(response.content)
     
     def close(self):
         self._client.close()
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Typed views of the Shopbop API responses, decoded straight from the response bytes.
+Only the fields the sync uses are declared: msgspec skips everything else while parsing instead of building the
+dict trees response.json() would, and Structs are slotted, so a page of products costs a fraction of the memory
+and decode time (see benchmarks/payload_decode.py).
+Keys are camelCase in the API (productSin, styleColorOutfits, ...), snake_case here.
+"""
+from typing import List, Optional
+
+import msgspec
+
+
+class _Payload(msgspec.Struct, rename="camel", gc=False):
+    # gc=False: payloads never form reference cycles, so the garbage collector does not need to track them
+    pass
+
+
+"""
+GET /public/folders
+"""
+class CategoryNode(_Payload):
+    id: str
+    name: str
+    count: int = 0
+    children: List["CategoryNode"] = []
+
+
+class CategoryTree(_Payload):
+    categories: List[CategoryNode] = []
+
+
+"""
+GET /public/categories/{id}/products and GET /public/products/{sin}
+"""
+class Image(_Payload):
+    src: str
+
+
+class Color(_Payload):
+    color_sin: Optional[str] = None
+    name: Optional[str] = None
+    in_stock: Optional[bool] = None
+    images: List[Image] = []
+
+
+class RetailPrice(_Payload):
+    price: Optional[str] = None
+
+
+class Product(_Payload):
+    product_sin: str
+    short_description: Optional[str] = None
+    product_detail_url: Optional[str] = None
+    designer_name: Optional[str] = None
+    retail_price: Optional[RetailPrice] = None
+    default_color_sin: Optional[str] = None
+    colors: List[Color] = []
+    display_stretch_amount: Optional[str] = None
+
+
+class ProductListing(_Payload):
+    product: Product
+
+
+class BrowseResponse(_Payload):
+    products: List[ProductListing] = []
+
+
+class ProductResponse(_Payload):
+    products: List[Product] = []
+
+
+"""
+GET /public/products/{sin}/outfits
+"""
+class StyleColor(_Payload):
+    product: Optional[Product] = None
+
+
+class Outfit(_Payload):
+    id: Optional[str] = None
+    primary_image: Optional[Image] = None
+
+    @property
+    def image_url_suffix(self) -> Optional[str]:
+        return self.primary_image.src if self.primary_image else None
+
+
+class OutfitWithProducts(Outfit):
+    style_colors: List[StyleColor] = []
+
+
+class StyleColorOutfits(_Payload):
+    outfits: List[Outfit] = []
+
+
+class StyleColorOutfitsWithProducts(_Payload):
+    outfits: List[OutfitWithProducts] = []
+
+
+class OutfitResponse(_Payload):
+    """Outfit ids and images only; the products of each outfit, most of the payload, are skipped."""
+    style_color_outfits: List[StyleColorOutfits] = []
+
+
+class OutfitResponseWithProducts(_Payload):
+    style_color_outfits: List[StyleColorOutfitsWithProducts] = []